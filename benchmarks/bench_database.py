@@ -0,0 +1,272 @@
+"""DatabaseClient benchmarks against seeded datasets.
+
+Not collected by the default test run. Run with
+
+    pytest benchmarks/bench_database.py --benchmark-json=benchmark.json
+
+BENCHMARK_SCALES limits the dataset sizes (e.g. BENCHMARK_SCALES=10000) and
+BENCHMARK_DATABASE_URL runs against Postgres instead of a temporary SQLite
+database. Each result records the statements sent per call in `extra_info`.
+"""
+from datetime import datetime, timedelta, timezone
+
+import homestake.constants as const
+
+# Methods reading rows the full table size depends on get fewer rounds
+FULL_SCAN_ROUNDS = 3
+
+
+def middle(ids):
+    return ids[len(ids) // 2]
+
+
+### Account ###
+def test_list_accounts(measure, dataset):
+    measure(dataset.client.list_accounts)
+
+
+def test_get_account_by_name(measure, dataset):
+    measure(dataset.client.get_account_by_name,
+            f"Mortgage {middle(dataset.mortgage_ids)}")
+
+
+### Mortgage ###
+def test_create_mortgage(measure, dataset):
+    def create():
+        n = next(dataset.unique)
+        return dataset.client.create_mortgage(f"Benchmark Lender {n}", 200000.0, 5, 30, datetime(2020, 1, 1),
+                                              name=f"Benchmark Mortgage {n}")
+    measure(create)
+
+
+def test_get_mortgage_by_id(measure, dataset):
+    measure(dataset.client.get_mortgage_by_id, middle(dataset.mortgage_ids))
+
+
+def test_get_mortgage_by_lender(measure, dataset):
+    mortgage = dataset.client.get_mortgage_by_id(middle(dataset.mortgage_ids))
+    measure(dataset.client.get_mortgage_by_lender, mortgage["lender"])
+
+
+def test_get_mortgage_by_property(measure, dataset):
+    measure(dataset.client.get_mortgage_by_property,
+            middle(dataset.property_ids))
+
+
+def test_get_mortgage_progress(measure, dataset):
+    measure(dataset.client.get_mortgage_progress,
+            middle(dataset.mortgage_ids))
+
+
+def test_list_mortgages(measure, dataset):
+    measure(dataset.client.list_mortgages)
+
+
+def test_update_mortgage(measure, dataset):
+    mortgage_id = middle(dataset.mortgage_ids)
+    measure(lambda: dataset.client.update_mortgage(
+        mortgage_id, lender=f"Benchmark Lender {next(dataset.unique)}"))
+
+
+def test_delete_mortgage(measure, dataset):
+    def setup():
+        n = next(dataset.unique)
+        mortgage = dataset.client.create_mortgage(f"Benchmark Lender {n}", 200000.0, 5, 30, datetime(2020, 1, 1),
+                                                  name=f"Benchmark Mortgage {n}")
+        return (mortgage["id"],), {}
+    measure(dataset.client.delete_mortgage, setup=setup)
+
+
+### Property ###
+def create_property(dataset):
+    n = next(dataset.unique)
+    return dataset.client.create_property(f"Benchmark Property {n}", f"{n} Benchmark Avenue", 250000.0,
+                                          datetime(2020, 1, 1), 300000.0)
+
+
+def test_create_property(measure, dataset):
+    measure(create_property, dataset)
+
+
+def test_get_property_by_address(measure, dataset):
+    property = dataset.client.get_property_by_id(middle(dataset.property_ids))
+    measure(dataset.client.get_property_by_address, property["address"])
+
+
+def test_get_property_by_id(measure, dataset):
+    measure(dataset.client.get_property_by_id, middle(dataset.property_ids))
+
+
+def test_get_property_by_name(measure, dataset):
+    property = dataset.client.get_property_by_id(middle(dataset.property_ids))
+    measure(dataset.client.get_property_by_name, property["name"])
+
+
+def test_update_property(measure, dataset):
+    property_id = middle(dataset.property_ids)
+    measure(lambda: dataset.client.update_property(
+        property_id, address=f"{next(dataset.unique)} Benchmark Avenue"))
+
+
+def test_delete_property(measure, dataset):
+    def setup():
+        return (create_property(dataset)["id"],), {}
+    measure(dataset.client.delete_property, setup=setup)
+
+
+def test_create_property_valuation(measure, dataset):
+    property_id = middle(dataset.property_ids)
+    measure(lambda: dataset.client.create_property_valuation(
+        property_id, 320000.0, datetime(2000, 1, 1) + timedelta(hours=next(dataset.unique))))
+
+
+def test_list_property_valuations(measure, dataset):
+    measure(dataset.client.list_property_valuations,
+            middle(dataset.property_ids))
+
+
+### Transaction ###
+def test_create_transaction(measure, dataset):
+    user_id = middle(dataset.user_ids)
+    measure(dataset.client.create_transaction, 1500.0,
+            datetime(2024, 1, 1), user_id, middle(dataset.mortgage_ids))
+
+
+def test_get_transaction_by_id(measure, dataset):
+    measure(dataset.client.get_transaction_by_id,
+            middle(dataset.transaction_ids))
+
+
+def test_list_transactions_by_user(measure, dataset):
+    measure(dataset.client.list_transactions_by_user,
+            middle(dataset.user_ids))
+
+
+def test_list_transactions_by_account(measure, dataset):
+    measure(dataset.client.list_transactions_by_account,
+            middle(dataset.mortgage_ids))
+
+
+def test_list_transactions(measure, dataset):
+    measure(dataset.client.list_transactions, rounds=FULL_SCAN_ROUNDS)
+
+
+def test_iter_transaction_batches(measure, dataset):
+    property_id = middle(dataset.property_ids)
+    measure(lambda: sum(len(batch) for batch in dataset.client.iter_transaction_batches(
+        property_id=property_id)))
+
+
+def test_update_transaction(measure, dataset):
+    transaction_id = middle(dataset.transaction_ids)
+    measure(lambda: dataset.client.update_transaction(
+        transaction_id, amount=float(next(dataset.unique))))
+
+
+def test_delete_transaction(measure, dataset):
+    def setup():
+        transaction = dataset.client.create_transaction(
+            1500.0, datetime(2024, 1, 1), middle(dataset.user_ids), middle(dataset.mortgage_ids))
+        return (transaction["id"],), {}
+    measure(dataset.client.delete_transaction, setup=setup)
+
+
+### User ###
+def create_user(dataset):
+    n = next(dataset.unique)
+    return dataset.client.create_user(f"benchmark{n}", f"benchmark{n}@example.com", "password", 10)
+
+
+def test_create_user(measure, dataset):
+    measure(create_user, dataset)
+
+
+def test_get_user_by_name(measure, dataset):
+    user = dataset.client.get_user_by_id(middle(dataset.user_ids))
+    measure(dataset.client.get_user_by_name, user["user_name"])
+
+
+def test_get_user_by_id(measure, dataset):
+    measure(dataset.client.get_user_by_id, middle(dataset.user_ids))
+
+
+def test_update_user(measure, dataset):
+    user_id = middle(dataset.user_ids)
+    measure(lambda: dataset.client.update_user(
+        user_id, email=f"benchmark{next(dataset.unique)}@example.com"))
+
+
+def test_delete_user(measure, dataset):
+    def setup():
+        return (create_user(dataset)["id"],), {}
+    measure(dataset.client.delete_user, setup=setup)
+
+
+def test_list_users(measure, dataset):
+    measure(dataset.client.list_users)
+
+
+### Idempotency Key ###
+def test_create_idempotency_key(measure, dataset):
+    measure(lambda: dataset.client.create_idempotency_key(
+        f"benchmark-{next(dataset.unique)}", "0" * 64))
+
+
+def test_get_idempotency_key(measure, dataset):
+    key = f"benchmark-{next(dataset.unique)}"
+    dataset.client.create_idempotency_key(key, "0" * 64)
+    measure(dataset.client.get_idempotency_key, key)
+
+
+def test_update_idempotency_key(measure, dataset):
+    key = f"benchmark-{next(dataset.unique)}"
+    dataset.client.create_idempotency_key(key, "0" * 64)
+    measure(dataset.client.update_idempotency_key, key, 201, "{}")
+
+
+def test_delete_idempotency_key(measure, dataset):
+    def setup():
+        key = f"benchmark-{next(dataset.unique)}"
+        dataset.client.create_idempotency_key(key, "0" * 64)
+        return (key,), {}
+    measure(dataset.client.delete_idempotency_key, setup=setup)
+
+
+def test_delete_expired_idempotency_keys(measure, dataset):
+    measure(dataset.client.delete_expired_idempotency_keys,
+            datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+
+### Job ###
+def test_create_job(measure, dataset):
+    measure(dataset.client.create_job, "amortization", {})
+
+
+def test_get_job_by_id(measure, dataset):
+    job = dataset.client.create_job("amortization", {})
+    measure(dataset.client.get_job_by_id, job["id"])
+
+
+def test_claim_job(measure, dataset):
+    def setup():
+        return (dataset.client.create_job("amortization", {})["id"], "benchmark"), {}
+    measure(dataset.client.claim_job, setup=setup)
+
+
+def test_update_job(measure, dataset):
+    job = dataset.client.create_job("amortization", {})
+    measure(dataset.client.update_job, job["id"],
+            status=const.JOB_STATUS_RUNNING)
+
+
+def test_heartbeat_jobs(measure, dataset):
+    measure(dataset.client.heartbeat_jobs, "benchmark")
+
+
+def test_requeue_stale_jobs(measure, dataset):
+    measure(dataset.client.requeue_stale_jobs,
+            datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+
+def test_list_queued_job_ids(measure, dataset):
+    measure(dataset.client.list_queued_job_ids)
@@ -0,0 +1,116 @@
+import itertools
+import os
+from dataclasses import dataclass, field
+
+import pytest
+from sqlalchemy import Engine, event
+
+from homestake.database.client import DatabaseClient, create_schema
+from homestake.database.models import Base
+from homestake.seed import properties_for, seed
+
+# Transactions seeded per dataset, overridable with a comma separated list
+SCALES = [int(scale) for scale in os.getenv(
+    "BENCHMARK_SCALES", "10000,100000,1000000").split(",")]
+YEARS = 10
+
+
+@dataclass
+class Dataset:
+    client: DatabaseClient
+    scale: int
+    property_ids: range
+    mortgage_ids: range
+    user_ids: range
+    transaction_ids: range
+    # Suffixes for rows created during a run, unique across benchmarks
+    unique: itertools.count = field(default_factory=itertools.count)
+
+
+class QueryCounter:
+    """Counts statements sent to the database through a set of engines."""
+
+    def __init__(self, *engines: Engine):
+        self.engines = set(engines)
+        self.queries = 0
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self.count)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self.count)
+
+    def count(self, *args):
+        self.queries += 1
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda scale: f"{scale}")
+def dataset(request, tmp_path_factory):
+    # BENCHMARK_DATABASE_URL points the suite at Postgres, whose tables are
+    # dropped and reseeded for every scale
+    database_url = os.getenv("BENCHMARK_DATABASE_URL") or \
+        f"sqlite:///{tmp_path_factory.mktemp('benchmark') / 'homestake.db'}"
+    previous_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = database_url
+    try:
+        client = DatabaseClient()
+    finally:
+        if previous_url is None:
+            os.environ.pop("DATABASE_URL")
+        else:
+            os.environ["DATABASE_URL"] = previous_url
+
+    Base.metadata.drop_all(client.engine)
+    create_schema(client.engine)
+    result = seed(client.engine, properties_for(
+        request.param, YEARS), YEARS)
+    yield Dataset(
+        client=client,
+        scale=request.param,
+        property_ids=range(result.first_property_id,
+                           result.first_property_id + result.properties),
+        mortgage_ids=range(result.first_account_id,
+                           result.first_account_id + result.mortgages),
+        user_ids=range(result.first_user_id,
+                       result.first_user_id + result.users),
+        transaction_ids=range(result.first_transaction_id,
+                              result.first_transaction_id + result.transactions)
+    )
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+@pytest.fixture
+def measure(benchmark, dataset):
+    """Benchmark a call and record the statements it sends per call."""
+    benchmark.group = f"{dataset.scale} transactions"
+
+    def run(function, *args, setup=None, rounds=None, **kwargs):
+        calls = 0
+        queries = 0
+
+        # Only statements sent by the call itself count, not those from setup
+        def call(*call_args, **call_kwargs):
+            nonlocal calls, queries
+            before = counter.queries
+            try:
+                return function(*call_args, **call_kwargs)
+            finally:
+                calls += 1
+                queries += counter.queries - before
+
+        with QueryCounter(dataset.client.engine, dataset.client.read_engine) as counter:
+            if setup is not None or rounds is not None:
+                result = benchmark.pedantic(call, args=() if setup else args, kwargs=None if setup else kwargs,
+                                            setup=setup, rounds=rounds or 10, iterations=1)
+            else:
+                result = benchmark(call, *args, **kwargs)
+
+        benchmark.extra_info['queries'] = queries / max(calls, 1)
+        benchmark.extra_info['scale'] = dataset.scale
+        return result
+
+    return run
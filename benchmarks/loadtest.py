@@ -0,0 +1,234 @@
+"""HTTP load test for the HomeStake API.
+
+Drives the FastAPI app in process with a concurrent httpx client and prints a
+JSON report with throughput and latency percentiles per route template. The
+database is taken from --database-url, falling back to DATABASE_URL and then
+the local SQLite database, e.g.
+
+    python -m benchmarks.loadtest --requests 5000 --concurrency 32 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+
+URL_PREFIX = "/api/v1"
+OPERATIONS = ("create", "lookup", "list", "patch")
+DEFAULT_MIX = "create=1,lookup=4,list=4,patch=1"
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}, expected one of {', '.join(OPERATIONS)}")
+        weights[operation] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("Request mix needs at least one positive weight")
+    return weights
+
+
+def summarize(samples: dict[str, list[tuple[float, int]]], duration: float) -> dict:
+    """Latency percentiles in milliseconds and status counts per route template."""
+    routes = {}
+    for route, results in sorted(samples.items()):
+        latencies = np.array([latency for latency, _ in results]) * 1000
+        statuses = defaultdict(int)
+        for _, status_code in results:
+            statuses[str(status_code)] += 1
+        summary = {
+            'requests': len(results),
+            'throughput': round(len(results) / duration, 2) if duration else None,
+            'errors': sum(count for status_code, count in statuses.items() if int(status_code) >= 400),
+            'status': dict(statuses),
+            'mean_ms': round(float(latencies.mean()), 3),
+            'max_ms': round(float(latencies.max()), 3),
+        }
+        for percentile, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+            summary[f"p{percentile}_ms"] = round(float(value), 3)
+        routes[route] = summary
+
+    return routes
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, users: int, transactions_per_user: int):
+        self.client = client
+        self.rng = rng
+        self.users = users
+        self.transactions_per_user = transactions_per_user
+        self.run_id = uuid.uuid4().hex[:8]
+        self.user_names: list[str] = []
+        self.transaction_ids: list[int] = []
+        self.samples: dict[str, list[tuple[float, int]]] = defaultdict(list)
+
+    async def setup(self):
+        # Entities are namespaced by run so repeated runs share a database
+        property_name = f"loadtest-{self.run_id}"
+        response = await self.client.post(f"{URL_PREFIX}/properties", json={
+            'name': property_name,
+            'address': f"{self.run_id} Load Test Way",
+            'purchase_price': 300000.0,
+            'purchase_date': '2020-01-01T00:00:00',
+            'current_value': 350000.0
+        })
+        response.raise_for_status()
+
+        # Transactions are posted against the single mortgage account
+        response = await self.client.post(f"{URL_PREFIX}/mortgages", json={
+            'lender': f"loadtest-{self.run_id}",
+            'loan_amount': 240000.0,
+            'interest_rate': 5,
+            'term': 30,
+            'start_date': '2020-01-01T00:00:00',
+            'property_name': property_name
+        })
+        if response.status_code not in (201, 409):
+            response.raise_for_status()
+
+        for index in range(self.users):
+            user_name = f"loadtest-{self.run_id}-{index}"
+            response = await self.client.post(f"{URL_PREFIX}/users", json={
+                'user_name': user_name,
+                'email': f"{user_name}@example.com",
+                'password': "loadtest-password",
+                'stake': 1,
+                'property_name': property_name
+            })
+            response.raise_for_status()
+            self.user_names.append(user_name)
+
+            for _ in range(self.transactions_per_user):
+                response = await self.client.post(f"{URL_PREFIX}/transactions", json=self.transaction_body(user_name))
+                response.raise_for_status()
+                self.transaction_ids.append(response.json()["id"])
+
+    def transaction_body(self, user_name: str) -> dict:
+        date = datetime(2020, 1, 1, tzinfo=timezone.utc) + \
+            timedelta(days=self.rng.randrange(365 * 5))
+        return {
+            'amount': round(self.rng.uniform(50, 3000), 2),
+            'date': date.isoformat(),
+            'user_name': user_name,
+            'account_name': "Mortgage"
+        }
+
+    def request(self, operation: str) -> tuple[str, str, str, dict | None]:
+        """Method, concrete URL, route template and body for one operation."""
+        user_name = self.rng.choice(self.user_names)
+        if operation == "create":
+            return "POST", f"{URL_PREFIX}/transactions", f"POST {URL_PREFIX}/transactions", self.transaction_body(user_name)
+        if operation == "lookup":
+            return "GET", f"{URL_PREFIX}/users/name/{user_name}", f"GET {URL_PREFIX}/users/name/{{user_name}}", None
+        if operation == "list":
+            return "GET", f"{URL_PREFIX}/transactions/user/{user_name}", f"GET {URL_PREFIX}/transactions/user/{{user_name}}", None
+        transaction_id = self.rng.choice(self.transaction_ids)
+        return "PATCH", f"{URL_PREFIX}/transactions/{transaction_id}", f"PATCH {URL_PREFIX}/transactions/{{id}}", {
+            'amount': round(self.rng.uniform(50, 3000), 2)
+        }
+
+    async def worker(self, requests: asyncio.Queue):
+        while True:
+            try:
+                method, url, route, body = requests.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await self.client.request(method, url, json=body)
+            self.samples[route].append(
+                (time.perf_counter() - start, response.status_code))
+
+    async def run(self, mix: dict[str, float], count: int, concurrency: int) -> float:
+        operations = list(mix)
+        requests = asyncio.Queue()
+        for operation in self.rng.choices(operations, weights=[mix[operation] for operation in operations], k=count):
+            requests.put_nowait(self.request(operation))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.worker(requests) for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def load_test(args: argparse.Namespace) -> dict:
+    # The routers create their database clients on import, so the URL has to
+    # be set first
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    from homestake.database.client import DatabaseClient
+    from homestake.main import app
+    from homestake.middleware import RateLimitMiddleware
+
+    if not args.rate_limit:
+        app.user_middleware = [
+            middleware for middleware in app.user_middleware if middleware.cls is not RateLimitMiddleware]
+    mix = parse_mix(args.mix)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        test = LoadTest(client, random.Random(args.seed),
+                        args.users, args.transactions_per_user)
+        await test.setup()
+        duration = await test.run(mix, args.requests, args.concurrency)
+
+    engine = DatabaseClient().engine
+    return {
+        'commit': git_commit(),
+        'database': engine.dialect.name,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mix': mix,
+        'seed': args.seed,
+        'duration_seconds': round(duration, 3),
+        'throughput': round(args.requests / duration, 2),
+        'routes': summarize(test.samples, duration)
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest", description="Load test the HomeStake API in process.")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL, then the local SQLite database")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"comma separated operation=weight pairs from {', '.join(OPERATIONS)} (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=50, help="users created before the run")
+    parser.add_argument("--transactions-per-user", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="keep the rate limiting middleware enabled")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(load_test(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# Multi-worker server profile: gunicorn -c gunicorn.conf.py homestake.main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master so workers fork with it loaded. Database
+# engines drop the connections inherited from the master after fork (see
+# homestake/database/client.py) and each worker warms its own pools in the
+# app lifespan.
+preload_app = True
+
+# Time allowed for in-flight requests and the lifespan shutdown, which stops
+# the job runner and closes pooled connections
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("TIMEOUT", 60))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,178 @@
+import calendar
+import math
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+MONTHS_PER_YEAR = 12
+# Balances below half a cent count as paid off
+PAID_OFF_BALANCE = 0.005
+
+
+def add_months(date: datetime, months: int) -> datetime:
+    month = date.month - 1 + months
+    year = date.year + month // MONTHS_PER_YEAR
+    month = month % MONTHS_PER_YEAR + 1
+    day = min(date.day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
+
+def period_of(start_date: datetime, date: datetime) -> int:
+    """Payment period a date falls in, where period k ends on the k-th due date."""
+    period = (date.year - start_date.year) * MONTHS_PER_YEAR + \
+        date.month - start_date.month
+    if add_months(start_date, period) < date:
+        period += 1
+    return max(period, 1)
+
+
+def monthly_rate(interest_rate: float) -> float:
+    # Mortgage interest rates are stored as an annual percentage
+    return interest_rate / 100 / MONTHS_PER_YEAR
+
+
+def monthly_payment(loan_amount: float, interest_rate: float, term_months: int) -> float:
+    # A loan with no term is due in full at once
+    if term_months <= 0:
+        return loan_amount
+    rate = monthly_rate(interest_rate)
+    if rate == 0:
+        return loan_amount / term_months
+    return loan_amount * rate / (1 - (1 + rate) ** -term_months)
+
+
+def scheduled_balance(loan_amount: float, interest_rate: float, term_months: int, period: int) -> float:
+    """Balance left after `period` scheduled payments."""
+    if term_months <= 0:
+        return 0.0
+    period = min(max(period, 0), term_months)
+    rate = monthly_rate(interest_rate)
+    payment = monthly_payment(loan_amount, interest_rate, term_months)
+    if rate == 0:
+        return max(loan_amount - payment * period, 0.0)
+    growth = (1 + rate) ** period
+    return max(loan_amount * growth - payment * (growth - 1) / rate, 0.0)
+
+
+def equivalent_period(loan_amount: float, interest_rate: float, term_months: int, balance: float) -> float:
+    """Period at which the schedule reaches `balance`, inverting scheduled_balance."""
+    if balance >= loan_amount or term_months <= 0:
+        return 0.0
+    if balance <= 0:
+        return float(term_months)
+    rate = monthly_rate(interest_rate)
+    payment = monthly_payment(loan_amount, interest_rate, term_months)
+    if rate == 0:
+        return (loan_amount - balance) / payment
+    return math.log((payment - balance * rate) / (payment - loan_amount * rate)) / math.log(1 + rate)
+
+
+def remaining_periods(balance: float, interest_rate: float, payment: float) -> float | None:
+    """Payments of `payment` needed to clear `balance`, or None if they never will."""
+    if balance <= 0:
+        return 0.0
+    rate = monthly_rate(interest_rate)
+    if rate == 0:
+        return balance / payment
+    if balance * rate >= payment:
+        return None
+    return -math.log(1 - balance * rate / payment) / math.log(1 + rate)
+
+
+def amortization_schedule(loan_amount: float, interest_rate: float, term: int, start_date: datetime) -> List[dict]:
+    term_months = term * MONTHS_PER_YEAR
+    rate = monthly_rate(interest_rate)
+    payment = monthly_payment(loan_amount, interest_rate, term_months)
+
+    schedule = []
+    balance = loan_amount
+    for period in range(1, term_months + 1):
+        interest = balance * rate
+        principal = min(payment - interest, balance)
+        balance -= principal
+        schedule.append({
+            'period': period,
+            'date': add_months(start_date, period).isoformat(),
+            'payment': round(principal + interest, 2),
+            'principal': round(principal, 2),
+            'interest': round(interest, 2),
+            'balance': round(balance, 2)
+        })
+
+    return schedule
+
+
+def annuity_payments(balance: np.ndarray, rate: np.ndarray, months: np.ndarray) -> np.ndarray:
+    months = np.maximum(months, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = balance * rate / (1 - (1 + rate) ** -months)
+    return np.where(rate == 0, balance / months, payment)
+
+
+def simulate_scenarios(loan_amount: float, interest_rate: float, term: int, start_date: datetime, scenarios: List[dict]) -> List[dict]:
+    """Simulate prepayment and refinancing scenarios for one mortgage.
+
+    Each scenario may set `extra_monthly_principal`, `lump_sums` and
+    `rate_changes` (lists of dicts keyed by 1-based payment `month`) and a new
+    `term` in years. Scenario inputs are laid out as (scenario, month) arrays and
+    every month is applied to all scenarios at once. A rate change re-amortizes
+    the remaining balance over the remaining term.
+    """
+    count = len(scenarios)
+    terms = np.array([(scenario.get("term") or term) * MONTHS_PER_YEAR
+                      for scenario in scenarios], dtype=np.int64)
+    months = int(terms.max()) if count else 0
+
+    extra = np.zeros((count, months))
+    rates = np.full((count, months), monthly_rate(interest_rate))
+    recast = np.zeros((count, months), dtype=bool)
+    for row, scenario in enumerate(scenarios):
+        extra[row, :] = scenario.get("extra_monthly_principal") or 0.0
+        for lump_sum in scenario.get("lump_sums") or []:
+            if lump_sum["month"] <= months:
+                extra[row, lump_sum["month"] - 1] += lump_sum["amount"]
+        for change in sorted(scenario.get("rate_changes") or [], key=lambda change: change["month"]):
+            if change["month"] <= months:
+                rates[row, change["month"] - 1:] = monthly_rate(
+                    change["interest_rate"])
+                recast[row, change["month"] - 1] = True
+
+    balance = np.full(count, float(loan_amount))
+    payment = annuity_payments(balance, rates[:, 0], terms)
+    total_interest = np.zeros(count)
+    total_paid = np.zeros(count)
+    payoff_month = np.zeros(count, dtype=np.int64)
+
+    for month in range(months):
+        active = balance > PAID_OFF_BALANCE
+        if not active.any():
+            break
+
+        rate = rates[:, month]
+        if month > 0 and recast[:, month].any():
+            payment = np.where(recast[:, month], annuity_payments(
+                balance, rate, terms - month), payment)
+
+        interest = np.where(active, balance * rate, 0.0)
+        principal = np.where(active, np.minimum(
+            payment - interest + extra[:, month], balance), 0.0)
+        balance = balance - principal
+        total_interest += interest
+        total_paid += interest + principal
+        payoff_month = np.where(active & (balance <= PAID_OFF_BALANCE),
+                                month + 1, payoff_month)
+
+    results = []
+    for row, scenario in enumerate(scenarios):
+        paid_off = bool(payoff_month[row])
+        results.append({
+            'name': scenario.get("name"),
+            'months': int(payoff_month[row]) if paid_off else None,
+            'payoff_date': add_months(start_date, int(payoff_month[row])).isoformat() if paid_off else None,
+            'total_interest': round(float(total_interest[row]), 2),
+            'total_paid': round(float(total_paid[row]), 2),
+            'remaining_balance': round(max(float(balance[row]), 0.0), 2)
+        })
+
+    return results
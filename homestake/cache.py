@@ -0,0 +1,138 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import Response, status
+
+import homestake.conditional as conditional
+import homestake.constants as const
+from homestake.database.hooks import on_tables_written
+from homestake.serialization import RESPONSE_MEDIA_TYPE
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    status_code: int
+    headers: dict
+    media_type: str | None
+    tables: tuple[str, ...]
+    expires_at: float
+
+
+class ResponseCache:
+    """Bounded LRU of encoded GET responses with a TTL.
+
+    Entries record the tables they were read from and are dropped when a
+    commit in this process writes to one of them. Other server processes keep
+    their own caches, which the TTL bounds the staleness of.
+    """
+
+    def __init__(self, max_entries: int = const.RESPONSE_CACHE_MAX_ENTRIES, ttl: float = const.RESPONSE_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        # Bumped on every write to a table, so a response computed while a
+        # write committed is not stored as if it were current
+        self.generations: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= self.clock():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        with self.lock:
+            return tuple(self.generations.get(table, 0) for table in tables)
+
+    def put(self, key: tuple, response: Response, tables: tuple[str, ...], generation: tuple[int, ...]):
+        with self.lock:
+            if tuple(self.generations.get(table, 0) for table in tables) != generation:
+                return
+            self.entries[key] = CachedResponse(response.body, response.status_code, dict(response.headers),
+                                               response.media_type, tables, self.clock() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables: set[str]):
+        with self.lock:
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+            stale = [key for key, entry in self.entries.items()
+                     if not tables.isdisjoint(entry.tables)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+RESPONSE_CACHE = ResponseCache()
+on_tables_written(RESPONSE_CACHE.invalidate)
+
+
+def cached(*tables: str, cache: ResponseCache | None = None):
+    """Cache a GET handler's successful responses until `tables` are written.
+
+    The key is the handler, its arguments and the negotiated response format.
+    If-None-Match is left out of the key and answered from the cached ETag.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(**kwargs):
+            response_cache = cache or RESPONSE_CACHE
+            if_none_match = kwargs.get("if_none_match")
+            key = (handler.__module__, handler.__qualname__, RESPONSE_MEDIA_TYPE.get(),
+                   tuple(sorted((name, value) for name, value in kwargs.items() if name != "if_none_match")))
+
+            entry = response_cache.get(key)
+            if entry is not None:
+                tag = entry.headers.get("etag")
+                if tag is not None and conditional.matches(if_none_match, tag):
+                    return conditional.not_modified(tag)
+                return Response(content=entry.body, status_code=entry.status_code, headers=entry.headers,
+                                media_type=entry.media_type)
+
+            generation = response_cache.generation(tables)
+            response = handler(**kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response_cache.put(key, response, tables, generation)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+from fastapi import Response, status
+
+import homestake.constants as const
+from homestake.serialization import RESPONSE_MEDIA_TYPE
+
+
+def etag(version: int) -> str:
+    """ETag for a collection version, in the format negotiated for this request."""
+    # JSON and MessagePack bodies of one version are different representations
+    representation = "msgpack" if RESPONSE_MEDIA_TYPE.get() == const.MSGPACK_MEDIA_TYPE else "json"
+    return f'"{version}-{representation}"'
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match compares weakly, so W/ prefixes are ignored
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def not_modified(tag: str) -> Response:
+    return Response(
+        content=None,
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": tag},
+        media_type=None,
+        background=None,
+    )
@@ -1,8 +1,29 @@
+API_TAG_EVENT = "Event"
+API_TAG_EXPORT = "Export"
+API_TAG_JOB = "Job"
 API_TAG_MORTGAGE = "Mortgage"
 API_TAG_PROPERTY = "Property"
+API_TAG_SEARCH = "Search"
 API_TAG_TRANSACTION = "Transaction"
 API_TAG_USER = "User"
 
+API_KEY_HEADER = "x-api-key"
+
+# Token bucket limits, in requests per second and bucket size
+RATE_LIMIT_CLIENT_RATE = 50.0
+RATE_LIMIT_CLIENT_BURST = 100
+RATE_LIMIT_ROUTE_RATE = 20.0
+RATE_LIMIT_ROUTE_BURST = 40
+RATE_LIMIT_MAX_BUCKETS = 10000
+RATE_LIMIT_EXEMPT_PATHS = ("/health", "/metrics")
+RATE_LIMIT_EXCEEDED_MSG = "Rate limit exceeded"
+
+# Shed load once a connection pool or the request threadpool is this busy
+LOAD_SHED_POOL_SATURATION = 0.9
+LOAD_SHED_THREADPOOL_WAITING = 64
+LOAD_SHED_RETRY_AFTER_SECONDS = 1
+LOAD_SHED_MSG = "Server is overloaded, please retry later"
+
 NAME_LENGTH = 30
 ADDR_LENGTH = 50
 PASS_MAX_LENGTH = 64
@@ -12,12 +33,99 @@ SQLITE_DB_ENTRY_EXISTS_MSG = "UNIQUE constraint failed"
 
 ACCOUNT_ID_NOT_FOUND = "Account with id {} not found"
 
+IDEMPOTENCY_KEY_LENGTH = 255
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_KEY_EXISTS_MSG = "Idempotency key already exists"
+IDEMPOTENCY_KEY_NOT_FOUND = "Idempotency key {} not found"
+IDEMPOTENCY_KEY_IN_PROGRESS_MSG = "A request with this idempotency key is already in progress"
+IDEMPOTENCY_KEY_INVALID_MSG = "Idempotency key must be between 1 and {} characters"
+IDEMPOTENCY_KEY_MISMATCH_MSG = "Idempotency key was already used with a different request"
+IDEMPOTENCY_KEY_CREATE_ERROR_MSG = "Database error occurred while creating idempotency key"
+IDEMPOTENCY_KEY_UPDATE_ERROR_MSG = "Database error occurred while updating idempotency key"
+IDEMPOTENCY_KEY_DELETE_ERROR_MSG = "Database error occurred while deleting idempotency key"
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+EXPORT_BATCH_SIZE = 65536
+EXPORT_DEFAULT_PATH = "./homestake-exports"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+JOB_WORKERS = 2
+JOB_HEARTBEAT_SECONDS = 30
+# Running jobs whose runner has not sent a heartbeat for this long are requeued
+JOB_STALE_SECONDS = 120
+# How long shutdown waits for running jobs to finish
+JOB_STOP_TIMEOUT_SECONDS = 10
+JOB_INVALID_ATTR_MSG = "Invalid attribute {} for Job"
+JOB_ID_NOT_FOUND = "Job with id {} not found"
+JOB_TYPE_UNKNOWN_MSG = "Unknown job type {}"
+JOB_CREATE_ERROR_MSG = "Database error occurred while creating job"
+JOB_UPDATE_ERROR_MSG = "Database error occurred while updating job"
+
+SCENARIO_MAX_COUNT = 500
+SCENARIO_MAX_TERM_YEARS = 50
+# Bound on scenarios times simulated months, which sizes the arrays allocated
+SCENARIO_MAX_MONTHS = 200000
+SCENARIO_TOO_LARGE_MSG = "Scenarios may simulate at most {} months in total"
+
+SQLITE_DEFAULT_URL = "sqlite:///./homestake.db"
+# Applied to every SQLite connection when it is opened
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+    "busy_timeout=5000",
+    "foreign_keys=ON",
+)
+SQLITE_READER_POOL_SIZE = 8
+SQLITE_READER_MAX_OVERFLOW = 8
+# Seconds a write waits for the single writer connection
+SQLITE_WRITER_TIMEOUT = 30
+
+# Pool of the one engine each worker process shares for a non-SQLite
+# database, so a worker holds at most POOL_SIZE + POOL_MAX_OVERFLOW connections
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+# Connections opened per pool at startup, before the first request, at most
+# the pool's size
+POOL_WARM_CONNECTIONS = 4
+
+# 2 stores money as integer cents, 3 adds the transaction archive
+SNAPSHOT_FORMAT_VERSION = 3
+SNAPSHOT_READABLE_VERSIONS = (2, 3)
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_SQLITE_MEMBER = "database.sqlite"
+SNAPSHOT_TABLES_DIR = "tables"
+SNAPSHOT_ARCHIVE_DIR = "archive"
+# Pages copied per step of the SQLite online backup
+SNAPSHOT_SQLITE_BACKUP_PAGES = 4096
+SNAPSHOT_MANIFEST_MISSING_MSG = "Snapshot {} has no manifest"
+SNAPSHOT_MEMBER_MISSING_MSG = "Snapshot has no {} member"
+SNAPSHOT_VERSION_UNSUPPORTED_MSG = "Unsupported snapshot format version {}"
+SNAPSHOT_DIALECT_MISMATCH_MSG = "Snapshot was taken from {} and cannot be restored into {}"
+SNAPSHOT_DIALECT_UNSUPPORTED_MSG = "Snapshots are not supported for {} databases"
+SNAPSHOT_TABLE_UNKNOWN_MSG = "Snapshot table {} does not exist in this schema"
+SNAPSHOT_ARCHIVE_MISSING_MSG = "Snapshot has no transaction archive to replace the one in {}"
+
 MORTGAGE_INVALID_ATTR_MSG = "Invalid attribute {} for Mortgage"
 MORTGAGE_EXISTS_MSG = "Mortgage already exists"
 MORTGAGE_ID_NOT_FOUND = "Mortgage with id {} not found"
 MORTGAGE_CREATE_ERROR_MSG = "Database error occurred while creating mortgage"
 MORTGAGE_UPDATE_ERROR_MSG = "Database error occurred while updating mortgage"
 MORTGAGE_DELETE_ERROR_MSG = "Database error occurred while deleting mortgage"
+MORTGAGE_IN_USE_MSG = "Mortgage cannot be deleted while users or transactions refer to it"
+
+VALUATION_MAX_POINTS = 500
+VALUATION_MAX_POINTS_LIMIT = 5000
+VALUATION_CREATE_ERROR_MSG = "Database error occurred while creating property valuation"
 
 PROPERTY_INVALID_ATTR_MSG = "Invalid attribute {} for Property"
 PROPERTY_EXISTS_MSG = "Property already exists"
@@ -26,6 +134,64 @@ PROPERTY_CREATE_ERROR_MSG = "Database error occurred while creating property"
 PROPERTY_UPDATE_ERROR_MSG = "Database error occurred while updating property"
 PROPERTY_DELETE_ERROR_MSG = "Database error occurred while deleting property"
 
+EVENT_ENTITY_MORTGAGE = "mortgage"
+EVENT_ENTITY_PROPERTY = "property"
+EVENT_ENTITY_TRANSACTION = "transaction"
+EVENT_ENTITY_USER = "user"
+EVENT_ACTION_CREATE = "create"
+EVENT_ACTION_UPDATE = "update"
+EVENT_ACTION_DELETE = "delete"
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+# Events read per query while a feed catches up
+EVENT_BATCH_SIZE = 500
+# Seconds a feed waits for a local commit before polling again, which is how
+# it sees events committed by other processes, and sends a keepalive
+EVENT_POLL_SECONDS = 5
+# Milliseconds clients wait before reconnecting
+EVENT_RETRY_MS = 3000
+EVENT_TTL_HOURS = 24 * 7
+EVENT_DELETE_ERROR_MSG = "Database error occurred while deleting events"
+
+ARCHIVE_DEFAULT_PATH = "./homestake-archive"
+# Whole years older than this are archived by the archive_transactions job
+ARCHIVE_HORIZON_YEARS = 7
+ARCHIVE_COMPRESSION = "zstd"
+ARCHIVE_DELETE_CHUNK_SIZE = 10000
+
+# Bytes of arrays kept in memory across all property ledgers. A row takes
+# 28 bytes plus 8 per owner, and arrays grow by doubling
+LEDGER_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Also bounds how long a write in another process goes unseen
+LEDGER_CACHE_TTL_SECONDS = 30.0
+LEDGER_ROLLUP_PATTERN = r"^(month|year)$"
+
+RESPONSE_CACHE_MAX_ENTRIES = 4096
+# Also bounds how stale a response can be after a write in another process
+RESPONSE_CACHE_TTL_SECONDS = 10.0
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_QUERY_MAX_LENGTH = 256
+
+# Postgres partitions the transactions table by "year" or "month", fixed once
+# the table has been created
+TRANSACTION_PARTITION_INTERVAL = "year"
+# Partitions created in advance, past the current one
+TRANSACTION_PARTITIONS_AHEAD = 2
+TRANSACTION_PARTITION_NOT_FOUND = "Transaction partition {} not found"
+TRANSACTION_PARTITIONS_UNSUPPORTED_MSG = "Transaction partitions are only supported on Postgres"
+TRANSACTION_PARTITION_ERROR_MSG = "Database error occurred while changing transaction partitions"
+TRANSACTION_ARCHIVED_MSG = "Transaction with id {} is archived and can no longer be changed"
+TRANSACTION_ARCHIVE_ERROR_MSG = "Database error occurred while archiving transactions"
+# Transaction lists sort on these, prefixed with "-" for descending order
+TRANSACTION_SORT_FIELDS = ("date", "amount")
+TRANSACTION_SORT_PATTERN = r"^-?(date|amount)$"
+TRANSACTION_SORT_INVALID_MSG = "Transactions cannot be sorted by {}"
+TRANSACTION_BULK_MAX_SIZE = 10000
+# Room for TRANSACTION_BULK_MAX_SIZE rows with long user and account names
+TRANSACTION_BULK_MAX_BYTES = 4 * 1024 * 1024
+TRANSACTION_BULK_SIZE_MSG = "Bulk requests may contain at most {} transactions"
+TRANSACTION_BULK_BYTES_MSG = "Bulk request bodies may be at most {} bytes"
 TRANSACTION_INVALID_ATTR_MSG = "Invalid attribute {} for Transaction"
 TRANSACTION_ID_NOT_FOUND = "Transaction with id {} not found"
 TRANSACTION_CREATE_ERROR_MSG = "Database error occurred while creating transaction"
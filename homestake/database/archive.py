@@ -0,0 +1,203 @@
+"""Cold storage for transactions nobody edits any more.
+
+Old transactions are moved out of the database into Arrow IPC files, one per
+property and year, compressed with zstd and opened through a memory map. A
+JSON manifest lists every file with the ids, users, accounts and dates it
+holds, so a read only opens the files that can contain matching rows.
+
+Files and the manifest are replaced atomically. A row can briefly be both
+archived and in the database, when archiving stops between writing files and
+deleting the rows; readers prefer the database row and the next run finishes
+the move.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import homestake.constants as const
+from homestake.money import from_cents
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Amounts are kept in cents, as the database stores them
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("amount", pa.int64()),
+    ("date", pa.timestamp("us")),
+    ("user_id", pa.int64()),
+    ("account_id", pa.int64()),
+])
+
+
+def transaction_dicts(table: pa.Table) -> list[dict]:
+    """Archived rows in the shape of Transaction.to_dict()."""
+    return [{
+        'id': row['id'],
+        'amount': from_cents(row['amount']),
+        'date': row['date'].isoformat(),
+        'user_id': row['user_id'],
+        'account_id': row['account_id']
+    } for row in table.to_pylist()]
+
+
+class TransactionArchive:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        # Manifest as last read, with the modification time and size it had
+        self.cached: tuple[tuple[int, int], dict] | None = None
+
+    def manifest(self) -> dict:
+        manifest_path = os.path.join(self.path, MANIFEST)
+        try:
+            stat = os.stat(manifest_path)
+            modified = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return {'version': MANIFEST_VERSION, 'files': []}
+        cached = self.cached
+        if cached is None or cached[0] != modified:
+            with open(manifest_path) as file:
+                cached = (modified, json.load(file))
+            self.cached = cached
+        return cached[1]
+
+    def files(self, ids: Iterable[int] | None = None, user_ids: Iterable[int] | None = None,
+              account_ids: Iterable[int] | None = None, start: datetime | None = None,
+              end: datetime | None = None, property_id: int | None = None) -> list[dict]:
+        """Manifest entries of the files that can hold matching rows.
+
+        Rows match when their id is in `ids`, or their user is in `user_ids`,
+        or their account is in `account_ids`; None leaves that filter out.
+        `property_id` limits the files to those of one property.
+        """
+        ids = None if ids is None else set(ids)
+        user_ids = None if user_ids is None else set(user_ids)
+        account_ids = None if account_ids is None else set(account_ids)
+        matching = []
+        for entry in self.manifest()['files']:
+            if property_id is not None and entry['property_id'] != property_id:
+                continue
+            if start is not None and datetime.fromisoformat(entry['max_date']) < start:
+                continue
+            if end is not None and datetime.fromisoformat(entry['min_date']) > end:
+                continue
+            if ids is None and user_ids is None and account_ids is None or \
+                    ids is not None and any(entry['min_id'] <= id <= entry['max_id'] for id in ids) or \
+                    user_ids is not None and not user_ids.isdisjoint(entry['user_ids']) or \
+                    account_ids is not None and not account_ids.isdisjoint(entry['account_ids']):
+                matching.append(entry)
+        return matching
+
+    def read(self, ids: Iterable[int] | None = None, user_ids: Iterable[int] | None = None,
+             account_ids: Iterable[int] | None = None, start: datetime | None = None,
+             end: datetime | None = None, property_id: int | None = None) -> pa.Table:
+        """Archived rows matching the filters of files(), ordered by id."""
+        tables = []
+        for entry in self.files(ids, user_ids, account_ids, start, end, property_id):
+            table = self._read_file(entry['path'])
+            mask = None
+            for column, values in (("id", ids), ("user_id", user_ids), ("account_id", account_ids)):
+                if values is not None:
+                    match = pc.is_in(table[column], value_set=pa.array(
+                        list(values), pa.int64()))
+                    mask = match if mask is None else pc.or_(mask, match)
+            if start is not None:
+                date_mask = pc.greater_equal(table["date"], pa.scalar(start, pa.timestamp("us")))
+                mask = date_mask if mask is None else pc.and_(mask, date_mask)
+            if end is not None:
+                date_mask = pc.less_equal(table["date"], pa.scalar(end, pa.timestamp("us")))
+                mask = date_mask if mask is None else pc.and_(mask, date_mask)
+            tables.append(table if mask is None else table.filter(mask))
+        if not tables:
+            return SCHEMA.empty_table()
+        return pa.concat_tables(tables).sort_by("id")
+
+    def write(self, groups: dict[tuple[int, int], pa.Table]):
+        """Add rows to the files of their (property_id, year), merging with rows already there."""
+        with self.lock:
+            entries = {(entry['property_id'], entry['year']): entry
+                       for entry in self.manifest()['files']}
+            for (property_id, year), table in groups.items():
+                path = os.path.join(f"property={property_id}", f"{year}.arrow")
+                if (property_id, year) in entries:
+                    existing = self._read_file(path)
+                    # Rows archived by an interrupted run are written again
+                    existing = existing.filter(pc.invert(pc.is_in(
+                        existing["id"], value_set=table["id"])))
+                    table = pa.concat_tables([existing, table])
+                entries[(property_id, year)] = self._write_file(
+                    path, table, property_id, year)
+            self._write_manifest(entries.values())
+
+    def delete(self, user_ids: Iterable[int], account_ids: Iterable[int]) -> int:
+        """Remove the rows of the given users or accounts, returning how many were removed."""
+        user_ids, account_ids = list(user_ids), list(account_ids)
+        deleted = 0
+        emptied = []
+        with self.lock:
+            affected = self.files(user_ids=user_ids, account_ids=account_ids)
+            if not affected:
+                return 0
+            entries = {entry['path']: entry for entry in self.manifest()['files']}
+            for entry in affected:
+                table = self._read_file(entry['path'])
+                keep = pc.invert(pc.or_(
+                    pc.is_in(table["user_id"], value_set=pa.array(
+                        user_ids, pa.int64())),
+                    pc.is_in(table["account_id"], value_set=pa.array(account_ids, pa.int64()))))
+                kept = table.filter(keep)
+                deleted += table.num_rows - kept.num_rows
+                if kept.num_rows:
+                    entries[entry['path']] = self._write_file(
+                        entry['path'], kept, entry['property_id'], entry['year'])
+                else:
+                    del entries[entry['path']]
+                    emptied.append(entry['path'])
+            self._write_manifest(entries.values())
+            # Only once the manifest no longer lists them
+            for path in emptied:
+                os.remove(os.path.join(self.path, path))
+        return deleted
+
+    def _read_file(self, path: str) -> pa.Table:
+        with pa.memory_map(os.path.join(self.path, path)) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_file(self, path: str, table: pa.Table, property_id: int, year: int) -> dict:
+        table = table.sort_by("id")
+        full_path = os.path.join(self.path, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temporary = f"{full_path}.tmp"
+        with pa.OSFile(temporary, "wb") as sink:
+            with pa.ipc.new_file(sink, SCHEMA, options=pa.ipc.IpcWriteOptions(
+                    compression=const.ARCHIVE_COMPRESSION)) as writer:
+                writer.write_table(table)
+        os.replace(temporary, full_path)
+        return {
+            'path': path,
+            'property_id': property_id,
+            'year': year,
+            'rows': table.num_rows,
+            'min_id': pc.min(table["id"]).as_py(),
+            'max_id': pc.max(table["id"]).as_py(),
+            'min_date': pc.min(table["date"]).as_py().isoformat(),
+            'max_date': pc.max(table["date"]).as_py().isoformat(),
+            'user_ids': pc.unique(table["user_id"]).to_pylist(),
+            'account_ids': pc.unique(table["account_id"]).to_pylist()
+        }
+
+    def _write_manifest(self, entries: Iterable[dict]):
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, MANIFEST)
+        temporary = f"{manifest_path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({'version': MANIFEST_VERSION, 'files': sorted(
+                entries, key=lambda entry: (entry['property_id'], entry['year']))}, file)
+        os.replace(temporary, manifest_path)
+        self.cached = None
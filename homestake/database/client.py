@@ -1,13 +1,31 @@
+import json
+import math
 import os
-from datetime import datetime, timezone
-from sqlalchemy import create_engine
+import weakref
+from collections import namedtuple
+from datetime import date, datetime, time, timezone
+from sqlalchemy import BigInteger, Engine, create_engine, delete, desc, event, extract, func, insert, literal, make_url, or_, select, text, type_coerce, union_all, update
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 
 import homestake.constants as const
-from homestake.database.models import Base, Account, Mortgage, Property, Transaction, User
+import homestake.database.hooks as hooks
+from homestake.amortization import add_months, equivalent_period, monthly_payment, monthly_rate, period_of, remaining_periods, scheduled_balance, MONTHS_PER_YEAR
+from homestake.database.archive import SCHEMA as ARCHIVE_SCHEMA, TransactionArchive, transaction_dicts
+from homestake.database.events import record_event, record_transaction_events
+from homestake.database.migrations import POSTGRES_LOCK_ID, run_migrations
+from homestake.database.partitions import create_partitioned_transactions, create_transaction_partitions, detach_transaction_partition, list_transaction_partitions, partitions_ahead_end
+from homestake.database.models import Base, Account, CollectionVersion, Event, IdempotencyKey, Job, Mortgage, MortgageBalance, MortgageProgress, Property, PropertyValuation, Transaction, User
+from homestake.database.versions import account_transactions_scope, bump_versions, transaction_scopes, user_transactions_scope
+from homestake.database.search import PROPERTY_KIND, SEARCH_TABLE, USER_KIND, create_search_index, like_escape, trigram_match
 from homestake.logger import logger
+from homestake.money import from_cents, to_cents
 
 
 class DatabaseClientError(Exception):
@@ -20,24 +38,199 @@ class DatabaseDuplicationError(DatabaseClientError):
     pass
 
 
+class DatabaseInUseError(DatabaseClientError):
+    """Custom exception for deleting rows other rows still refer to."""
+    pass
+
+
+def _naive_utc(date: datetime) -> datetime:
+    # Datetime columns are stored without a timezone, in UTC
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _date_range(start: date | datetime | None, end: date | datetime | None) -> tuple[datetime | None, datetime | None]:
+    """Inclusive datetime bounds, where a date covers its whole day."""
+    if start is not None and not isinstance(start, datetime):
+        start = datetime.combine(start, time.min)
+    if end is not None and not isinstance(end, datetime):
+        # Dates are stored to the microsecond, so this is before the next day
+        end = datetime.combine(end, time.max)
+    return start, end
+
+
+# Archived payments in the shape of the rows get_mortgage_progress() reads
+ArchivedPayment = namedtuple("ArchivedPayment", ["id", "date", "cents"])
+
+
+def _archived_payments(table) -> List[ArchivedPayment]:
+    return [ArchivedPayment(*row) for row in zip(*(table[column].to_pylist() for column in ("id", "date", "amount")))]
+
+
+def _archived_rows(table) -> List[tuple]:
+    # (id, amount, date, user_id, account_id) as iter_transaction_batches() yields them
+    return list(zip(table["id"].to_pylist(), (from_cents(cents) for cents in table["amount"].to_pylist()),
+                    table["date"].to_pylist(), table["user_id"].to_pylist(), table["account_id"].to_pylist()))
+
+
+# Every engine created by a DatabaseClient and its role ("primary", or
+# "writer"/"reader" for SQLite), used to report pool usage
+ENGINES = weakref.WeakKeyDictionary()
+
+# SQLite (writer, reader) engines by URL, shared so a process only ever has
+# one writer connection per database file
+SQLITE_ENGINES: dict[str, tuple[Engine, Engine]] = {}
+
+# Engines of other databases by URL, shared so every client in a process
+# draws from one connection pool
+PRIMARY_ENGINES: dict[str, Engine] = {}
+
+
+def pool_status() -> List[dict]:
+    status = []
+    for engine, role in list(ENGINES.items()):
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+
+        # A negative max overflow means the pool can grow without bound
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.append({
+            'url': engine.url.render_as_string(hide_password=True),
+            'role': role,
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'saturation': pool.checkedout() / capacity if pool._max_overflow >= 0 else 0.0
+        })
+
+    return status
+
+
+def warm_pools(connections: int = const.POOL_WARM_CONNECTIONS):
+    """Open pooled connections up front so early requests skip the connect cost."""
+    for engine in list(ENGINES):
+        pool = engine.pool
+        count = min(connections, pool.size()) if isinstance(pool, QueuePool) else 1
+        opened = []
+        try:
+            for _ in range(count):
+                opened.append(engine.connect())
+        finally:
+            for connection in opened:
+                connection.close()
+
+
+def dispose_engines():
+    for engine in list(ENGINES):
+        engine.dispose()
+
+
+def _dispose_after_fork():
+    # Pooled connections copied from the parent process share its sockets and
+    # file handles. Drop them without closing so the parent's stay usable, and
+    # let the child open its own
+    for engine in list(ENGINES):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    # Turn off pysqlite's own transaction handling so the begin listeners
+    # below decide how transactions start
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for pragma in const.SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+def sqlite_engines(database_url: str) -> tuple[Engine, Engine]:
+    """Writer and reader engines for a SQLite database.
+
+    All writes go through a single pooled connection whose transactions start
+    with BEGIN IMMEDIATE, so writers in this process queue for the connection
+    and writers in other processes wait on busy_timeout instead of failing with
+    "database is locked" halfway through a transaction. In WAL mode readers
+    never block the writer, so they get a regular pool of query-only
+    connections.
+    """
+    if database_url in SQLITE_ENGINES:
+        return SQLITE_ENGINES[database_url]
+
+    writer = create_engine(database_url, poolclass=QueuePool, pool_size=1,
+                           max_overflow=0, pool_timeout=const.SQLITE_WRITER_TIMEOUT)
+    reader = create_engine(database_url, poolclass=QueuePool, pool_size=const.SQLITE_READER_POOL_SIZE,
+                           max_overflow=const.SQLITE_READER_MAX_OVERFLOW)
+    for engine, begin in ((writer, "BEGIN IMMEDIATE"), (reader, "BEGIN")):
+        event.listen(engine, "connect", _sqlite_connect)
+        event.listen(engine, "begin", lambda connection,
+                     begin=begin: connection.exec_driver_sql(begin))
+    event.listen(reader, "connect", lambda dbapi_connection, connection_record:
+                 dbapi_connection.execute("PRAGMA query_only=ON"))
+
+    ENGINES[writer] = "writer"
+    ENGINES[reader] = "reader"
+    SQLITE_ENGINES[database_url] = (writer, reader)
+    return writer, reader
+
+
+def primary_engine(database_url: str) -> Engine:
+    if database_url in PRIMARY_ENGINES:
+        return PRIMARY_ENGINES[database_url]
+
+    engine = create_engine(database_url, pool_size=const.POOL_SIZE,
+                           max_overflow=const.POOL_MAX_OVERFLOW)
+    ENGINES[engine] = "primary"
+    PRIMARY_ENGINES[database_url] = engine
+    return engine
+
+
+def create_schema(engine: Engine):
+    """Create missing tables and indexes and apply pending migrations."""
+    with engine.begin() as connection:
+        create_partitioned_transactions(connection)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    with engine.begin() as connection:
+        create_search_index(connection)
+    # Every start keeps partitions ahead of the calendar, not only the one
+    # that created the table
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"SELECT pg_advisory_xact_lock({POSTGRES_LOCK_ID})")
+        create_transaction_partitions(
+            connection, now, partitions_ahead_end(now))
+
+
 class DatabaseClient:
     def __init__(self):
-        database_url = os.getenv("DATABASE_URL")
-        if database_url is None:
-            self.engine = create_engine("sqlite:///./homestake.db")
+        database_url = os.getenv("DATABASE_URL", const.SQLITE_DEFAULT_URL)
+        if make_url(database_url).get_backend_name() == "sqlite":
+            # Methods that only read use read_engine, everything else engine
+            self.engine, self.read_engine = sqlite_engines(database_url)
         else:
-            self.engine = create_engine(database_url)
+            self.engine = primary_engine(database_url)
+            self.read_engine = self.engine
 
-        Base.metadata.create_all(self.engine)
+        create_schema(self.engine)
+        self.archive = TransactionArchive(
+            os.getenv("ARCHIVE_PATH", const.ARCHIVE_DEFAULT_PATH))
 
     ### Account ###
     def list_accounts(self) -> List[Account]:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             accounts = session.query(Account).all()
             return [account.to_dict() for account in accounts]
 
     def get_account_by_name(self, name: str) -> Account | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             account = session.query(Account).filter_by(name=name).first()
             return account.to_dict() if account else None
 
@@ -76,19 +269,19 @@ class DatabaseClient:
             return mortgage.to_dict()
 
     def get_mortgage_by_id(self, mortgage_id: int) -> Mortgage | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             mortgage = session.query(Mortgage).filter_by(
                 id=mortgage_id).first()
             return mortgage.to_dict() if mortgage else None
 
     def get_mortgage_by_lender(self, lender: str) -> Mortgage | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             mortgage = session.query(Mortgage).filter_by(
                 lender=lender).first()
             return mortgage.to_dict() if mortgage else None
 
     def get_mortgage_by_property(self, property_id: int) -> Mortgage | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             mortgage = session.query(Mortgage).filter_by(
                 property_id=property_id).first()
             return mortgage.to_dict() if mortgage else None
@@ -109,6 +302,8 @@ class DatabaseClient:
                         const.MORTGAGE_INVALID_ATTR_MSG.format(key))
 
             try:
+                if kwargs.keys() & {"loan_amount", "interest_rate", "term", "start_date"}:
+                    self._reset_mortgage_progress(session, mortgage_id)
                 session.commit()
             except SQLAlchemyError as e:
                 logger.info(e)
@@ -127,8 +322,15 @@ class DatabaseClient:
                     const.MORTGAGE_ID_NOT_FOUND.format(mortgage_id))
 
             try:
+                self._reset_mortgage_progress(session, mortgage_id)
                 session.delete(mortgage)
                 session.commit()
+            except IntegrityError as e:
+                # Users or transactions still refer to the mortgage
+                logger.info(e)
+                session.rollback()
+                raise DatabaseInUseError(
+                    const.MORTGAGE_IN_USE_MSG) from e
             except SQLAlchemyError as e:
                 logger.info(e)
                 session.rollback()
@@ -138,10 +340,152 @@ class DatabaseClient:
             return mortgage.to_dict()
 
     def list_mortgages(self) -> List[Mortgage]:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             mortgages = session.query(Mortgage).all()
             return [mortgage.to_dict() for mortgage in mortgages]
 
+    def get_mortgage_progress(self, mortgage_id: int) -> dict | None:
+        """Compare payments posted to a mortgage account with its schedule.
+
+        The balance at the end of each completed payment period is kept in
+        mortgage_balances. Writes to the mortgage's transactions record the
+        earliest changed date, and only periods from that date on are replayed.
+        """
+        now = _naive_utc(datetime.now(timezone.utc))
+        with Session(self.engine) as session:
+            mortgage = session.query(Mortgage).filter_by(
+                id=mortgage_id).first()
+            if not mortgage:
+                return None
+
+            start_date = _naive_utc(mortgage.start_date)
+            term_months = mortgage.term * MONTHS_PER_YEAR
+            rate = monthly_rate(mortgage.interest_rate)
+            completed = period_of(start_date, now)
+            if add_months(start_date, completed) > now:
+                completed -= 1
+
+            progress = session.get(MortgageProgress, mortgage_id)
+            resume = 0
+            if progress is not None:
+                resume = progress.period
+                if progress.dirty_from is not None:
+                    resume = min(resume, period_of(
+                        start_date, _naive_utc(progress.dirty_from)) - 1)
+            resume = max(min(resume, completed), 0)
+
+            balance, principal_paid, interest_paid = mortgage.loan_amount, 0.0, 0.0
+            snapshot = session.get(
+                MortgageBalance, (mortgage_id, resume)) if resume else None
+            if snapshot is not None:
+                balance, principal_paid, interest_paid = snapshot.balance, snapshot.principal_paid, snapshot.interest_paid
+            else:
+                resume = 0
+
+            # Payments are summed as integer cents so periods with many
+            # payments add up exactly
+            query = select(Transaction.id, Transaction.date, type_coerce(Transaction.amount, BigInteger).label("cents")).where(
+                Transaction.account_id == mortgage_id)
+            replay_from = add_months(start_date, resume) if resume else None
+            if resume:
+                query = query.where(Transaction.date > replay_from)
+            payments = session.execute(
+                query.order_by(Transaction.date)).all()
+            archived = self.archive.read(
+                account_ids=[mortgage_id], start=replay_from)
+            if archived.num_rows:
+                hot_ids = {payment.id for payment in payments}
+                payments = sorted([payment for payment in _archived_payments(archived)
+                                   if payment.id not in hot_ids and (replay_from is None or payment.date > replay_from)]
+                                  + payments, key=lambda payment: payment.date)
+
+            snapshots = []
+            index = 0
+            for period in range(resume + 1, completed + 1):
+                due_date = add_months(start_date, period)
+                paid_cents = 0
+                while index < len(payments) and _naive_utc(payments[index].date) <= due_date:
+                    paid_cents += payments[index].cents
+                    index += 1
+                paid = from_cents(paid_cents)
+                interest = balance * rate if balance > 0 else 0.0
+                principal = paid - interest
+                balance -= principal
+                principal_paid += principal
+                interest_paid += interest
+                snapshots.append({
+                    'mortgage_id': mortgage_id,
+                    'period': period,
+                    'balance': balance,
+                    'principal_paid': principal_paid,
+                    'interest_paid': interest_paid
+                })
+            # Payments made during the current period have not accrued interest yet
+            pending = from_cents(sum(payment.cents for payment in payments[index:]))
+
+            try:
+                session.execute(delete(MortgageBalance).where(
+                    MortgageBalance.mortgage_id == mortgage_id, MortgageBalance.period > resume))
+                if snapshots:
+                    session.execute(insert(MortgageBalance), snapshots)
+                if progress is None:
+                    session.add(MortgageProgress(mortgage_id=mortgage_id, period=completed,
+                                                 dirty_from=None, updated_at=now))
+                else:
+                    # Leave the row dirty if a transaction changed while computing
+                    session.execute(
+                        update(MortgageProgress)
+                        .where(MortgageProgress.mortgage_id == mortgage_id,
+                               MortgageProgress.dirty_from.is_(None) if progress.dirty_from is None
+                               else MortgageProgress.dirty_from == progress.dirty_from)
+                        .values(period=completed, dirty_from=None, updated_at=now))
+                session.commit()
+            except SQLAlchemyError as e:
+                # The computed figures are still valid, they are just not saved
+                logger.info(e)
+                session.rollback()
+
+            current_balance = balance - pending
+            payment = monthly_payment(
+                mortgage.loan_amount, mortgage.interest_rate, term_months)
+            scheduled = equivalent_period(
+                mortgage.loan_amount, mortgage.interest_rate, term_months, current_balance)
+            remaining = remaining_periods(
+                current_balance, mortgage.interest_rate, payment)
+            if remaining is not None:
+                # Rounded first so a final payment of a few cents is not
+                # projected as an extra month
+                remaining = math.ceil(round(remaining, 2))
+
+            return {
+                'mortgage_id': mortgage_id,
+                'as_of': now.isoformat(),
+                'periods_elapsed': completed,
+                'scheduled_balance': round(scheduled_balance(mortgage.loan_amount, mortgage.interest_rate, term_months, completed), 2),
+                'remaining_balance': round(max(current_balance, 0.0), 2),
+                'principal_paid': round(principal_paid + pending, 2),
+                'interest_paid': round(interest_paid, 2),
+                'months_ahead': round(scheduled - completed),
+                'scheduled_payoff_date': add_months(start_date, term_months).isoformat(),
+                'projected_payoff_date': add_months(start_date, completed + remaining).isoformat() if remaining is not None else None
+            }
+
+    def _invalidate_mortgage_progress(self, session: Session, account_id: int | None, date: datetime | None):
+        if account_id is None or date is None:
+            return
+        date = _naive_utc(date)
+        session.execute(
+            update(MortgageProgress)
+            .where(MortgageProgress.mortgage_id == account_id,
+                   or_(MortgageProgress.dirty_from.is_(None), MortgageProgress.dirty_from > date))
+            .values(dirty_from=date))
+
+    def _reset_mortgage_progress(self, session: Session, mortgage_id: int):
+        session.execute(delete(MortgageBalance).where(
+            MortgageBalance.mortgage_id == mortgage_id))
+        session.execute(delete(MortgageProgress).where(
+            MortgageProgress.mortgage_id == mortgage_id))
+
     ### Property ###
 
     def create_property(self, name: str, address: str, purchase_price: float, purchase_date: datetime, current_value: float) -> Property:
@@ -156,6 +500,14 @@ class DatabaseClient:
 
             try:
                 session.add(property)
+                session.flush()
+                now = _naive_utc(datetime.now(timezone.utc))
+                valuations = [{'property_id': property.id,
+                               'date': now, 'value': current_value}]
+                if _naive_utc(purchase_date) < now:
+                    valuations.append({'property_id': property.id, 'date': _naive_utc(
+                        purchase_date), 'value': purchase_price})
+                session.execute(insert(PropertyValuation), valuations)
                 session.commit()
             except IntegrityError as e:
                 logger.info(e)
@@ -177,19 +529,19 @@ class DatabaseClient:
             return property.to_dict()
 
     def get_property_by_address(self, address: str) -> Property | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             property = session.query(Property).filter_by(
                 address=address).first()
             return property.to_dict() if property else None
 
     def get_property_by_id(self, property_id: int) -> Property | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             property = session.query(Property).filter_by(
                 id=property_id).first()
             return property.to_dict() if property else None
 
     def get_property_by_name(self, name: str) -> Property | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             property = session.query(Property).filter_by(
                 name=name).first()
             return property.to_dict() if property else None
@@ -210,6 +562,9 @@ class DatabaseClient:
                         const.PROPERTY_INVALID_ATTR_MSG.format(key))
 
             try:
+                if "current_value" in kwargs:
+                    session.execute(insert(PropertyValuation).values(
+                        property_id=property_id, date=_naive_utc(datetime.now(timezone.utc)), value=kwargs["current_value"]))
                 session.commit()
             except SQLAlchemyError as e:
                 logger.info(e)
@@ -228,6 +583,8 @@ class DatabaseClient:
                     const.PROPERTY_ID_NOT_FOUND.format(property_id))
 
             try:
+                session.execute(delete(PropertyValuation).where(
+                    PropertyValuation.property_id == property_id))
                 session.delete(property)
                 session.commit()
             except SQLAlchemyError as e:
@@ -238,6 +595,208 @@ class DatabaseClient:
 
             return property.to_dict()
 
+    def delete_property_household(self, property_id: int) -> dict:
+        """Delete a property with its mortgage, owners and their transactions.
+
+        Every table is cleared with one set-based DELETE in a single
+        transaction, so the cost does not grow with per-row round trips however
+        many transactions the household has. Returns the rows deleted per table.
+        """
+        with Session(self.engine) as session:
+            property = session.get(Property, property_id)
+            if property is None:
+                raise DatabaseClientError(
+                    const.PROPERTY_ID_NOT_FOUND.format(property_id))
+
+            try:
+                mortgage_ids = session.scalars(select(Mortgage.id).where(
+                    Mortgage.property_id == property_id)).all()
+                user_ids = session.scalars(select(User.id).where(
+                    User.property_id == property_id)).all()
+
+                # Owners' payments into other mortgages change those loans' progress
+                scopes = {user_transactions_scope(user_id) for user_id in user_ids} | \
+                    {account_transactions_scope(account_id)
+                     for account_id in mortgage_ids}
+                for account_id, date in session.execute(
+                        select(Transaction.account_id, func.min(Transaction.date))
+                        .where(Transaction.user_id.in_(user_ids), Transaction.account_id.not_in(mortgage_ids))
+                        .group_by(Transaction.account_id)):
+                    self._invalidate_mortgage_progress(
+                        session, account_id, date)
+                    scopes.add(account_transactions_scope(account_id))
+                # As do other users' payments into this mortgage to their lists
+                scopes.update(user_transactions_scope(user_id) for user_id in session.scalars(
+                    select(Transaction.user_id.distinct()).where(Transaction.account_id.in_(mortgage_ids))))
+                bump_versions(session.connection(), scopes)
+
+                counts = {
+                    'transactions': session.execute(delete(Transaction).where(
+                        Transaction.account_id.in_(mortgage_ids))).rowcount + session.execute(
+                        delete(Transaction).where(Transaction.user_id.in_(user_ids))).rowcount
+                }
+                session.execute(delete(MortgageBalance).where(
+                    MortgageBalance.mortgage_id.in_(mortgage_ids)))
+                session.execute(delete(MortgageProgress).where(
+                    MortgageProgress.mortgage_id.in_(mortgage_ids)))
+                # Users of other properties keep their rows but lose the mortgage
+                session.execute(update(User).where(User.mortgage_id.in_(
+                    mortgage_ids)).where(User.property_id.is_distinct_from(property_id)).values(mortgage_id=None))
+                counts['users'] = session.execute(delete(User).where(
+                    User.id.in_(user_ids))).rowcount
+                counts['mortgages'] = session.execute(delete(Mortgage).where(
+                    Mortgage.id.in_(mortgage_ids))).rowcount
+                session.execute(delete(Account).where(
+                    Account.id.in_(mortgage_ids)))
+                counts['property_valuations'] = session.execute(delete(PropertyValuation).where(
+                    PropertyValuation.property_id == property_id)).rowcount
+                counts['properties'] = session.execute(delete(Property).where(
+                    Property.id == property_id)).rowcount
+                # One event for the household rather than one per deleted row
+                record_event(session, const.EVENT_ENTITY_PROPERTY, const.EVENT_ACTION_DELETE,
+                             {**property.to_dict(), 'household': counts}, property_id)
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.PROPERTY_DELETE_ERROR_MSG) from e
+
+            counts['transactions'] += self.archive.delete(
+                user_ids, mortgage_ids)
+            return counts
+
+    def create_property_valuation(self, property_id: int, value: float, date: datetime) -> PropertyValuation:
+        date = _naive_utc(date)
+        with Session(self.engine) as session:
+            property = session.query(Property).filter_by(
+                id=property_id).first()
+            if not property:
+                raise DatabaseClientError(
+                    const.PROPERTY_ID_NOT_FOUND.format(property_id))
+
+            valuation = PropertyValuation(
+                property_id=property_id, date=date, value=value)
+            latest = session.scalar(select(func.max(PropertyValuation.date)).where(
+                PropertyValuation.property_id == property_id))
+
+            try:
+                session.add(valuation)
+                # Backfilled history does not replace the current value
+                if latest is None or date >= latest:
+                    property.current_value = value
+                session.commit()
+            except IntegrityError as e:
+                logger.info(e)
+                session.rollback()
+                # SQLITE_DB_ENTRY_EXISTS_MSG in str(e) accounts for local db
+                if const.DB_ENTRY_EXISTS_MSG in str(e) or const.SQLITE_DB_ENTRY_EXISTS_MSG in str(e):
+                    raise DatabaseDuplicationError(
+                        const.VALUATION_CREATE_ERROR_MSG) from e
+                else:
+                    raise DatabaseClientError(
+                        const.VALUATION_CREATE_ERROR_MSG) from e
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.VALUATION_CREATE_ERROR_MSG) from e
+
+            return valuation.to_dict()
+
+    def list_property_valuations(self, property_id: int, start: datetime | None = None, end: datetime | None = None, max_points: int = const.VALUATION_MAX_POINTS) -> List[PropertyValuation]:
+        """Valuations of a property in a date range, downsampled in the database.
+
+        The range is split into `max_points` equal buckets and the last
+        valuation in each bucket is returned, so the result size is bounded
+        however many valuations are stored.
+        """
+        with Session(self.read_engine) as session:
+            in_range = [PropertyValuation.property_id == property_id]
+            if start is not None:
+                in_range.append(PropertyValuation.date >= _naive_utc(start))
+            if end is not None:
+                in_range.append(PropertyValuation.date <= _naive_utc(end))
+
+            first, last, count = session.execute(select(func.min(PropertyValuation.date), func.max(
+                PropertyValuation.date), func.count()).where(*in_range)).one()
+            if not count:
+                return []
+
+            query = select(PropertyValuation).where(*in_range)
+            if count > max_points:
+                # Widened by a second so the last valuation falls in the last bucket
+                width = ((last - first).total_seconds() + 1) / max_points
+                offset = first.replace(tzinfo=timezone.utc).timestamp()
+                # floor, since casting to an integer rounds on Postgres
+                bucket = func.floor((self._epoch_seconds(
+                    PropertyValuation.date) - offset) / width)
+                bucket_ends = select(func.max(PropertyValuation.date).label("date")).where(
+                    *in_range).group_by(bucket).subquery()
+                query = query.join(
+                    bucket_ends, PropertyValuation.date == bucket_ends.c.date)
+
+            valuations = session.scalars(
+                query.order_by(PropertyValuation.date)).all()
+            return [valuation.to_dict() for valuation in valuations]
+
+    def get_property_ledger(self, property_id: int) -> dict | None:
+        """Owners of a property and the columns of their transactions for it.
+
+        A transaction belongs to the property of the mortgage it pays into,
+        or else to its user's property, as in the archive and the change
+        feed. Returns the owners' user dicts and `user_ids`, `account_ids`,
+        `dates` (datetime64[us]) and `amounts` (int64 cents) arrays in date
+        order, merged with archived rows.
+        """
+        with Session(self.read_engine) as session:
+            if session.get(Property, property_id) is None:
+                return None
+            owners = session.scalars(select(User).where(
+                User.property_id == property_id).order_by(User.id)).all()
+            rows = session.execute(
+                select(Transaction.id, Transaction.user_id, Transaction.account_id, Transaction.date,
+                       type_coerce(Transaction.amount, BigInteger))
+                .join(User, User.id == Transaction.user_id)
+                .outerjoin(Mortgage, Mortgage.id == Transaction.account_id)
+                .where(User.property_id == property_id,
+                       func.coalesce(Mortgage.property_id, User.property_id) == property_id)).all()
+
+        owner_ids = [owner.id for owner in owners]
+        archived = self.archive.read(user_ids=owner_ids, property_id=property_id)
+        if archived.num_rows:
+            archived = archived.filter(pc.invert(pc.is_in(archived["id"], value_set=pa.array(
+                [row[0] for row in rows], pa.int64()))))
+        _, user_ids, account_ids, dates, amounts = (list(column) for column in zip(*rows)) if rows else ([], [], [], [], [])
+        user_ids += archived["user_id"].to_pylist()
+        account_ids += archived["account_id"].to_pylist()
+        dates += archived["date"].to_pylist()
+        amounts += archived["amount"].to_pylist()
+
+        dates = np.array(dates, dtype="datetime64[us]")
+        order = np.argsort(dates, kind="stable")
+        return {
+            'owners': [owner.to_dict() for owner in owners],
+            'user_ids': np.array(user_ids, dtype=np.int64)[order],
+            'account_ids': np.array(account_ids, dtype=np.int64)[order],
+            'dates': dates[order],
+            'amounts': np.array(amounts, dtype=np.int64)[order]
+        }
+
+    def _transaction_property_id(self, session: Session, user_id: int, account_id: int) -> int | None:
+        """Property whose ledger a new transaction belongs to, as in get_property_ledger()."""
+        user = session.get(User, user_id)
+        mortgage = session.get(Mortgage, account_id)
+        if user is None or mortgage is not None and mortgage.property_id not in (None, user.property_id):
+            return None
+        return user.property_id
+
+    def _epoch_seconds(self, value):
+        if self.engine.dialect.name == "sqlite":
+            # Julian day of 1970-01-01
+            return (func.julianday(value) - 2440587.5) * 86400.0
+        return extract("epoch", value)
+
     ### Transaction ###
 
     def create_transaction(self, amount: float, date: datetime, user_id: int, account_id: int) -> Transaction:
@@ -250,7 +809,12 @@ class DatabaseClient:
             )
 
             try:
+                property_id = self._transaction_property_id(
+                    session, user_id, account_id)
                 session.add(transaction)
+                # Ledgers kept in memory add the row instead of reloading
+                hooks.append(session, transaction, property_id=property_id)
+                self._invalidate_mortgage_progress(session, account_id, date)
                 session.commit()
             except IntegrityError as e:
                 logger.info(e)
@@ -264,25 +828,76 @@ class DatabaseClient:
                     const.TRANSACTION_CREATE_ERROR_MSG) from e
             return transaction.to_dict()
 
-    def get_transaction_by_id(self, transaction_id: int) -> Transaction | None:
+    def create_transactions(self, transactions: List[dict]) -> List[Transaction]:
+        """Insert many transactions with one statement, in one transaction."""
         with Session(self.engine) as session:
+            try:
+                created = session.scalars(insert(Transaction).returning(
+                    Transaction, sort_by_parameter_order=True), transactions).all()
+
+                # Replays only need to start from the earliest new payment on
+                # each account
+                earliest = {}
+                for transaction in created:
+                    date = _naive_utc(transaction.date)
+                    if transaction.account_id not in earliest or date < earliest[transaction.account_id]:
+                        earliest[transaction.account_id] = date
+                for account_id, date in earliest.items():
+                    self._invalidate_mortgage_progress(
+                        session, account_id, date)
+
+                rows = [transaction.to_dict() for transaction in created]
+                record_transaction_events(
+                    session, const.EVENT_ACTION_CREATE, rows)
+                bump_versions(session.connection(), transaction_scopes(rows))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.TRANSACTION_CREATE_ERROR_MSG) from e
+            return [transaction.to_dict() for transaction in created]
+
+    def get_transaction_by_id(self, transaction_id: int) -> Transaction | None:
+        with Session(self.read_engine) as session:
             transaction = session.query(
                 Transaction).filter_by(id=transaction_id).first()
-            return transaction.to_dict() if transaction else None
-
-    def list_transactions_by_user(self, user_id: int) -> List[Transaction]:
-        with Session(self.engine) as session:
-            transactions = session.query(
-                Transaction).filter_by(user_id=user_id).all()
-            return [transaction.to_dict() for transaction in transactions]
-
-    def list_transactions_by_account(self, account_id: int) -> List[Transaction]:
-        with Session(self.engine) as session:
+            if transaction:
+                return transaction.to_dict()
+        archived = transaction_dicts(self.archive.read(ids=[transaction_id]))
+        return archived[0] if archived else None
+
+    def list_transactions_by_user(self, user_id: int, start: date | datetime | None = None,
+                                  end: date | datetime | None = None, min_amount: float | None = None,
+                                  max_amount: float | None = None, sort: str | None = None) -> List[Transaction]:
+        """A user's transactions dated `start` to `end` with amounts in
+        `min_amount` to `max_amount`, all inclusive. A date as `start` or
+        `end` includes the whole day.
+
+        `sort` is "date" or "amount", prefixed with "-" for descending order,
+        and defaults to id order.
+        """
+        start, end = _date_range(start, end)
+        with Session(self.read_engine) as session:
+            transactions = self._filter_transactions(session.query(Transaction).filter_by(user_id=user_id),
+                                                     start, end, min_amount, max_amount, sort).all()
+            return self._with_archived([transaction.to_dict() for transaction in transactions],
+                                       self._read_archived(start, end, min_amount, max_amount, user_ids=[user_id]), sort)
+
+    def list_transactions_by_account(self, account_id: int, start: date | datetime | None = None,
+                                     end: date | datetime | None = None, min_amount: float | None = None,
+                                     max_amount: float | None = None, sort: str | None = None) -> List[Transaction]:
+        """An account's transactions, filtered and sorted as by list_transactions_by_user()."""
+        start, end = _date_range(start, end)
+        with Session(self.read_engine) as session:
             account = session.query(Account).filter_by(id=account_id).first()
             if not account:
                 raise DatabaseClientError(
                     const.ACCOUNT_ID_NOT_FOUND.format(account_id))
-            return [transaction.to_dict() for transaction in account.transactions]
+            transactions = self._filter_transactions(session.query(Transaction).filter_by(account_id=account_id),
+                                                     start, end, min_amount, max_amount, sort).all()
+            return self._with_archived([transaction.to_dict() for transaction in transactions],
+                                       self._read_archived(start, end, min_amount, max_amount, account_ids=[account_id]), sort)
 
     def update_transaction(self, transaction_id: int, **kwargs) -> Transaction:
         with Session(self.engine) as session:
@@ -290,8 +905,9 @@ class DatabaseClient:
                 Transaction).filter_by(id=transaction_id).first()
             if not transaction:
                 raise DatabaseClientError(
-                    const.TRANSACTION_ID_NOT_FOUND.format(transaction_id))
+                    self._transaction_missing_message(transaction_id))
 
+            previous_account_id, previous_date = transaction.account_id, transaction.date
             for key, value in kwargs.items():
                 if hasattr(transaction, key):
                     setattr(transaction, key, value)
@@ -300,6 +916,10 @@ class DatabaseClient:
                         const.TRANSACTION_INVALID_ATTR_MSG.format(key))
 
             try:
+                self._invalidate_mortgage_progress(
+                    session, previous_account_id, previous_date)
+                self._invalidate_mortgage_progress(
+                    session, transaction.account_id, transaction.date)
                 session.commit()
             except SQLAlchemyError as e:
                 logger.info(e)
@@ -315,10 +935,12 @@ class DatabaseClient:
                 Transaction).filter_by(id=transaction_id).first()
             if not transaction:
                 raise DatabaseClientError(
-                    const.TRANSACTION_ID_NOT_FOUND.format(transaction_id))
+                    self._transaction_missing_message(transaction_id))
 
             try:
                 session.delete(transaction)
+                self._invalidate_mortgage_progress(
+                    session, transaction.account_id, transaction.date)
                 session.commit()
             except SQLAlchemyError as e:
                 logger.info(e)
@@ -329,9 +951,252 @@ class DatabaseClient:
             return transaction.to_dict()
 
     def list_transactions(self) -> List[Transaction]:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             transactions = session.query(Transaction).all()
-            return [transaction.to_dict() for transaction in transactions]
+            return self._with_archived([transaction.to_dict() for transaction in transactions],
+                                       self.archive.read())
+
+    def iter_transaction_batches(self, property_id: int | None = None, user_id: int | None = None, start: datetime | None = None,
+                                 end: datetime | None = None, batch_size: int = const.EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+        """Yield (id, amount, date, user_id, account_id) rows in batches.
+
+        Rows are read through a server-side cursor where the driver supports
+        one, so only one batch is held in memory at a time.
+        """
+        query = select(Transaction.id, Transaction.amount, Transaction.date,
+                       Transaction.user_id, Transaction.account_id)
+        if property_id is not None:
+            # A property's transactions are those of its owners and those
+            # posted against its mortgage
+            query = query.where(or_(
+                Transaction.user_id.in_(
+                    select(User.id).where(User.property_id == property_id)),
+                Transaction.account_id.in_(
+                    select(Mortgage.id).where(Mortgage.property_id == property_id))
+            ))
+        if user_id is not None:
+            query = query.where(Transaction.user_id == user_id)
+        if start is not None:
+            query = query.where(Transaction.date >= _naive_utc(start))
+        if end is not None:
+            query = query.where(Transaction.date <= _naive_utc(end))
+
+        with Session(self.read_engine) as session:
+            # Archived rows are the oldest, so they come first
+            if property_id is not None:
+                archived = self.archive.read(
+                    user_ids=session.scalars(select(User.id).where(
+                        User.property_id == property_id)).all(),
+                    account_ids=session.scalars(select(Mortgage.id).where(Mortgage.property_id == property_id)).all(),
+                    start=start and _naive_utc(start), end=end and _naive_utc(end))
+                if user_id is not None:
+                    archived = archived.filter(pc.equal(archived["user_id"], user_id))
+            else:
+                archived = self.archive.read(user_ids=None if user_id is None else [user_id],
+                                             start=start and _naive_utc(start), end=end and _naive_utc(end))
+            for offset in range(0, archived.num_rows, batch_size):
+                yield _archived_rows(archived.slice(offset, batch_size))
+
+            result = session.execute(query.order_by(
+                Transaction.id).execution_options(yield_per=batch_size))
+            for partition in result.partitions():
+                yield partition
+
+    def archive_transactions(self, before: datetime) -> dict:
+        """Move transactions dated before `before` into the archive.
+
+        Rows are grouped into one file per property and year, the property
+        being that of the mortgage paid into, or else of the paying user.
+        Transactions belonging to no property stay in the database.
+        """
+        before = _naive_utc(before)
+        property_id = func.coalesce(Mortgage.property_id, User.property_id)
+        query = select(Transaction.id, type_coerce(Transaction.amount, BigInteger), Transaction.date,
+                       Transaction.user_id, Transaction.account_id, property_id) \
+            .join(User, User.id == Transaction.user_id) \
+            .outerjoin(Mortgage, Mortgage.id == Transaction.account_id) \
+            .where(Transaction.date < before, property_id.is_not(None))
+
+        with Session(self.engine) as session:
+            rows = session.execute(query).all()
+            if not rows:
+                return {'transactions': 0, 'files': 0}
+
+            columns = list(zip(*rows))
+            table = pa.table([pa.array(column, type=field.type) for column, field in zip(columns, ARCHIVE_SCHEMA)],
+                             schema=ARCHIVE_SCHEMA)
+            # Sorted by property and year, each group is one contiguous slice
+            property_ids = np.asarray(columns[5], dtype=np.int64)
+            years = pc.year(table["date"]).to_numpy()
+            order = np.lexsort((years, property_ids))
+            table, property_ids, years = table.take(
+                order), property_ids[order], years[order]
+            bounds = np.flatnonzero((np.diff(property_ids) != 0) | (
+                np.diff(years) != 0)) + 1
+            groups = {(int(property_ids[first]), int(years[first])): table.slice(first, last - first)
+                      for first, last in zip(np.r_[0, bounds], np.r_[bounds, len(table)])}
+            self.archive.write(groups)
+
+            # Deleted only once the files hold the rows
+            ids = table["id"].to_pylist()
+            try:
+                for offset in range(0, len(ids), const.ARCHIVE_DELETE_CHUNK_SIZE):
+                    session.execute(delete(Transaction).where(Transaction.id.in_(
+                        ids[offset:offset + const.ARCHIVE_DELETE_CHUNK_SIZE])))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.TRANSACTION_ARCHIVE_ERROR_MSG) from e
+
+            return {'transactions': len(ids), 'files': len(groups)}
+
+    def _filter_transactions(self, query, start: datetime | None, end: datetime | None,
+                             min_amount: float | None, max_amount: float | None, sort: str | None):
+        # Served by the (user_id, date) and (account_id, date) indexes
+        if start is not None:
+            query = query.filter(Transaction.date >= _naive_utc(start))
+        if end is not None:
+            query = query.filter(Transaction.date <= _naive_utc(end))
+        if min_amount is not None:
+            query = query.filter(Transaction.amount >= min_amount)
+        if max_amount is not None:
+            query = query.filter(Transaction.amount <= max_amount)
+        if sort is None:
+            return query.order_by(Transaction.id)
+        if sort.lstrip("-") not in const.TRANSACTION_SORT_FIELDS:
+            raise DatabaseClientError(
+                const.TRANSACTION_SORT_INVALID_MSG.format(sort))
+        column = getattr(Transaction, sort.lstrip("-"))
+        return query.order_by(column.desc() if sort.startswith("-") else column, Transaction.id)
+
+    def _read_archived(self, start: datetime | None, end: datetime | None, min_amount: float | None,
+                       max_amount: float | None, **filters):
+        archived = self.archive.read(start=start and _naive_utc(start), end=end and _naive_utc(end), **filters)
+        if min_amount is not None:
+            archived = archived.filter(pc.greater_equal(
+                archived["amount"], to_cents(min_amount)))
+        if max_amount is not None:
+            archived = archived.filter(pc.less_equal(
+                archived["amount"], to_cents(max_amount)))
+        return archived
+
+    def _with_archived(self, transactions: List[dict], archived, sort: str | None = None) -> List[dict]:
+        if not archived.num_rows:
+            return transactions
+        # Archived rows first, skipping any the database still holds
+        hot_ids = {transaction['id'] for transaction in transactions}
+        merged = [transaction for transaction in transaction_dicts(archived)
+                  if transaction['id'] not in hot_ids] + transactions
+        if sort is None:
+            return sorted(merged, key=lambda transaction: transaction['id'])
+        # Stable sorts, so ties stay in id order
+        merged.sort(key=lambda transaction: transaction['id'])
+        merged.sort(key=lambda transaction: transaction[sort.lstrip("-")], reverse=sort.startswith("-"))
+        return merged
+
+    def _transaction_missing_message(self, transaction_id: int) -> str:
+        if self.archive.read(ids=[transaction_id]).num_rows:
+            return const.TRANSACTION_ARCHIVED_MSG.format(transaction_id)
+        return const.TRANSACTION_ID_NOT_FOUND.format(transaction_id)
+
+    def create_transaction_partitions(self, first: datetime | None = None, last: datetime | None = None) -> List[str]:
+        """Create the missing Postgres partitions for transactions dated `first` to `last`.
+
+        Defaults to the current partition and those created in advance of it.
+        """
+        first = _naive_utc(first or datetime.now(timezone.utc))
+        last = _naive_utc(last) if last else partitions_ahead_end(first)
+        with self.engine.begin() as connection:
+            try:
+                return create_transaction_partitions(connection, first, last)
+            except SQLAlchemyError as e:
+                logger.info(e)
+                raise DatabaseClientError(
+                    const.TRANSACTION_PARTITION_ERROR_MSG) from e
+
+    def list_transaction_partitions(self) -> List[dict]:
+        with self.read_engine.connect() as connection:
+            return list_transaction_partitions(connection)
+
+    def detach_transaction_partition(self, name: str):
+        if self.engine.dialect.name != "postgresql":
+            raise DatabaseClientError(
+                const.TRANSACTION_PARTITIONS_UNSUPPORTED_MSG)
+        with self.engine.begin() as connection:
+            if name not in {partition['name'] for partition in list_transaction_partitions(connection)}:
+                raise DatabaseClientError(
+                    const.TRANSACTION_PARTITION_NOT_FOUND.format(name))
+            try:
+                detach_transaction_partition(connection, name)
+            except SQLAlchemyError as e:
+                logger.info(e)
+                raise DatabaseClientError(
+                    const.TRANSACTION_PARTITION_ERROR_MSG) from e
+
+    ### Search ###
+
+    def search(self, query: str, limit: int = const.SEARCH_DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+        """Properties and users whose name, address or email match `query`.
+
+        Prefix matches come first, then substring matches, then fuzzy matches
+        ordered by how many trigrams they share with the query.
+        """
+        query = query.strip()
+        prefix = like_escape(query) + "%"
+        contains = "%" + like_escape(query) + "%"
+
+        with Session(self.read_engine) as session:
+            if self.engine.dialect.name == "postgresql":
+                rows = session.execute(self._postgres_search(
+                    query, prefix, contains).limit(limit).offset(offset)).all()
+            else:
+                rows = [(PROPERTY_KIND if rowid % 2 == 0 else USER_KIND, rowid // 2, name, detail)
+                        for rowid, name, detail in session.execute(
+                            self._sqlite_search(query), {'match': trigram_match(query), 'prefix': prefix,
+                                                         'contains': contains, 'limit': limit, 'offset': offset})]
+
+        results = []
+        for kind, id, name, detail in rows:
+            if kind == PROPERTY_KIND:
+                results.append({'type': kind, 'id': id,
+                               'name': name, 'address': detail})
+            else:
+                results.append({'type': kind, 'id': id,
+                               'user_name': name, 'email': detail})
+        return results
+
+    def _postgres_search(self, query: str, prefix: str, contains: str):
+        def matches(kind, table, name, detail):
+            return select(
+                literal(kind).label("type"), table.id, name.label(
+                    "name"), detail.label("detail"),
+                or_(name.ilike(prefix, escape="\\"), detail.ilike(
+                    prefix, escape="\\")).label("is_prefix"),
+                or_(name.ilike(contains, escape="\\"), detail.ilike(
+                    contains, escape="\\")).label("is_substring"),
+                func.greatest(func.similarity(name, query), func.similarity(
+                    detail, query)).label("score")
+            ).where(or_(name.op("%")(query), detail.op("%")(query),
+                        name.ilike(contains, escape="\\"), detail.ilike(contains, escape="\\")))
+
+        candidates = union_all(matches(PROPERTY_KIND, Property, Property.name, Property.address),
+                               matches(USER_KIND, User, User.user_name, User.email)).subquery()
+        return select(candidates.c.type, candidates.c.id, candidates.c.name, candidates.c.detail).order_by(
+            desc(candidates.c.is_prefix), desc(candidates.c.is_substring), desc(candidates.c.score),
+            candidates.c.type, candidates.c.id)
+
+    def _sqlite_search(self, query: str):
+        # Queries shorter than a trigram can only be matched as prefixes
+        where = f"{SEARCH_TABLE} MATCH :match" if trigram_match(query) else \
+            "name LIKE :prefix ESCAPE '\\' OR detail LIKE :prefix ESCAPE '\\'"
+        return text(f"""
+            SELECT rowid, name, detail FROM {SEARCH_TABLE} WHERE {where}
+            ORDER BY name LIKE :prefix ESCAPE '\\' OR detail LIKE :prefix ESCAPE '\\' DESC,
+                     name LIKE :contains ESCAPE '\\' OR detail LIKE :contains ESCAPE '\\' DESC,
+                     rank, rowid
+            LIMIT :limit OFFSET :offset""")
 
     ### User ###
 
@@ -368,12 +1233,12 @@ class DatabaseClient:
             return user.to_dict()
 
     def get_user_by_name(self, user_name: str) -> User | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             user = session.query(User).filter_by(user_name=user_name).first()
             return user.to_dict() if user else None
 
     def get_user_by_id(self, user_id: int) -> User | None:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             user = session.query(User).filter_by(id=user_id).first()
             return user.to_dict() if user else None
 
@@ -420,6 +1285,243 @@ class DatabaseClient:
             return user.to_dict()
 
     def list_users(self) -> List[User]:
-        with Session(self.engine) as session:
+        with Session(self.read_engine) as session:
             users = session.query(User).all()
             return [user.to_dict() for user in users]
+
+    ### Idempotency Key ###
+
+    def create_idempotency_key(self, key: str, request_hash: str) -> IdempotencyKey:
+        with Session(self.engine) as session:
+            idempotency_key = IdempotencyKey(
+                key=key,
+                request_hash=request_hash,
+                created_at=datetime.now(timezone.utc)
+            )
+
+            try:
+                session.add(idempotency_key)
+                session.commit()
+            except IntegrityError as e:
+                logger.info(e)
+                session.rollback()
+                # SQLITE_DB_ENTRY_EXISTS_MSG in str(e) accounts for local db
+                if const.DB_ENTRY_EXISTS_MSG in str(e) or const.SQLITE_DB_ENTRY_EXISTS_MSG in str(e):
+                    raise DatabaseDuplicationError(
+                        const.IDEMPOTENCY_KEY_EXISTS_MSG) from e
+                else:
+                    raise DatabaseClientError(
+                        const.IDEMPOTENCY_KEY_CREATE_ERROR_MSG) from e
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.IDEMPOTENCY_KEY_CREATE_ERROR_MSG) from e
+
+            return idempotency_key.to_dict()
+
+    def get_idempotency_key(self, key: str) -> IdempotencyKey | None:
+        with Session(self.read_engine) as session:
+            idempotency_key = session.query(
+                IdempotencyKey).filter_by(key=key).first()
+            return idempotency_key.to_dict() if idempotency_key else None
+
+    def update_idempotency_key(self, key: str, status_code: int, response: str) -> IdempotencyKey:
+        with Session(self.engine) as session:
+            idempotency_key = session.query(
+                IdempotencyKey).filter_by(key=key).first()
+            if not idempotency_key:
+                raise DatabaseClientError(
+                    const.IDEMPOTENCY_KEY_NOT_FOUND.format(key))
+
+            idempotency_key.status_code = status_code
+            idempotency_key.response = response
+
+            try:
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.IDEMPOTENCY_KEY_UPDATE_ERROR_MSG) from e
+
+            return idempotency_key.to_dict()
+
+    def delete_idempotency_key(self, key: str):
+        with Session(self.engine) as session:
+            try:
+                session.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.IDEMPOTENCY_KEY_DELETE_ERROR_MSG) from e
+
+    def delete_expired_idempotency_keys(self, created_before: datetime) -> int:
+        with Session(self.engine) as session:
+            try:
+                result = session.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.created_at < created_before))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.IDEMPOTENCY_KEY_DELETE_ERROR_MSG) from e
+
+            return result.rowcount
+
+    ### Collection Version ###
+
+    def get_collection_version(self, scope: str) -> int:
+        with Session(self.read_engine) as session:
+            return session.scalar(select(CollectionVersion.version).where(CollectionVersion.scope == scope)) or 0
+
+    def get_user_transactions_version(self, user_id: int) -> int:
+        return self.get_collection_version(user_transactions_scope(user_id))
+
+    def get_account_transactions_version(self, account_id: int) -> int:
+        return self.get_collection_version(account_transactions_scope(account_id))
+
+    ### Event ###
+
+    def list_events(self, after_id: int = 0, property_id: int | None = None, limit: int = const.EVENT_BATCH_SIZE) -> List[Event]:
+        with Session(self.read_engine) as session:
+            query = select(Event).where(Event.id > after_id)
+            if property_id is not None:
+                query = query.where(Event.property_id == property_id)
+            events = session.scalars(
+                query.order_by(Event.id).limit(limit)).all()
+            return [event.to_dict() for event in events]
+
+    def get_latest_event_id(self) -> int:
+        with Session(self.read_engine) as session:
+            return session.scalar(select(func.max(Event.id))) or 0
+
+    def delete_expired_events(self, created_before: datetime) -> int:
+        with Session(self.engine) as session:
+            try:
+                result = session.execute(delete(Event).where(
+                    Event.created_at < created_before))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.EVENT_DELETE_ERROR_MSG) from e
+
+            return result.rowcount
+
+    ### Job ###
+
+    def create_job(self, job_type: str, params: dict) -> Job:
+        with Session(self.engine) as session:
+            job = Job(
+                type=job_type,
+                status=const.JOB_STATUS_QUEUED,
+                params=json.dumps(params),
+                created_at=datetime.now(timezone.utc)
+            )
+
+            try:
+                session.add(job)
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.JOB_CREATE_ERROR_MSG) from e
+
+            return job.to_dict()
+
+    def get_job_by_id(self, job_id: int) -> Job | None:
+        with Session(self.read_engine) as session:
+            job = session.query(Job).filter_by(id=job_id).first()
+            return job.to_dict() if job else None
+
+    def claim_job(self, job_id: int, runner_id: str) -> Job | None:
+        # The status check makes the claim atomic when several runners share a database
+        now = datetime.now(timezone.utc)
+        with Session(self.engine) as session:
+            try:
+                result = session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == const.JOB_STATUS_QUEUED)
+                    .values(status=const.JOB_STATUS_RUNNING, runner_id=runner_id, started_at=now, heartbeat_at=now))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.JOB_UPDATE_ERROR_MSG) from e
+
+            if result.rowcount != 1:
+                return None
+
+            job = session.query(Job).filter_by(id=job_id).first()
+            return job.to_dict() if job else None
+
+    def update_job(self, job_id: int, **kwargs) -> Job:
+        with Session(self.engine) as session:
+            job = session.query(Job).filter_by(id=job_id).first()
+            if not job:
+                raise DatabaseClientError(
+                    const.JOB_ID_NOT_FOUND.format(job_id))
+
+            for key, value in kwargs.items():
+                if key in ("params", "result"):
+                    value = json.dumps(value)
+                if hasattr(job, key):
+                    setattr(job, key, value)
+                else:
+                    raise DatabaseClientError(
+                        const.JOB_INVALID_ATTR_MSG.format(key))
+
+            try:
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.JOB_UPDATE_ERROR_MSG) from e
+
+            return job.to_dict()
+
+    def heartbeat_jobs(self, runner_id: str) -> int:
+        with Session(self.engine) as session:
+            try:
+                result = session.execute(
+                    update(Job)
+                    .where(Job.runner_id == runner_id, Job.status == const.JOB_STATUS_RUNNING)
+                    .values(heartbeat_at=datetime.now(timezone.utc)))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.JOB_UPDATE_ERROR_MSG) from e
+
+            return result.rowcount
+
+    def requeue_stale_jobs(self, heartbeat_before: datetime) -> int:
+        with Session(self.engine) as session:
+            try:
+                result = session.execute(
+                    update(Job)
+                    .where(Job.status == const.JOB_STATUS_RUNNING, Job.heartbeat_at < heartbeat_before)
+                    .values(status=const.JOB_STATUS_QUEUED, runner_id=None))
+                session.commit()
+            except SQLAlchemyError as e:
+                logger.info(e)
+                session.rollback()
+                raise DatabaseClientError(
+                    const.JOB_UPDATE_ERROR_MSG) from e
+
+            return result.rowcount
+
+    def list_queued_job_ids(self) -> List[int]:
+        with Session(self.read_engine) as session:
+            return list(session.scalars(
+                select(Job.id).where(Job.status == const.JOB_STATUS_QUEUED).order_by(Job.id)))
@@ -0,0 +1,166 @@
+"""Change events behind the /events feed.
+
+Mapper hooks insert an Event row in the same transaction as every ORM insert,
+update and delete of a property, mortgage, user or transaction, so an event
+commits or rolls back with the change it describes. Writes that bypass the
+unit of work record their events directly. Once a session that recorded
+events has committed, feeds waiting in this process are woken. Feeds in other
+processes find the rows on their next poll.
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, event, func, insert, select
+from sqlalchemy.orm import Session
+
+import homestake.constants as const
+from homestake.database.models import Event, Mortgage, Property, Transaction, User
+from homestake.logger import logger
+
+# Session.info flag set while a transaction holds uncommitted events
+PENDING_KEY = "events_pending"
+
+MORTGAGES = Mortgage.__table__
+USERS = User.__table__
+
+
+def _event_values(property_id):
+    return insert(Event).values(
+        entity=bindparam("event_entity"),
+        action=bindparam("event_action"),
+        entity_id=bindparam("event_entity_id"),
+        property_id=property_id,
+        data=bindparam("event_data"),
+        created_at=bindparam("event_created_at"))
+
+
+INSERT_EVENT = _event_values(bindparam("event_property_id"))
+# A transaction belongs to the property of the mortgage it was posted to,
+# falling back to the property its user owns a stake in
+INSERT_TRANSACTION_EVENT = _event_values(func.coalesce(
+    select(MORTGAGES.c.property_id).where(
+        MORTGAGES.c.id == bindparam("account_id")).scalar_subquery(),
+    select(USERS.c.property_id).where(
+        USERS.c.id == bindparam("user_id")).scalar_subquery()))
+
+
+def _parameters(entity: str, action: str, data: dict) -> dict:
+    return {
+        'event_entity': entity,
+        'event_action': action,
+        'event_entity_id': data['id'],
+        'event_data': json.dumps(data),
+        'event_created_at': datetime.now(timezone.utc)
+    }
+
+
+# Events go through the session's connection rather than session.execute(),
+# which also works from inside a flush
+def record_event(session: Session, entity: str, action: str, data: dict, property_id: int | None):
+    session.connection().execute(INSERT_EVENT, {
+        **_parameters(entity, action, data), 'event_property_id': property_id})
+    session.info[PENDING_KEY] = True
+
+
+def record_transaction_events(session: Session, action: str, transactions: list[dict]):
+    if not transactions:
+        return
+    session.connection().execute(INSERT_TRANSACTION_EVENT, [{
+        **_parameters(const.EVENT_ENTITY_TRANSACTION, action, transaction),
+        'account_id': transaction['account_id'],
+        'user_id': transaction['user_id']
+    } for transaction in transactions])
+    session.info[PENDING_KEY] = True
+
+
+def _record_target(action: str, target):
+    session = Session.object_session(target)
+    if isinstance(target, Transaction):
+        record_transaction_events(session, action, [target.to_dict()])
+    elif isinstance(target, Property):
+        record_event(session, const.EVENT_ENTITY_PROPERTY,
+                     action, target.to_dict(), target.id)
+    elif isinstance(target, Mortgage):
+        record_event(session, const.EVENT_ENTITY_MORTGAGE,
+                     action, target.to_dict(), target.property_id)
+    elif isinstance(target, User):
+        record_event(session, const.EVENT_ENTITY_USER,
+                     action, target.to_dict(), target.property_id)
+
+
+for model in (Mortgage, Property, Transaction, User):
+    for hook, action in (("after_insert", const.EVENT_ACTION_CREATE), ("after_update", const.EVENT_ACTION_UPDATE),
+                         ("after_delete", const.EVENT_ACTION_DELETE)):
+        event.listen(model, hook, lambda mapper, connection, target,
+                     action=action: _record_target(action, target))
+
+
+class Subscription:
+    """Lets one feed wait until events are committed in this process.
+
+    Feeds subscribe before they first query, so a commit landing between the
+    query and the wait still wakes them.
+    """
+
+    def __init__(self, notifier: "ChangeNotifier"):
+        self.notifier = notifier
+        self.loop = asyncio.get_running_loop()
+        self.waiter = asyncio.Event()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a commit, returning False if `timeout` passed first."""
+        try:
+            await asyncio.wait_for(self.waiter.wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            self.waiter.clear()
+
+    def close(self):
+        self.notifier.unsubscribe(self)
+
+
+class ChangeNotifier:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions: set[Subscription] = set()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def notify(self):
+        # Commits happen on threadpool threads, while feeds wait on the loop
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.waiter.set)
+            except RuntimeError as e:
+                logger.info(e)
+                self.unsubscribe(subscription)
+
+
+NOTIFIER = ChangeNotifier()
+
+
+# after_commit runs once the database has committed, so woken feeds can
+# already read the new rows
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session: Session):
+    if session.info.pop(PENDING_KEY, False):
+        NOTIFIER.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
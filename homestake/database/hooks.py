@@ -0,0 +1,148 @@
+"""Table-level write notifications.
+
+Sessions collect the names of the tables they write, from flushed ORM objects
+and from insert, update and delete statements, and hand them to every
+registered listener once the transaction has committed. Rolled back writes
+are never reported.
+
+A writer can also mark the rows it inserts as appended. Listeners registered
+with on_rows_appended() then receive those rows, and the tables written other
+than by appending, so caches holding a table's rows can add to themselves
+instead of starting over.
+
+Listeners registered with on_commit_started() and on_commit_finished() are
+told which tables a commit writes before it is sent and once it has been
+reported or rolled back. A cache adding appended rows to what it loaded uses
+them to not store a load that raced a commit, since the load may already hold
+rows about to be appended.
+"""
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+
+from homestake.logger import logger
+
+# Session.info key holding the tables written in the current transaction
+WRITTEN_TABLES_KEY = "written_tables"
+# Session.info keys holding the instances marked as appended, the rows they
+# were flushed as, and the tables written by anything else
+APPENDING_KEY = "appending"
+APPENDED_ROWS_KEY = "appended_rows"
+REPLACED_TABLES_KEY = "replaced_tables"
+# Session.info key holding the tables of a commit reported as started
+COMMITTING_KEY = "committing_tables"
+
+LISTENERS: list[Callable[[set[str]], None]] = []
+APPEND_LISTENERS: list[Callable[[set[str], dict[str, list[dict]]], None]] = []
+COMMIT_STARTED_LISTENERS: list[Callable[[set[str]], None]] = []
+COMMIT_FINISHED_LISTENERS: list[Callable[[set[str]], None]] = []
+
+
+def on_tables_written(listener: Callable[[set[str]], None]):
+    LISTENERS.append(listener)
+    return listener
+
+
+def on_rows_appended(listener: Callable[[set[str], dict[str, list[dict]]], None]):
+    APPEND_LISTENERS.append(listener)
+    return listener
+
+
+def on_commit_started(listener: Callable[[set[str]], None]):
+    COMMIT_STARTED_LISTENERS.append(listener)
+    return listener
+
+
+def on_commit_finished(listener: Callable[[set[str]], None]):
+    COMMIT_FINISHED_LISTENERS.append(listener)
+    return listener
+
+
+def append(session: Session, instance, **extra):
+    """Mark a new instance as appended, reporting it with `extra` added to its columns."""
+    session.info.setdefault(APPENDING_KEY, []).append((instance, extra))
+
+
+def _written(session: Session) -> set[str]:
+    return session.info.setdefault(WRITTEN_TABLES_KEY, set())
+
+
+def _replaced(session: Session) -> set[str]:
+    return session.info.setdefault(REPLACED_TABLES_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context: UOWTransaction):
+    written = _written(session)
+    replaced = _replaced(session)
+    appending = {id(instance): extra for instance, extra in session.info.pop(APPENDING_KEY, ())}
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        mapper = type(instance).__mapper__
+        # Joined inheritance writes to the parent tables as well
+        for table in mapper.tables:
+            written.add(table.name)
+        if instance in session.new and id(instance) in appending:
+            session.info.setdefault(APPENDED_ROWS_KEY, {}).setdefault(mapper.local_table.name, []).append({
+                **{column.key: getattr(instance, column.key) for column in mapper.column_attrs},
+                **appending[id(instance)]})
+        else:
+            replaced.update(table.name for table in mapper.tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(orm_execute_state: ORMExecuteState):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    session = orm_execute_state.session
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        tables = {table.name for table in mapper.tables}
+    else:
+        tables = {orm_execute_state.statement.table.name}
+    _written(session).update(tables)
+    _replaced(session).update(tables)
+
+
+def _notify(listeners: list[Callable], *args):
+    for listener in listeners:
+        try:
+            listener(*args)
+        except Exception as e:
+            logger.info(e)
+
+
+def _finish_commit(session: Session):
+    committing = session.info.pop(COMMITTING_KEY, None)
+    if committing:
+        _notify(COMMIT_FINISHED_LISTENERS, committing)
+
+
+@event.listens_for(Session, "before_commit")
+def _start_commit(session: Session):
+    # Runs before the final flush, so objects still pending count as well
+    committing = set(_written(session))
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        committing.update(table.name for table in type(instance).__mapper__.tables)
+    if committing and COMMITTING_KEY not in session.info:
+        session.info[COMMITTING_KEY] = committing
+        _notify(COMMIT_STARTED_LISTENERS, committing)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_written(session: Session):
+    written = session.info.pop(WRITTEN_TABLES_KEY, None)
+    replaced = session.info.pop(REPLACED_TABLES_KEY, set())
+    appended = session.info.pop(APPENDED_ROWS_KEY, {})
+    session.info.pop(APPENDING_KEY, None)
+    if written:
+        _notify(LISTENERS, written)
+        _notify(APPEND_LISTENERS, replaced, appended)
+    _finish_commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written(session: Session):
+    for key in (WRITTEN_TABLES_KEY, REPLACED_TABLES_KEY, APPENDED_ROWS_KEY, APPENDING_KEY):
+        session.info.pop(key, None)
+    _finish_commit(session)
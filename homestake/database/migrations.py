@@ -0,0 +1,78 @@
+"""Schema changes to databases created by earlier versions.
+
+create_all() only creates missing tables, so changes to existing ones are
+applied here, in order, and recorded in the schema_migrations table. Each
+migration checks the schema before changing it, so databases created by the
+current models skip straight past it.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import Connection, Engine, Integer, inspect, select
+
+from homestake.database.models import SchemaMigration, Transaction
+from homestake.database.partitions import partition_transactions
+from homestake.logger import logger
+
+# Columns holding money, stored as floating point units before migration 1
+MONEY_COLUMNS = (
+    ("mortgages", "loan_amount"),
+    ("properties", "purchase_price"),
+    ("properties", "current_value"),
+    ("property_valuations", "value"),
+    ("transactions", "amount"),
+)
+
+# Serializes migrations between processes starting against the same database
+POSTGRES_LOCK_ID = 4207
+
+
+def money_to_cents(connection: Connection):
+    columns = {(table, column['name']): column['type']
+               for table in {table for table, _ in MONEY_COLUMNS}
+               for column in inspect(connection).get_columns(table)}
+    for table, column in MONEY_COLUMNS:
+        if isinstance(columns[(table, column)], Integer):
+            continue
+        logger.info(f"Converting {table}.{column} to cents")
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT USING round({column} * 100)::bigint")
+        else:
+            # SQLite cannot change a column's type, so the values are copied
+            # into a new column that then takes the old one's place
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN {column}_cents BIGINT")
+            connection.exec_driver_sql(
+                f"UPDATE {table} SET {column}_cents = CAST(ROUND({column} * 100) AS INTEGER)")
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} DROP COLUMN {column}")
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} RENAME COLUMN {column}_cents TO {column}")
+
+
+def transaction_date_indexes(connection: Connection):
+    # create_all() skips the indexes of tables that already exist
+    for index in Transaction.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+MIGRATIONS = (
+    (1, "money_to_cents", money_to_cents),
+    (2, "partition_transactions", partition_transactions),
+    (3, "transaction_date_indexes", transaction_date_indexes),
+)
+
+
+def run_migrations(engine: Engine):
+    """Apply the migrations the database has not recorded yet."""
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"SELECT pg_advisory_xact_lock({POSTGRES_LOCK_ID})")
+        applied = set(connection.scalars(select(SchemaMigration.version)))
+        for version, name, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=version, name=name, applied_at=datetime.now(timezone.utc)))
@@ -1,15 +1,29 @@
 from __future__ import annotations
+import json
 from typing import List, Optional
 
 from datetime import datetime
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import BigInteger, ForeignKey, Index, String, Text, TypeDecorator
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 
 import homestake.constants as constants
+from homestake.money import from_cents, to_cents
 
 Base = declarative_base()
 
 
+class Cents(TypeDecorator):
+    """Money stored as a whole number of cents, read and written in units."""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return from_cents(value)
+
+
 class Account(Base):
     __tablename__ = 'accounts'
     __mapper_args__ = {
@@ -31,6 +45,68 @@ class Account(Base):
         }
 
 
+class CollectionVersion(Base):
+    __tablename__ = 'collection_versions'
+
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int]
+
+
+class Event(Base):
+    __tablename__ = 'events'
+    # Feeds filtered by property read forward from an id within one property
+    __table_args__ = (Index('ix_events_property_id_id', 'property_id', 'id'),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    entity: Mapped[str] = mapped_column(String(constants.NAME_LENGTH))
+    action: Mapped[str] = mapped_column(String(constants.NAME_LENGTH))
+    entity_id: Mapped[int]
+    property_id: Mapped[Optional[int]]
+    data: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'action': self.action,
+            'entity_id': self.entity_id,
+            'property_id': self.property_id,
+            'data': json.loads(self.data) if self.data else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    type: Mapped[str] = mapped_column(String(constants.NAME_LENGTH))
+    status: Mapped[str] = mapped_column(
+        String(constants.NAME_LENGTH), index=True)
+    params: Mapped[str] = mapped_column(Text)
+    result: Mapped[Optional[str]] = mapped_column(Text)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    runner_id: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime]
+    started_at: Mapped[Optional[datetime]]
+    finished_at: Mapped[Optional[datetime]]
+    heartbeat_at: Mapped[Optional[datetime]]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'params': json.loads(self.params) if self.params else {},
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class Mortgage(Account):
     __tablename__ = 'mortgages'
     __mapper_args__ = {
@@ -41,7 +117,7 @@ class Mortgage(Account):
         ForeignKey("accounts.id"), primary_key=True)
     lender: Mapped[str] = mapped_column(
         String(constants.NAME_LENGTH), index=True)
-    loan_amount: Mapped[float]
+    loan_amount: Mapped[float] = mapped_column(Cents)
     interest_rate: Mapped[int]
     term: Mapped[int]
     start_date: Mapped[datetime]
@@ -69,6 +145,29 @@ class Mortgage(Account):
         return model_dict
 
 
+class MortgageBalance(Base):
+    __tablename__ = 'mortgage_balances'
+
+    mortgage_id: Mapped[int] = mapped_column(
+        ForeignKey('mortgages.id'), primary_key=True)
+    period: Mapped[int] = mapped_column(primary_key=True)
+    balance: Mapped[float]
+    principal_paid: Mapped[float]
+    interest_paid: Mapped[float]
+
+
+class MortgageProgress(Base):
+    __tablename__ = 'mortgage_progress'
+
+    mortgage_id: Mapped[int] = mapped_column(
+        ForeignKey('mortgages.id'), primary_key=True)
+    # Last completed payment period that has a balance snapshot
+    period: Mapped[int]
+    # Earliest transaction date changed since the last computation
+    dirty_from: Mapped[Optional[datetime]]
+    updated_at: Mapped[datetime]
+
+
 class Property(Base):
     __tablename__ = 'properties'
 
@@ -77,9 +176,9 @@ class Property(Base):
         String(constants.NAME_LENGTH), unique=True, index=True)
     address: Mapped[str] = mapped_column(
         String(constants.ADDR_LENGTH), unique=True, index=True)
-    purchase_price: Mapped[float]
+    purchase_price: Mapped[float] = mapped_column(Cents)
     purchase_date: Mapped[datetime]
-    current_value: Mapped[float]
+    current_value: Mapped[float] = mapped_column(Cents)
 
     mortgage: Mapped[Optional["Mortgage"]] = relationship()
     users: Mapped[Optional[List["User"]]] = relationship()
@@ -95,11 +194,40 @@ class Property(Base):
         }
 
 
+class PropertyValuation(Base):
+    __tablename__ = 'property_valuations'
+    # The (property_id, date) primary key is the only index, and on SQLite the
+    # rows are stored in it directly
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    property_id: Mapped[int] = mapped_column(
+        ForeignKey('properties.id'), primary_key=True)
+    date: Mapped[datetime] = mapped_column(primary_key=True)
+    value: Mapped[float] = mapped_column(Cents)
+
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'value': self.value
+        }
+
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+
+    version: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(constants.NAME_LENGTH))
+    applied_at: Mapped[datetime]
+
+
 class Transaction(Base):
     __tablename__ = 'transactions'
+    # Per user and per account lists are filtered and sorted by date
+    __table_args__ = (Index('ix_transactions_user_id_date', 'user_id', 'date'),
+                      Index('ix_transactions_account_id_date', 'account_id', 'date'))
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    amount: Mapped[float]
+    amount: Mapped[float] = mapped_column(Cents)
     date: Mapped[datetime]
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
     account_id: Mapped[int] = mapped_column(
@@ -145,3 +273,23 @@ class User(Base):
             model_dict['property_id'] = self.property_id
 
         return model_dict
+
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+
+    key: Mapped[str] = mapped_column(
+        String(constants.IDEMPOTENCY_KEY_LENGTH), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[Optional[int]]
+    response: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(index=True)
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'request_hash': self.request_hash,
+            'status_code': self.status_code,
+            'response': self.response,
+            'created_at': self.created_at.isoformat()
+        }
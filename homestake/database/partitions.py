@@ -0,0 +1,191 @@
+"""Range partitioning of the transactions table by date on Postgres.
+
+The table is split into one partition per year (or month), so queries
+filtered on date only scan the partitions in range, each partition keeps
+small indexes and vacuums on its own, and old years can be detached. Postgres
+requires the partition key in the primary key, which becomes (id, date); ids
+still come from one sequence and stay unique. Rows dated outside every
+partition go to a default partition until one covering them is created.
+
+SQLite keeps a single plain table and every function here is a no-op on it.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Connection, MetaData, PrimaryKeyConstraint, Table, text
+
+import homestake.constants as const
+from homestake.database.models import Base, Transaction
+from homestake.logger import logger
+
+TABLE = Transaction.__table__.name
+DEFAULT_PARTITION = f"{TABLE}_default"
+YEAR = "year"
+MONTH = "month"
+
+# Partitions attached to the transactions table, with their bounds
+LIST_PARTITIONS = text(f"""
+    SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = '{TABLE}'::regclass
+    ORDER BY child.relname
+""")
+
+
+def partition_start(date: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> datetime:
+    """Start of the partition `date` falls in."""
+    if interval == MONTH:
+        return datetime(date.year, date.month, 1)
+    return datetime(date.year, 1, 1)
+
+
+def next_partition_start(start: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> datetime:
+    if interval == MONTH:
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return datetime(start.year + 1, 1, 1)
+
+
+def partition_name(start: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> str:
+    if interval == MONTH:
+        return f"{TABLE}_m{start:%Y_%m}"
+    return f"{TABLE}_y{start:%Y}"
+
+
+def partition_ranges(first: datetime, last: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> list[tuple[str, datetime, datetime]]:
+    """(name, lower, upper) of the partitions covering `first` to `last`."""
+    ranges = []
+    start = partition_start(first, interval)
+    while start <= last:
+        upper = next_partition_start(start, interval)
+        ranges.append((partition_name(start, interval), start, upper))
+        start = upper
+    return ranges
+
+
+def partitions_ahead_end(date: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> datetime:
+    """End of the last partition created in advance of `date`."""
+    start = partition_start(date, interval)
+    for _ in range(const.TRANSACTION_PARTITIONS_AHEAD + 1):
+        start = next_partition_start(start, interval)
+    return start - timedelta(microseconds=1)
+
+
+def partitioned_table() -> Table:
+    """The transactions table as created on Postgres, partitioned by date."""
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    table = metadata.tables[TABLE]
+    table.c.date.primary_key = True
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.date))
+    table.c.id.autoincrement = True
+    table.dialect_options["postgresql"]["partition_by"] = "RANGE (date)"
+    return table
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return connection.exec_driver_sql(
+        f"SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('{TABLE}')").scalar() or False
+
+
+def create_partitioned_transactions(connection: Connection, interval: str = const.TRANSACTION_PARTITION_INTERVAL):
+    """Create the transactions table partitioned if it does not exist yet.
+
+    Runs before create_all(), which would otherwise create it as a plain
+    table, so the tables it references are created first.
+    """
+    if connection.dialect.name != "postgresql" or \
+            connection.exec_driver_sql(f"SELECT to_regclass('{TABLE}')").scalar():
+        return
+    table = Transaction.__table__
+    Base.metadata.create_all(connection, tables=[
+        other for other in Base.metadata.sorted_tables if other is not table])
+    partitioned_table().create(connection)
+    connection.exec_driver_sql(
+        f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    create_transaction_partitions(
+        connection, now, partitions_ahead_end(now, interval), interval)
+
+
+def create_transaction_partitions(connection: Connection, first: datetime, last: datetime, interval: str = const.TRANSACTION_PARTITION_INTERVAL) -> list[str]:
+    """Create the missing partitions covering `first` to `last`.
+
+    Rows already in the default partition that belong to a new partition are
+    moved into it, since Postgres refuses to create a partition overlapping
+    rows in the default one. Returns the names of the created partitions.
+    """
+    if connection.dialect.name != "postgresql" or not is_partitioned(connection):
+        return []
+    existing = {row.name for row in connection.execute(LIST_PARTITIONS)}
+    created = []
+    for name, lower, upper in partition_ranges(first, last, interval):
+        if name in existing:
+            continue
+        bounds = {'lower': lower, 'upper': upper}
+        stray = connection.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper)"),
+            bounds).scalar()
+        if stray:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        connection.exec_driver_sql(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')")
+        if stray:
+            connection.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper RETURNING *) "
+                f"INSERT INTO {TABLE} SELECT * FROM moved"), bounds)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        logger.info(f"Created partition {name}")
+        created.append(name)
+    return created
+
+
+def list_transaction_partitions(connection: Connection) -> list[dict]:
+    if connection.dialect.name != "postgresql" or not is_partitioned(connection):
+        return []
+    return [{'name': row.name, 'bound': row.bound} for row in connection.execute(LIST_PARTITIONS)]
+
+
+def detach_transaction_partition(connection: Connection, name: str):
+    """Detach a partition, keeping its rows in a standalone table.
+
+    The rows no longer show up in the transactions table, and the table can
+    be archived or dropped on its own schedule.
+    """
+    connection.exec_driver_sql(
+        f'ALTER TABLE {TABLE} DETACH PARTITION "{name}"')
+
+
+def partition_transactions(connection: Connection):
+    """Migration moving an existing plain transactions table into partitions."""
+    if connection.dialect.name != "postgresql" or is_partitioned(connection):
+        return
+    logger.info(f"Partitioning {TABLE}")
+    previous = f"{TABLE}_unpartitioned"
+    sequence = connection.exec_driver_sql(
+        f"SELECT pg_get_serial_sequence('{TABLE}', 'id')").scalar()
+    # Index names share a namespace with tables, so the old table's indexes
+    # and sequence are renamed out of the way of the new ones
+    connection.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {previous}")
+    for (index,) in connection.exec_driver_sql(
+            f"SELECT indexname FROM pg_indexes WHERE tablename = '{previous}'").all():
+        connection.exec_driver_sql(
+            f'ALTER INDEX "{index}" RENAME TO "{previous}_{index}"')
+    if sequence:
+        connection.exec_driver_sql(
+            f"ALTER SEQUENCE {sequence} RENAME TO {previous}_id_seq")
+
+    create_partitioned_transactions(connection)
+    first, last = connection.exec_driver_sql(
+        f"SELECT min(date), max(date) FROM {previous}").one()
+    if first is not None:
+        create_transaction_partitions(connection, first, last)
+    columns = ", ".join(column.name for column in Transaction.__table__.columns)
+    connection.exec_driver_sql(
+        f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {previous}")
+    connection.exec_driver_sql(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), coalesce(max(id), 1)) FROM {TABLE}")
+    connection.exec_driver_sql(f"DROP TABLE {previous}")
+
@@ -0,0 +1,97 @@
+"""Search index over property names and addresses and user names and emails.
+
+Postgres matches with the pg_trgm extension, backed by GIN trigram indexes on
+the searched columns. SQLite keeps an FTS5 table with the trigram tokenizer in
+step with the tables through triggers. Its rows are keyed by rowid, even for
+properties and odd for users, so an update or delete touches a single row.
+"""
+from sqlalchemy import Connection, event
+
+from homestake.database.models import Base
+
+SEARCH_TABLE = "search_index"
+PROPERTY_KIND = "property"
+USER_KIND = "user"
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_properties_name_trgm ON properties USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_properties_address_trgm ON properties USING gin (address gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_user_name_trgm ON users USING gin (user_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+)
+
+SQLITE_TABLE_DDL = f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(name, detail, tokenize='trigram')"
+
+# Rows that existed before the index did
+SQLITE_BACKFILL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, detail) SELECT id * 2, name, address FROM properties",
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, detail) SELECT id * 2 + 1, user_name, email FROM users",
+)
+
+
+def _sqlite_triggers(table: str, rowid: str, name: str, detail: str) -> tuple[str, ...]:
+    return (
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {SEARCH_TABLE} (rowid, name, detail) VALUES ({rowid.format('new')}, new.{name}, new.{detail});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {name}, {detail} ON {table} BEGIN
+            UPDATE {SEARCH_TABLE} SET name = new.{name}, detail = new.{detail} WHERE rowid = {rowid.format('old')};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {rowid.format('old')};
+        END""",
+    )
+
+
+SQLITE_TRIGGERS = _sqlite_triggers("properties", "{}.id * 2", "name", "address") + \
+    _sqlite_triggers("users", "{}.id * 2 + 1", "user_name", "email")
+
+
+def create_search_index(connection: Connection):
+    """Create the search index if it is missing, filling it from existing rows."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+    elif dialect == "sqlite":
+        exists = connection.exec_driver_sql(
+            f"SELECT 1 FROM sqlite_master WHERE name = '{SEARCH_TABLE}'").first()
+        if not exists:
+            connection.exec_driver_sql(SQLITE_TABLE_DDL)
+            for statement in SQLITE_BACKFILL:
+                connection.exec_driver_sql(statement)
+        for statement in SQLITE_TRIGGERS:
+            connection.exec_driver_sql(statement)
+
+
+def drop_search_index(target, connection: Connection, **kw):
+    """Drop the SQLite search table along with the tables it indexes.
+
+    It is not part of the metadata, so without this a dropped and recreated
+    schema would keep the old rows, and the insert triggers would collide
+    with them."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+event.listen(Base.metadata, "before_drop", drop_search_index)
+
+
+def like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def trigram_match(query: str) -> str | None:
+    """FTS5 query matching rows that share any trigram with `query`.
+
+    bm25 ranks rows sharing more of the trigrams first, which makes misspelled
+    queries still find the row they were meant for. Queries shorter than a
+    trigram have none, and are matched as prefixes instead.
+    """
+    query = query.lower()
+    trigrams = dict.fromkeys(query[index:index + 3]
+                             for index in range(len(query) - 2))
+    if not trigrams:
+        return None
+    return " OR ".join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams)
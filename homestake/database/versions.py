@@ -0,0 +1,53 @@
+"""Version counters for collections served by list endpoints.
+
+Every write to a collection increments its counter in the same transaction,
+so a client holding the version it last saw can be told nothing changed
+with a primary key lookup instead of rerunning the list query. Transactions
+are counted per user and per account, matching the two transaction lists.
+"""
+from sqlalchemy import Connection, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+from homestake.database.models import CollectionVersion, Transaction
+
+
+def user_transactions_scope(user_id: int) -> str:
+    return f"transactions:user:{user_id}"
+
+
+def account_transactions_scope(account_id: int) -> str:
+    return f"transactions:account:{account_id}"
+
+
+def transaction_scopes(transactions: list[dict]) -> set[str]:
+    scopes = set()
+    for transaction in transactions:
+        scopes.add(user_transactions_scope(transaction['user_id']))
+        scopes.add(account_transactions_scope(transaction['account_id']))
+    return scopes
+
+
+def bump_versions(connection: Connection, scopes: set[str]):
+    if not scopes:
+        return
+    upsert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    # Rows are locked in a fixed order so concurrent writers cannot deadlock
+    statement = upsert(CollectionVersion).values(
+        [{'scope': scope, 'version': 1} for scope in sorted(scopes)])
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[CollectionVersion.scope], set_={'version': CollectionVersion.version + 1}))
+
+
+def _bump_transaction(mapper, connection: Connection, target: Transaction):
+    scopes = transaction_scopes([target.to_dict()])
+    # A transaction moved to another user or account leaves the old lists too
+    state = inspect(target)
+    for user_id in state.attrs.user_id.history.deleted:
+        scopes.add(user_transactions_scope(user_id))
+    for account_id in state.attrs.account_id.history.deleted:
+        scopes.add(account_transactions_scope(account_id))
+    bump_versions(connection, scopes)
+
+
+for hook in ("after_insert", "after_update", "after_delete"):
+    event.listen(Transaction, hook, _bump_transaction)
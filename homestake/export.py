@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TRANSACTION_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("amount", pa.float64()),
+    ("date", pa.timestamp("us")),
+    ("user_id", pa.int64()),
+    ("account_id", pa.int64()),
+])
+
+
+class ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def record_batches(batches: Iterable[List[tuple]], schema: pa.Schema) -> Iterator[pa.RecordBatch]:
+    for rows in batches:
+        columns = list(zip(*rows)) if rows else [[] for _ in schema]
+        yield pa.record_batch([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+def parquet_stream(batches: Iterable[List[tuple]], schema: pa.Schema = TRANSACTION_SCHEMA) -> Iterator[bytes]:
+    # Each batch is written as its own row group and sent as soon as it is encoded
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in record_batches(batches, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def arrow_stream(batches: Iterable[List[tuple]], schema: pa.Schema = TRANSACTION_SCHEMA) -> Iterator[bytes]:
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.take()
+        for batch in record_batches(batches, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
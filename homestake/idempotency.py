@@ -0,0 +1,134 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from fastapi import Response, status
+from pydantic import BaseModel, SecretStr
+
+import homestake.constants as const
+import homestake.serialization as serialization
+from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
+
+IDEMPOTENCY_KEY_TTL = timedelta(hours=const.IDEMPOTENCY_KEY_TTL_HOURS)
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_hash(route: str, request_body: BaseModel) -> str:
+    # Secrets are hashed with their real value so that a retry with a different
+    # password is treated as a different request
+    body = {k: v.get_secret_value() if isinstance(v, SecretStr) else v
+            for k, v in request_body.model_dump().items()}
+    payload = json.dumps([route, body], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_expired(record: dict) -> bool:
+    created_at = datetime.fromisoformat(record["created_at"])
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at + IDEMPOTENCY_KEY_TTL < datetime.now(timezone.utc)
+
+
+def begin(db_client: DatabaseClient, key: str | None, route: str, request_body: BaseModel) -> Response | None:
+    """Claim an idempotency key for a request.
+
+    Returns None when the request should be processed, otherwise the response
+    to send back: the stored result of the original request, or an error if
+    the key is still in flight or was used for a different request.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > const.IDEMPOTENCY_KEY_LENGTH:
+        return Response(
+            content=const.IDEMPOTENCY_KEY_INVALID_MSG.format(
+                const.IDEMPOTENCY_KEY_LENGTH),
+            status_code=status.HTTP_400_BAD_REQUEST,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    digest = request_hash(route, request_body)
+    record = db_client.get_idempotency_key(key)
+    if record is not None and is_expired(record):
+        db_client.delete_idempotency_key(key)
+        record = None
+
+    if record is None:
+        try:
+            db_client.create_idempotency_key(key, digest)
+            return None
+        except DatabaseDuplicationError:
+            # Another request claimed the key between the lookup and the insert
+            record = db_client.get_idempotency_key(key)
+        except DatabaseClientError as e:
+            return Response(
+                content=str(e),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                headers=None,
+                media_type=None,
+                background=None,
+            )
+
+    if record is not None and record["request_hash"] != digest:
+        return Response(
+            content=const.IDEMPOTENCY_KEY_MISMATCH_MSG,
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    if record is None or record["status_code"] is None:
+        return Response(
+            content=const.IDEMPOTENCY_KEY_IN_PROGRESS_MSG,
+            status_code=status.HTTP_409_CONFLICT,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    # Successful responses are stored as JSON and sent back in the format this
+    # request negotiated, error messages are plain text
+    succeeded = record["status_code"] < status.HTTP_400_BAD_REQUEST
+    return Response(
+        content=serialization.from_json(
+            record["response"]) if succeeded else record["response"],
+        status_code=record["status_code"],
+        headers={IDEMPOTENT_REPLAY_HEADER: "true"},
+        media_type=serialization.media_type() if succeeded else None,
+        background=None,
+    )
+
+
+def complete(db_client: DatabaseClient, key: str | None, response: Response) -> Response:
+    """Store the response for a claimed idempotency key.
+
+    Server errors release the key instead so the client can retry.
+    """
+    if key is None:
+        return response
+
+    if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+        db_client.delete_idempotency_key(key)
+    else:
+        db_client.update_idempotency_key(
+            key, response.status_code, serialization.to_json(response.body, response.media_type))
+
+    return response
+
+
+def handle(db_client: DatabaseClient, key: str | None, route: str, request_body: BaseModel, handler: Callable[[BaseModel], Response]) -> Response:
+    replay = begin(db_client, key, route, request_body)
+    if replay is not None:
+        return replay
+
+    try:
+        response = handler(request_body)
+    except Exception:
+        if key is not None:
+            db_client.delete_idempotency_key(key)
+        raise
+
+    return complete(db_client, key, response)
@@ -0,0 +1,234 @@
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import homestake.constants as const
+from homestake.amortization import amortization_schedule
+from homestake.database.client import DatabaseClient
+from homestake.export import parquet_stream
+from homestake.ledger import LEDGERS
+from homestake.logger import logger
+
+DB_CLIENT = DatabaseClient()
+
+# Job type -> handler taking the job params and returning a JSON serializable result
+JOB_HANDLERS: dict[str, Callable[[dict], dict]] = {}
+
+
+def register(job_type: str):
+    def decorator(handler: Callable[[dict], dict]):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return decorator
+
+
+class JobRunner:
+    """Runs queued jobs on a pool of worker threads.
+
+    Jobs are persisted before they are queued, and a worker only runs a job
+    after atomically claiming it in the database, so several runners (one per
+    server process) can share the jobs table. A heartbeat thread keeps claims
+    alive and requeues jobs whose runner stopped heartbeating, which covers
+    restarts and crashes.
+    """
+
+    def __init__(self, db_client: DatabaseClient, workers: int = const.JOB_WORKERS):
+        self.db_client = db_client
+        self.workers = workers
+        self.runner_id = uuid.uuid4().hex
+        self.queue: queue.Queue[int | None] = queue.Queue()
+        # Ids currently in the queue, so recovery does not queue them twice
+        self.pending: set[int] = set()
+        self.threads: list[threading.Thread] = []
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+
+            self.stopping.clear()
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self.work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            heartbeat = threading.Thread(target=self.heartbeat, daemon=True)
+            heartbeat.start()
+            self.threads.append(heartbeat)
+
+        self.recover()
+
+    def stop(self, timeout: float = const.JOB_STOP_TIMEOUT_SECONDS):
+        """Stop the workers once their current jobs finish, waiting at most
+        `timeout` seconds in all. Jobs not yet claimed stay queued in the
+        database for the next start."""
+        with self.lock:
+            self.stopping.set()
+            for _ in range(self.workers):
+                self.queue.put(None)
+            deadline = time.monotonic() + timeout
+            for thread in self.threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+            self.threads = []
+
+    def submit(self, job_type: str, params: dict) -> dict:
+        job = self.db_client.create_job(job_type, params)
+        self.start()
+        self.enqueue(job["id"])
+        return job
+
+    def enqueue(self, job_id: int):
+        with self.pending_lock:
+            if job_id in self.pending:
+                return
+            self.pending.add(job_id)
+        self.queue.put(job_id)
+
+    def recover(self):
+        stale_before = datetime.now(timezone.utc) - \
+            timedelta(seconds=const.JOB_STALE_SECONDS)
+        self.db_client.requeue_stale_jobs(stale_before)
+        # Queuing a job another runner already holds is harmless since the
+        # claim fails
+        for job_id in self.db_client.list_queued_job_ids():
+            self.enqueue(job_id)
+
+    def heartbeat(self):
+        while not self.stopping.wait(const.JOB_HEARTBEAT_SECONDS):
+            try:
+                self.db_client.heartbeat_jobs(self.runner_id)
+                self.recover()
+            except Exception as e:
+                logger.info(e)
+
+    def work(self):
+        while True:
+            job_id = self.queue.get()
+            # The sentinels are behind any jobs already queued
+            if job_id is None or self.stopping.is_set():
+                return
+            with self.pending_lock:
+                self.pending.discard(job_id)
+            try:
+                self.run(job_id)
+            except Exception as e:
+                logger.info(e)
+
+    def run(self, job_id: int):
+        job = self.db_client.claim_job(job_id, self.runner_id)
+        if job is None:
+            return
+
+        handler = JOB_HANDLERS.get(job["type"])
+        try:
+            if handler is None:
+                raise ValueError(const.JOB_TYPE_UNKNOWN_MSG.format(job["type"]))
+            result = handler(job["params"])
+        except Exception as e:
+            logger.info(traceback.format_exc())
+            self.db_client.update_job(job_id, status=const.JOB_STATUS_FAILED, error=str(
+                e), finished_at=datetime.now(timezone.utc))
+            return
+
+        self.db_client.update_job(job_id, status=const.JOB_STATUS_SUCCEEDED,
+                                  result=result, finished_at=datetime.now(timezone.utc))
+
+
+JOB_RUNNER = JobRunner(DB_CLIENT)
+
+
+@register("amortization")
+def amortization(params: dict) -> dict:
+    mortgage_id = params.get("mortgage_id")
+    if mortgage_id is None:
+        mortgages = DB_CLIENT.list_mortgages()
+    else:
+        mortgage = DB_CLIENT.get_mortgage_by_id(mortgage_id)
+        if mortgage is None:
+            raise ValueError(const.MORTGAGE_ID_NOT_FOUND.format(mortgage_id))
+        mortgages = [mortgage]
+
+    results = []
+    for mortgage in mortgages:
+        schedule = amortization_schedule(mortgage["loan_amount"], mortgage["interest_rate"],
+                                         mortgage["term"], datetime.fromisoformat(mortgage["start_date"]))
+        results.append({
+            'mortgage_id': mortgage["id"],
+            'monthly_payment': schedule[0]["payment"] if schedule else 0.0,
+            'total_interest': round(sum(row["interest"] for row in schedule), 2),
+            'payoff_date': schedule[-1]["date"] if schedule else mortgage["start_date"],
+            'schedule': schedule
+        })
+
+    return {'mortgages': results}
+
+
+@register("purge_idempotency_keys")
+def purge_idempotency_keys(params: dict) -> dict:
+    created_before = datetime.now(timezone.utc) - \
+        timedelta(hours=const.IDEMPOTENCY_KEY_TTL_HOURS)
+    return {'deleted': DB_CLIENT.delete_expired_idempotency_keys(created_before)}
+
+
+@register("purge_events")
+def purge_events(params: dict) -> dict:
+    created_before = datetime.now(timezone.utc) - \
+        timedelta(hours=const.EVENT_TTL_HOURS)
+    return {'deleted': DB_CLIENT.delete_expired_events(created_before)}
+
+
+@register("create_transaction_partitions")
+def create_transaction_partitions(params: dict) -> dict:
+    # Run periodically so inserts keep finding a partition for their dates
+    return {'created': DB_CLIENT.create_transaction_partitions()}
+
+
+@register("archive_transactions")
+def archive_transactions(params: dict) -> dict:
+    horizon_years = params.get("horizon_years", const.ARCHIVE_HORIZON_YEARS)
+    # Only whole years, so an archived property-year is complete
+    before = datetime(datetime.now(timezone.utc).year - horizon_years, 1, 1)
+    return DB_CLIENT.archive_transactions(before)
+
+
+@register("equity")
+def equity(params: dict) -> dict:
+    property_id = params["property_id"]
+    as_of = date.fromisoformat(params["as_of"]) if params.get("as_of") else date.today()
+    ledger = LEDGERS.get(property_id, DB_CLIENT)
+    if ledger is None:
+        raise ValueError(const.PROPERTY_ID_NOT_FOUND.format(property_id))
+    return {'property_id': property_id, **ledger.equity(as_of)}
+
+
+@register("export_transactions")
+def export_transactions(params: dict) -> dict:
+    start = datetime.fromisoformat(params["start"]) if params.get("start") else None
+    end = datetime.fromisoformat(params["end"]) if params.get("end") else None
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    directory = Path(os.getenv("EXPORT_PATH", const.EXPORT_DEFAULT_PATH))
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"transactions-{uuid.uuid4().hex}.parquet"
+    # Written under a temporary name so a half written file is never listed
+    partial = path.with_suffix(".partial")
+    with open(partial, "wb") as file:
+        for chunk in parquet_stream(counted(DB_CLIENT.iter_transaction_batches(
+                params.get("property_id"), params.get("user_id"), start, end))):
+            file.write(chunk)
+    partial.replace(path)
+    return {'path': str(path), 'transactions': rows}
@@ -0,0 +1,266 @@
+"""Each property's transactions as columns in memory.
+
+A property's ledger is loaded on first use into NumPy arrays of user id,
+account id, day (days since 1970-01-01) and amount in cents, kept in date
+order, with a running total per owner. Transactions created through this
+process are appended to the ledgers already loaded, updating the running
+totals from their row on, instead of reloading them. Equity as of a date is
+one binary search into the running totals, and per-user totals and rollups by
+month or year are vectorized sums over a slice of the arrays.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Callable
+
+import numpy as np
+
+import homestake.constants as const
+from homestake.database.client import DatabaseClient
+from homestake.database.hooks import on_commit_finished, on_commit_started, on_rows_appended
+from homestake.money import from_cents, to_cents
+
+# Tables whose rows decide which transactions count towards whose equity
+LEDGER_TABLES = frozenset(("accounts", "mortgages", "properties", "transactions", "users"))
+
+EPOCH = date(1970, 1, 1)
+MONTH = "month"
+YEAR = "year"
+
+# Smallest array allocation, so the first appends do not each reallocate
+MIN_CAPACITY = 64
+
+
+def epoch_day(value: date | datetime) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return (value - EPOCH).days
+
+
+class PropertyLedger:
+    def __init__(self, owners: list[dict], user_ids: np.ndarray, account_ids: np.ndarray, dates: np.ndarray,
+                 amounts: np.ndarray):
+        """`user_ids`, `account_ids`, `dates` and `amounts` (cents) are the
+        property's transactions, all made by `owners`."""
+        self.owners = owners
+        self.owner_ids = np.array([owner['id'] for owner in owners], dtype=np.int64)
+        order = np.argsort(dates, kind="stable")
+        self.size = len(order)
+        capacity = max(self.size, MIN_CAPACITY)
+        self.user_ids = np.zeros(capacity, dtype=np.int64)
+        self.account_ids = np.zeros(capacity, dtype=np.int64)
+        self.days = np.zeros(capacity, dtype=np.int32)
+        self.amounts = np.zeros(capacity, dtype=np.int64)
+        self.user_ids[:self.size] = user_ids[order]
+        self.account_ids[:self.size] = account_ids[order]
+        self.days[:self.size] = (dates[order].astype("datetime64[D]") - np.datetime64(EPOCH, "D")).astype(np.int32)
+        self.amounts[:self.size] = amounts[order]
+        # Per owner running totals, one column each in the order of `owners`
+        self.totals = np.zeros((capacity, len(self.owner_ids)), dtype=np.int64)
+        rows = slice(0, self.size)
+        self.totals[np.arange(self.size), self._columns(rows)] = self.amounts[rows]
+        np.cumsum(self.totals[rows], axis=0, out=self.totals[rows])
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays, spare capacity included."""
+        return sum(array.nbytes for array in (self.user_ids, self.account_ids, self.days, self.amounts, self.totals))
+
+    def append(self, user_id: int, account_id: int, day: int, amount: int) -> bool:
+        """Add a transaction, returning False if its user is not an owner."""
+        if user_id not in self.owner_ids:
+            return False
+        with self.lock:
+            if self.size == len(self.days):
+                for name in ("user_ids", "account_ids", "days", "amounts", "totals"):
+                    array = getattr(self, name)
+                    grown = np.zeros((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+                    grown[:self.size] = array[:self.size]
+                    setattr(self, name, grown)
+            # Usually at the end, but back-dated transactions go in date order
+            position = int(np.searchsorted(self.days[:self.size], day, side="right"))
+            for array, value in ((self.user_ids, user_id), (self.account_ids, account_id),
+                                 (self.days, day), (self.amounts, amount)):
+                array[position + 1:self.size + 1] = array[position:self.size]
+                array[position] = value
+            # The new row starts from the totals before it, and it adds to
+            # its owner's total from there on
+            self.totals[position + 1:self.size + 1] = self.totals[position:self.size]
+            self.totals[position] = self.totals[position - 1] if position else 0
+            column = int(np.searchsorted(self.owner_ids, user_id))
+            self.totals[position:self.size + 1, column] += amount
+            self.size += 1
+        return True
+
+    def _slice(self, start: date | None, end: date | None) -> slice:
+        """Rows dated from the start of `start` to the end of `end`."""
+        days = self.days[:self.size]
+        first = 0 if start is None else int(np.searchsorted(days, epoch_day(start), side="left"))
+        last = self.size if end is None else int(np.searchsorted(days, epoch_day(end), side="right"))
+        return slice(first, max(first, last))
+
+    def _columns(self, rows: slice) -> np.ndarray:
+        """Owner column of each row, in the order of `owners`, which is by id."""
+        return np.searchsorted(self.owner_ids, self.user_ids[rows])
+
+    def contributions(self, as_of: date) -> np.ndarray:
+        """Cents each owner contributed up to the end of `as_of`."""
+        with self.lock:
+            count = self._slice(None, as_of).stop
+            if not count:
+                return np.zeros(len(self.owner_ids), dtype=np.int64)
+            # Later appends shift rows in place
+            return self.totals[count - 1].copy()
+
+    def equity(self, as_of: date) -> dict:
+        contributions = self.contributions(as_of)
+        total = int(contributions.sum())
+        return {
+            'as_of': as_of.isoformat(),
+            'total_contributions': from_cents(total),
+            'owners': [{
+                'user_id': owner['id'],
+                'user_name': owner['user_name'],
+                'stake': owner['stake'],
+                'contributions': from_cents(int(cents)),
+                'share': round(int(cents) / total, 6) if total else 0.0
+            } for owner, cents in zip(self.owners, contributions)]
+        }
+
+    def user_totals(self, start: date | None = None, end: date | None = None) -> list[dict]:
+        """Each owner's total and number of transactions between `start` and `end`."""
+        with self.lock:
+            rows = self._slice(start, end)
+            columns = self._columns(rows)
+            totals = np.zeros(len(self.owner_ids), dtype=np.int64)
+            np.add.at(totals, columns, self.amounts[rows])
+            counts = np.bincount(columns, minlength=len(self.owner_ids))
+        return [{
+            'user_id': owner['id'],
+            'user_name': owner['user_name'],
+            'total': from_cents(int(cents)),
+            'count': int(count)
+        } for owner, cents, count in zip(self.owners, totals, counts)]
+
+    def rollup(self, start: date | None = None, end: date | None = None, period: str = MONTH) -> list[dict]:
+        """Totals and numbers of transactions per month or year with any, in order."""
+        with self.lock:
+            rows = self._slice(start, end)
+            days = self.days[rows].astype("datetime64[D]")
+            amounts = self.amounts[rows].copy()
+        if not len(days):
+            return []
+        periods = days.astype("datetime64[Y]" if period == YEAR else "datetime64[M]")
+        # Rows are in date order, so each period is one run
+        starts = np.concatenate(([0], np.flatnonzero(periods[1:] != periods[:-1]) + 1))
+        totals = np.add.reduceat(amounts, starts)
+        counts = np.diff(np.append(starts, len(periods)))
+        return [{
+            'period': str(periods[first]),
+            'total': from_cents(int(cents)),
+            'count': int(count)
+        } for first, cents, count in zip(starts, totals, counts)]
+
+
+class LedgerCache:
+    """Bounded LRU of property ledgers with a TTL.
+
+    The bound is on the bytes held by all ledgers' arrays. A commit in
+    this process appending transactions adds them to the loaded ledgers of
+    their properties; any other write to a ledger table drops every ledger.
+    A ledger loaded while such a commit is under way is returned but not
+    kept, since it may already hold the rows about to be appended.
+    The TTL bounds how long writes made by other processes go unseen. With
+    `max_bytes` of 0 nothing is kept and every get loads the ledger.
+    """
+
+    def __init__(self, max_bytes: int = const.LEDGER_CACHE_MAX_BYTES, ttl: float = const.LEDGER_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: OrderedDict[int, tuple[PropertyLedger, float]] = OrderedDict()
+        self.nbytes = 0
+        # Bumped when a write to a ledger table starts and when it is
+        # applied, and the number of those writes not yet finished, so a
+        # ledger loaded while a write committed is not stored as current
+        self.generation = 0
+        self.committing = 0
+        self.lock = threading.Lock()
+
+    def get(self, property_id: int, db_client: DatabaseClient) -> PropertyLedger | None:
+        with self.lock:
+            entry = self.entries.get(property_id)
+            if entry is not None and entry[1] > self.clock():
+                self.entries.move_to_end(property_id)
+                return entry[0]
+            generation = self.generation
+
+        loaded = db_client.get_property_ledger(property_id)
+        if loaded is None:
+            return None
+        ledger = PropertyLedger(loaded['owners'], loaded['user_ids'], loaded['account_ids'], loaded['dates'],
+                                loaded['amounts'])
+        with self.lock:
+            if self.generation == generation and not self.committing and ledger.nbytes <= self.max_bytes:
+                self._drop(property_id)
+                self.entries[property_id] = (ledger, self.clock() + self.ttl)
+                self.nbytes += ledger.nbytes
+                self._evict()
+        return ledger
+
+    def commit_started(self, tables: set[str]):
+        if LEDGER_TABLES.isdisjoint(tables):
+            return
+        with self.lock:
+            self.generation += 1
+            self.committing += 1
+
+    def commit_finished(self, tables: set[str]):
+        if LEDGER_TABLES.isdisjoint(tables):
+            return
+        with self.lock:
+            self.committing -= 1
+
+    def apply(self, replaced: set[str], appended: dict[str, list[dict]]):
+        transactions = appended.get("transactions", ())
+        if LEDGER_TABLES.isdisjoint(replaced) and not transactions:
+            return
+        with self.lock:
+            self.generation += 1
+            if not LEDGER_TABLES.isdisjoint(replaced):
+                self.entries.clear()
+                self.nbytes = 0
+                return
+            for transaction in transactions:
+                entry = self.entries.get(transaction['property_id'])
+                if entry is None:
+                    continue
+                ledger = entry[0]
+                nbytes = ledger.nbytes
+                if ledger.append(transaction['user_id'], transaction['account_id'],
+                                 epoch_day(transaction['date']), to_cents(transaction['amount'])):
+                    self.nbytes += ledger.nbytes - nbytes
+                else:
+                    self._drop(transaction['property_id'])
+            self._evict()
+
+    def _drop(self, property_id: int):
+        entry = self.entries.pop(property_id, None)
+        if entry is not None:
+            self.nbytes -= entry[0].nbytes
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            _, (ledger, _) = self.entries.popitem(last=False)
+            self.nbytes -= ledger.nbytes
+
+
+LEDGERS = LedgerCache()
+on_commit_started(LEDGERS.commit_started)
+on_rows_appended(LEDGERS.apply)
+on_commit_finished(LEDGERS.commit_finished)
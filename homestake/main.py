@@ -1,15 +1,41 @@
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI, Response, status
 
+import homestake.serialization as serialization
+from homestake.cache import RESPONSE_CACHE
+from homestake.database.client import dispose_engines, pool_status, warm_pools
+from homestake.jobs import JOB_RUNNER
+from homestake.middleware import RATE_LIMIT_STATS, RateLimitMiddleware
+from homestake.routes.event import event_router
+from homestake.routes.export import export_router
+from homestake.routes.job import job_router
 from homestake.routes.mortgage import mortgage_router
 from homestake.routes.property import property_router
+from homestake.routes.search import search_router
 from homestake.routes.transaction import transaction_router
 from homestake.routes.user import user_router
 
 URL_PREFIX = "/api/v1"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await to_thread.run_sync(warm_pools)
+    # Resume jobs left queued or running by a previous process
+    JOB_RUNNER.start()
+    yield
+    JOB_RUNNER.stop()
+    dispose_engines()
+
+
 app = FastAPI(
     title="HomeStake",
+    lifespan=lifespan,
 )
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(serialization.ContentNegotiationMiddleware)
 
 
 @app.get("/")
@@ -34,7 +60,36 @@ def health():
     )
 
 
+@app.get("/metrics")
+async def metrics():
+    limiter = to_thread.current_default_thread_limiter()
+    limiter_stats = limiter.statistics()
+    return Response(
+        content=serialization.dumps({
+            "rate_limit": RATE_LIMIT_STATS,
+            "database_pools": pool_status(),
+            "response_cache": RESPONSE_CACHE.stats(),
+            "jobs": {
+                "queued": JOB_RUNNER.queue.qsize()
+            },
+            "threadpool": {
+                "borrowed": limiter_stats.borrowed_tokens,
+                "total": limiter_stats.total_tokens,
+                "waiting": limiter_stats.tasks_waiting
+            }
+        }),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+app.include_router(event_router, prefix=URL_PREFIX)
+app.include_router(export_router, prefix=URL_PREFIX)
+app.include_router(job_router, prefix=URL_PREFIX)
 app.include_router(mortgage_router, prefix=URL_PREFIX)
 app.include_router(property_router, prefix=URL_PREFIX)
+app.include_router(search_router, prefix=URL_PREFIX)
 app.include_router(transaction_router, prefix=URL_PREFIX)
 app.include_router(user_router, prefix=URL_PREFIX)
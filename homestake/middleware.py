@@ -0,0 +1,155 @@
+import math
+import time
+from collections import OrderedDict
+
+from anyio import to_thread
+from fastapi import Response, status
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import homestake.constants as const
+from homestake.database.client import pool_status
+
+RATE_LIMIT_STATS = {
+    "allowed": 0,
+    "rate_limited": 0,
+    "shed": 0,
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def consume(self, now: float) -> float:
+        """Take a token, returning 0 on success or the seconds until one is available."""
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimitMiddleware:
+    """Per-client token bucket rate limiting with load shedding.
+
+    Each client (API key, falling back to the remote address) gets one bucket
+    for all its requests and one per route template. Requests are rejected with
+    503 before reaching a handler once a database pool or the threadpool that
+    runs sync handlers is saturated.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        client_rate: float = const.RATE_LIMIT_CLIENT_RATE,
+        client_burst: int = const.RATE_LIMIT_CLIENT_BURST,
+        route_rate: float = const.RATE_LIMIT_ROUTE_RATE,
+        route_burst: int = const.RATE_LIMIT_ROUTE_BURST,
+        route_limits: dict[str, tuple[float, int]] | None = None,
+        max_buckets: int = const.RATE_LIMIT_MAX_BUCKETS,
+        pool_saturation: float = const.LOAD_SHED_POOL_SATURATION,
+        threadpool_waiting: int = const.LOAD_SHED_THREADPOOL_WAITING,
+    ):
+        self.app = app
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        # Overrides keyed by "METHOD /route/template"
+        self.route_limits = route_limits or {}
+        self.max_buckets = max_buckets
+        self.pool_saturation = pool_saturation
+        self.threadpool_waiting = threadpool_waiting
+        self.buckets: OrderedDict[tuple, TokenBucket] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in const.RATE_LIMIT_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {self.route_template(scope)}"
+        client = self.client_key(scope)
+        now = time.monotonic()
+
+        route_rate, route_burst = self.route_limits.get(
+            route, (self.route_rate, self.route_burst))
+        wait = max(
+            self.bucket((client,), self.client_rate,
+                        self.client_burst, now).consume(now),
+            self.bucket((client, route), route_rate,
+                        route_burst, now).consume(now),
+        )
+        if wait > 0:
+            RATE_LIMIT_STATS["rate_limited"] += 1
+            response = Response(
+                content=const.RATE_LIMIT_EXCEEDED_MSG,
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(wait))},
+                media_type=None,
+                background=None,
+            )
+            await response(scope, receive, send)
+            return
+
+        if self.overloaded():
+            RATE_LIMIT_STATS["shed"] += 1
+            response = Response(
+                content=const.LOAD_SHED_MSG,
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(
+                    const.LOAD_SHED_RETRY_AFTER_SECONDS)},
+                media_type=None,
+                background=None,
+            )
+            await response(scope, receive, send)
+            return
+
+        RATE_LIMIT_STATS["allowed"] += 1
+        await self.app(scope, receive, send)
+
+    def bucket(self, key: tuple, rate: float, burst: int, now: float) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, burst, now)
+            self.buckets[key] = bucket
+            # Buckets are kept in least recently used order so idle clients
+            # are evicted first
+            while len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def overloaded(self) -> bool:
+        # The SQLite writer pool holds a single connection that queues writes,
+        # so it is saturated whenever one is running
+        if any(pool["saturation"] >= self.pool_saturation for pool in pool_status()
+               if pool.get("role") != "writer"):
+            return True
+        limiter = to_thread.current_default_thread_limiter()
+        return limiter.statistics().tasks_waiting >= self.threadpool_waiting
+
+    @staticmethod
+    def client_key(scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name.decode("latin-1") == const.API_KEY_HEADER:
+                return f"key:{value.decode('latin-1')}"
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "ip:unknown"
+
+    @staticmethod
+    def route_template(scope: Scope) -> str:
+        # Group requests by route so /users/1 and /users/2 share a bucket
+        app = scope.get("app")
+        if app is not None:
+            for route in app.router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    return route.path
+        return scope["path"]
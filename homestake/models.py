@@ -1,14 +1,32 @@
-from datetime import datetime
-from pydantic import BaseModel, ConfigDict, EmailStr, field_validator, SecretStr
+import re
+from datetime import date, datetime
+from typing import Annotated
+from pydantic import BaseModel, BeforeValidator, ConfigDict, EmailStr, Field, field_validator, SecretStr
 from pydantic.errors import PydanticUserError
 from homestake import constants
 
 
+def _date_only(value):
+    # Values without a time stay dates, so a range can cover their whole day
+    if isinstance(value, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        return date.fromisoformat(value)
+    return value
+
+
+# A date, or a datetime when a time is given
+DateOrDatetime = Annotated[datetime | date, BeforeValidator(_date_only)]
+
+
 class PasswordError(PydanticUserError):
     code = 'password_error'
     msg_template = 'Password must be between {min_length} and {max_length} characters'
 
 
+class Job(BaseModel):
+    type: str
+    params: dict = {}
+
+
 class Mortgage(BaseModel):
     lender: str
     loan_amount: float
@@ -31,6 +49,30 @@ class MortgageUpdate(Mortgage):
     model_config = ConfigDict(orm_mode=True)
 
 
+class LumpSum(BaseModel):
+    month: int = Field(ge=1)
+    amount: float = Field(ge=0)
+
+
+class RateChange(BaseModel):
+    month: int = Field(ge=1)
+    interest_rate: float = Field(ge=0)
+
+
+class MortgageScenario(BaseModel):
+    name: str | None = None
+    extra_monthly_principal: float = Field(default=0.0, ge=0)
+    lump_sums: list[LumpSum] = []
+    rate_changes: list[RateChange] = []
+    term: int | None = Field(
+        default=None, ge=1, le=constants.SCENARIO_MAX_TERM_YEARS)
+
+
+class MortgageScenarios(BaseModel):
+    scenarios: list[MortgageScenario] = Field(
+        min_length=1, max_length=constants.SCENARIO_MAX_COUNT)
+
+
 class Property(BaseModel):
     name: str
     address: str
@@ -41,6 +83,11 @@ class Property(BaseModel):
     model_config = ConfigDict(orm_mode=True)
 
 
+class PropertyValuation(BaseModel):
+    value: float
+    date: datetime
+
+
 class PropertyUpdate(Property):
     name: str | None = None
     address: str | None = None
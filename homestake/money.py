@@ -0,0 +1,33 @@
+"""Money amounts as integer cents.
+
+The database stores every amount as a whole number of cents, so SQL sums and
+NumPy arrays of amounts add up exactly. The API keeps exchanging amounts in
+currency units, converted with these helpers on the way in and out.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+CENTS_PER_UNIT = 100
+
+
+def to_cents(amount: float | int | None) -> int | None:
+    if amount is None:
+        return None
+    # Through the shortest decimal string, so 1.005 rounds to 101 cents as
+    # written rather than to 100 from its binary value
+    return int((Decimal(str(amount)) * CENTS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int | None) -> float | None:
+    if cents is None:
+        return None
+    return cents / CENTS_PER_UNIT
+
+
+def to_cents_array(amounts) -> np.ndarray:
+    return np.rint(np.asarray(amounts, dtype=np.float64) * CENTS_PER_UNIT).astype(np.int64)
+
+
+def from_cents_array(cents) -> np.ndarray:
+    return np.asarray(cents, dtype=np.int64) / CENTS_PER_UNIT
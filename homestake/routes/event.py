@@ -0,0 +1,55 @@
+import json
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import homestake.constants as const
+from homestake.database.client import DatabaseClient
+from homestake.database.events import NOTIFIER
+
+DB_CLIENT = DatabaseClient()
+event_router = APIRouter(
+    tags=[const.API_TAG_EVENT]
+)
+
+
+def format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['entity']}.{event['action']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(request: Request, property_id: int | None, last_event_id: int | None) -> AsyncIterator[str]:
+    """Server-Sent Events for changes after `last_event_id`.
+
+    Without a Last-Event-ID the feed starts at the latest event, so clients
+    only receive changes made after they connected. Reconnecting clients send
+    the id of the last event they saw and receive everything after it.
+    """
+    subscription = NOTIFIER.subscribe()
+    try:
+        if last_event_id is None:
+            last_event_id = await run_in_threadpool(DB_CLIENT.get_latest_event_id)
+        yield f"retry: {const.EVENT_RETRY_MS}\n\n"
+
+        while not await request.is_disconnected():
+            events = await run_in_threadpool(DB_CLIENT.list_events, last_event_id, property_id)
+            for event in events:
+                yield format_event(event)
+                last_event_id = event['id']
+            if len(events) == const.EVENT_BATCH_SIZE:
+                continue
+            if not await subscription.wait(const.EVENT_POLL_SECONDS):
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+@event_router.get('/events')
+async def stream_events(request: Request, property_id: int | None = None,
+                        last_event_id: Annotated[int | None, Header()] = None) -> StreamingResponse:
+    return StreamingResponse(
+        content=event_stream(request, property_id, last_event_id),
+        media_type=const.EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+import homestake.constants as const
+from homestake.database.client import DatabaseClient
+from homestake.export import arrow_stream, parquet_stream
+
+DB_CLIENT = DatabaseClient()
+export_router = APIRouter(
+    tags=[const.API_TAG_EXPORT]
+)
+
+
+@export_router.get('/export/transactions.parquet')
+def export_transactions_parquet(property_id: int | None = None, user_id: int | None = None,
+                                start: datetime | None = None, end: datetime | None = None) -> StreamingResponse:
+    batches = DB_CLIENT.iter_transaction_batches(
+        property_id, user_id, start, end)
+    return StreamingResponse(
+        content=parquet_stream(batches),
+        media_type=const.PARQUET_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": 'attachment; filename="transactions.parquet"'},
+    )
+
+
+@export_router.get('/export/transactions.arrow')
+def export_transactions_arrow(property_id: int | None = None, user_id: int | None = None,
+                              start: datetime | None = None, end: datetime | None = None) -> StreamingResponse:
+    batches = DB_CLIENT.iter_transaction_batches(
+        property_id, user_id, start, end)
+    return StreamingResponse(
+        content=arrow_stream(batches),
+        media_type=const.ARROW_STREAM_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": 'attachment; filename="transactions.arrow"'},
+    )
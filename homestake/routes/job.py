@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Response, status
+
+import homestake.constants as const
+import homestake.serialization as serialization
+from homestake.database.client import DatabaseClientError
+from homestake.jobs import DB_CLIENT, JOB_HANDLERS, JOB_RUNNER
+from homestake.models import Job
+
+job_router = APIRouter(
+    tags=[const.API_TAG_JOB]
+)
+
+
+@job_router.post('/jobs')
+def create_job(request_body: Job) -> Response:
+    if request_body.type not in JOB_HANDLERS:
+        return Response(
+            content=const.JOB_TYPE_UNKNOWN_MSG.format(request_body.type),
+            status_code=status.HTTP_400_BAD_REQUEST,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    try:
+        job = JOB_RUNNER.submit(request_body.type, request_body.params)
+    except DatabaseClientError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return Response(
+        content=serialization.dumps(job),
+        status_code=status.HTTP_202_ACCEPTED,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@job_router.get('/jobs/{id}')
+def get_job_by_id(id: int) -> Response:
+    job = DB_CLIENT.get_job_by_id(id)
+    if job is None:
+        return Response(
+            content=f"Job with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+    return Response(
+        content=serialization.dumps(job),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
@@ -1,10 +1,15 @@
-import json
+from datetime import datetime
+from typing import Annotated
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, Header, Response, status
 
 import homestake.constants as const
-from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
-from homestake.models import Mortgage, MortgageUpdate
+import homestake.idempotency as idempotency
+import homestake.serialization as serialization
+from homestake.amortization import MONTHS_PER_YEAR, simulate_scenarios
+from homestake.cache import cached
+from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError, DatabaseInUseError
+from homestake.models import Mortgage, MortgageScenarios, MortgageUpdate
 
 DB_CLIENT = DatabaseClient()
 mortgage_router = APIRouter(
@@ -13,7 +18,11 @@ mortgage_router = APIRouter(
 
 
 @mortgage_router.post("/mortgages")
-def create_mortgage(request_body: Mortgage) -> Response:
+def create_mortgage(request_body: Mortgage, idempotency_key: Annotated[str | None, Header()] = None) -> Response:
+    return idempotency.handle(DB_CLIENT, idempotency_key, "POST /mortgages", request_body, _create_mortgage)
+
+
+def _create_mortgage(request_body: Mortgage) -> Response:
     mortgage_data = {
         "lender": request_body.lender,
         "loan_amount": request_body.loan_amount,
@@ -47,15 +56,16 @@ def create_mortgage(request_body: Mortgage) -> Response:
         )
 
     return Response(
-        content=json.dumps(mortgage),
+        content=serialization.dumps(mortgage),
         status_code=status.HTTP_201_CREATED,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @mortgage_router.get('/mortgages/{id}')
+@cached("accounts", "mortgages")
 def get_mortgage_by_id(id: int) -> Response:
     mortgage = DB_CLIENT.get_mortgage_by_id(id)
     if mortgage is None:
@@ -67,15 +77,16 @@ def get_mortgage_by_id(id: int) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(mortgage),
+        content=serialization.dumps(mortgage),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @mortgage_router.get('/mortgages/lender/{lender}')
+@cached("accounts", "mortgages")
 def get_mortgage_by_lender(lender: str) -> Response:
     mortgage = DB_CLIENT.get_mortgage_by_lender(lender)
     if mortgage is None:
@@ -87,15 +98,16 @@ def get_mortgage_by_lender(lender: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(mortgage),
+        content=serialization.dumps(mortgage),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @mortgage_router.get('/mortgages/property/{property_name}')
+@cached("accounts", "mortgages", "properties")
 def get_mortgage_by_property(property_name: str) -> Response:
     property = DB_CLIENT.get_property_by_name(property_name)
     if property is None:
@@ -116,10 +128,76 @@ def get_mortgage_by_property(property_name: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(mortgage),
+        content=serialization.dumps(mortgage),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@mortgage_router.get('/mortgages/{id}/progress')
+@cached("accounts", "mortgages", "transactions")
+def get_mortgage_progress(id: int) -> Response:
+    progress = DB_CLIENT.get_mortgage_progress(id)
+    if progress is None:
+        return Response(
+            content=f"Mortgage with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+    return Response(
+        content=serialization.dumps(progress),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@mortgage_router.post('/mortgages/{id}/scenarios')
+def simulate_mortgage_scenarios(id: int, request_body: MortgageScenarios) -> Response:
+    mortgage = DB_CLIENT.get_mortgage_by_id(id)
+    if mortgage is None:
+        return Response(
+            content=f"Mortgage with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    # The unchanged mortgage is simulated alongside the scenarios as a baseline
+    scenarios = [{"name": "baseline"}] + \
+        [scenario.model_dump() for scenario in request_body.scenarios]
+    months = max(scenario.get("term") or mortgage["term"]
+                 for scenario in scenarios) * MONTHS_PER_YEAR
+    if len(scenarios) * months > const.SCENARIO_MAX_MONTHS:
+        return Response(
+            content=const.SCENARIO_TOO_LARGE_MSG.format(
+                const.SCENARIO_MAX_MONTHS),
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+    baseline, *results = simulate_scenarios(mortgage["loan_amount"], mortgage["interest_rate"],
+                                            mortgage["term"], datetime.fromisoformat(mortgage["start_date"]), scenarios)
+    for result in results:
+        result["interest_saved"] = round(
+            baseline["total_interest"] - result["total_interest"], 2)
+
+    return Response(
+        content=serialization.dumps({
+            "mortgage_id": id,
+            "baseline": baseline,
+            "scenarios": results
+        }),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -155,10 +233,10 @@ def update_mortgage(id: int, request_body: MortgageUpdate) -> Response:
     mortgage = DB_CLIENT.update_mortgage(id, **mortgage_data)
 
     return Response(
-        content=json.dumps(mortgage),
+        content=serialization.dumps(mortgage),
         status_code=status.HTTP_206_PARTIAL_CONTENT,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -174,7 +252,24 @@ def delete_mortgage(id: int) -> Response:
             background=None,
         )
 
-    DB_CLIENT.delete_mortgage(id)
+    try:
+        DB_CLIENT.delete_mortgage(id)
+    except DatabaseInUseError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_409_CONFLICT,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+    except DatabaseClientError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
 
     return Response(
         content=None,
@@ -1,11 +1,16 @@
-import json
 import logging
+from datetime import date, datetime, timezone
+from typing import Annotated
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, Header, Query, Response, status
 
 import homestake.constants as const
+import homestake.idempotency as idempotency
+import homestake.serialization as serialization
+from homestake.cache import cached
 from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
-from homestake.models import Property, PropertyUpdate
+from homestake.ledger import LEDGERS, MONTH
+from homestake.models import Property, PropertyUpdate, PropertyValuation
 
 DB_CLIENT = DatabaseClient()
 property_router = APIRouter(
@@ -14,7 +19,11 @@ property_router = APIRouter(
 
 
 @property_router.post('/properties')
-def create_property(request_body: Property) -> Response:
+def create_property(request_body: Property, idempotency_key: Annotated[str | None, Header()] = None) -> Response:
+    return idempotency.handle(DB_CLIENT, idempotency_key, "POST /properties", request_body, _create_property)
+
+
+def _create_property(request_body: Property) -> Response:
     try:
         property = DB_CLIENT.create_property(request_body.name, request_body.address,
                                              request_body.purchase_price, request_body.purchase_date, request_body.current_value)
@@ -36,15 +45,16 @@ def create_property(request_body: Property) -> Response:
         )
 
     return Response(
-        content=json.dumps(property),
+        content=serialization.dumps(property),
         status_code=status.HTTP_201_CREATED,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @property_router.get('/properties/address/{address}')
+@cached("properties")
 def get_property_by_address(address: str) -> Response:
     property = DB_CLIENT.get_property_by_address(address)
     if property is None:
@@ -56,15 +66,16 @@ def get_property_by_address(address: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(property),
+        content=serialization.dumps(property),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @property_router.get('/properties/{id}')
+@cached("properties")
 def get_property_by_id(id: int) -> Response:
     property = DB_CLIENT.get_property_by_id(id)
     if property is None:
@@ -76,15 +87,16 @@ def get_property_by_id(id: int) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(property),
+        content=serialization.dumps(property),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @property_router.get('/properties/name/{property_name}')
+@cached("properties")
 def get_property_by_name(property_name: str) -> Response:
     property = DB_CLIENT.get_property_by_name(property_name)
     if property is None:
@@ -96,10 +108,125 @@ def get_property_by_name(property_name: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(property),
+        content=serialization.dumps(property),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@property_router.post('/properties/{id}/valuations')
+def create_property_valuation(id: int, request_body: PropertyValuation) -> Response:
+    if DB_CLIENT.get_property_by_id(id) is None:
+        return Response(
+            content=f"Property with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    try:
+        valuation = DB_CLIENT.create_property_valuation(
+            id, request_body.value, request_body.date)
+    except DatabaseDuplicationError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_409_CONFLICT,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+    except DatabaseClientError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return Response(
+        content=serialization.dumps(valuation),
+        status_code=status.HTTP_201_CREATED,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@property_router.get('/properties/{id}/valuations')
+@cached("properties", "property_valuations")
+def list_property_valuations(id: int, start: datetime | None = None, end: datetime | None = None,
+                             max_points: Annotated[int, Query(ge=1, le=const.VALUATION_MAX_POINTS_LIMIT)] = const.VALUATION_MAX_POINTS) -> Response:
+    if DB_CLIENT.get_property_by_id(id) is None:
+        return Response(
+            content=f"Property with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    valuations = DB_CLIENT.list_property_valuations(
+        id, start, end, max_points)
+    return Response(
+        content=serialization.dumps(valuations),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@property_router.get('/properties/{id}/equity')
+@cached("accounts", "mortgages", "properties", "transactions", "users")
+def get_property_equity(id: int, as_of: date | None = None) -> Response:
+    ledger = LEDGERS.get(id, DB_CLIENT)
+    if ledger is None:
+        return Response(
+            content=f"Property with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    equity = ledger.equity(as_of or datetime.now(timezone.utc).date())
+    return Response(
+        content=serialization.dumps({'property_id': id, **equity}),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@property_router.get('/properties/{id}/contributions')
+@cached("accounts", "mortgages", "properties", "transactions", "users")
+def get_property_contributions(id: int, start: Annotated[date | None, Query(alias="from")] = None,
+                               end: Annotated[date | None, Query(alias="to")] = None,
+                               period: Annotated[str, Query(pattern=const.LEDGER_ROLLUP_PATTERN)] = MONTH) -> Response:
+    ledger = LEDGERS.get(id, DB_CLIENT)
+    if ledger is None:
+        return Response(
+            content=f"Property with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return Response(
+        content=serialization.dumps({
+            'property_id': id,
+            'users': ledger.user_totals(start, end),
+            'periods': ledger.rollup(start, end, period)
+        }),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -122,10 +249,10 @@ def update_property(id: int, request_body: PropertyUpdate) -> Response:
     property = DB_CLIENT.update_property(id, **property_data)
 
     return Response(
-        content=json.dumps(property),
+        content=serialization.dumps(property),
         status_code=status.HTTP_206_PARTIAL_CONTENT,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -150,3 +277,34 @@ def delete_property(id: int) -> Response:
         media_type=None,
         background=None,
     )
+
+
+@property_router.delete('/properties/{id}/household')
+def delete_property_household(id: int) -> Response:
+    if DB_CLIENT.get_property_by_id(id) is None:
+        return Response(
+            content=f"Property with id {id} not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            headers=None,
+            media_type=None,
+            background=None
+        )
+
+    try:
+        counts = DB_CLIENT.delete_property_household(id)
+    except DatabaseClientError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return Response(
+        content=serialization.dumps(counts),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
@@ -0,0 +1,28 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Query, Response, status
+
+import homestake.constants as const
+import homestake.serialization as serialization
+from homestake.cache import cached
+from homestake.database.client import DatabaseClient
+
+DB_CLIENT = DatabaseClient()
+search_router = APIRouter(
+    tags=[const.API_TAG_SEARCH]
+)
+
+
+@search_router.get('/search')
+@cached("properties", "users")
+def search(q: Annotated[str, Query(min_length=1, max_length=const.SEARCH_QUERY_MAX_LENGTH)],
+           limit: Annotated[int, Query(ge=1, le=const.SEARCH_MAX_LIMIT)] = const.SEARCH_DEFAULT_LIMIT,
+           offset: Annotated[int, Query(ge=0)] = 0) -> Response:
+    results = DB_CLIENT.search(q, limit, offset)
+    return Response(
+        content=serialization.dumps(results),
+        status_code=status.HTTP_200_OK,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
@@ -1,10 +1,17 @@
-import json
+from datetime import datetime
+from typing import Annotated
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, Header, Query, Request, Response, status
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
 
+import homestake.conditional as conditional
 import homestake.constants as constants
+import homestake.idempotency as idempotency
+import homestake.serialization as serialization
+from homestake.cache import cached
 from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
-from homestake.models import Transaction, TransactionUpdate
+from homestake.models import DateOrDatetime, Transaction, TransactionUpdate
 
 DB_CLIENT = DatabaseClient()
 transaction_router = APIRouter(
@@ -13,7 +20,11 @@ transaction_router = APIRouter(
 
 
 @transaction_router.post('/transactions')
-def create_transaction(request_body: Transaction) -> Response:
+def create_transaction(request_body: Transaction, idempotency_key: Annotated[str | None, Header()] = None) -> Response:
+    return idempotency.handle(DB_CLIENT, idempotency_key, "POST /transactions", request_body, _create_transaction)
+
+
+def _create_transaction(request_body: Transaction) -> Response:
     transaction_data = {
         "amount": request_body.amount,
         "date": request_body.date
@@ -50,15 +61,122 @@ def create_transaction(request_body: Transaction) -> Response:
         )
 
     return Response(
-        content=json.dumps(transaction),
+        content=serialization.dumps(transaction),
         status_code=status.HTTP_201_CREATED,
         headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
+@transaction_router.post('/transactions/bulk')
+async def create_transactions_bulk(request: Request) -> Response:
+    # Oversized bodies are turned away before they are read, or as soon as
+    # they pass the limit when sent without a length
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() \
+            and int(content_length) > constants.TRANSACTION_BULK_MAX_BYTES:
+        return _bulk_too_large(constants.TRANSACTION_BULK_BYTES_MSG.format(constants.TRANSACTION_BULK_MAX_BYTES))
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > constants.TRANSACTION_BULK_MAX_BYTES:
+            return _bulk_too_large(constants.TRANSACTION_BULK_BYTES_MSG.format(constants.TRANSACTION_BULK_MAX_BYTES))
+        chunks.append(chunk)
+
+    # The body is decoded by hand since it may be MessagePack
+    try:
+        body = serialization.loads(b"".join(chunks), request.headers.get("content-type"))
+        # Counted before validating every row
+        if isinstance(body, list) and len(body) > constants.TRANSACTION_BULK_MAX_SIZE:
+            return _bulk_too_large(constants.TRANSACTION_BULK_SIZE_MSG.format(constants.TRANSACTION_BULK_MAX_SIZE))
+        request_body = TypeAdapter(list[Transaction]).validate_python(body)
+    except ValidationError as e:
+        return Response(
+            content=e.json(include_url=False),
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            headers=None,
+            media_type=constants.JSON_MEDIA_TYPE,
+            background=None,
+        )
+    except ValueError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_400_BAD_REQUEST,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return await run_in_threadpool(_create_transactions_bulk, request_body)
+
+
+def _bulk_too_large(message: str) -> Response:
+    return Response(
+        content=message,
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        headers=None,
         media_type=None,
         background=None,
     )
 
 
+def _create_transactions_bulk(request_body: list[Transaction]) -> Response:
+    # Each distinct name is looked up once however many rows use it
+    users = {}
+    for user_name in {transaction.user_name for transaction in request_body}:
+        user = DB_CLIENT.get_user_by_name(user_name)
+        if user is None:
+            return Response(
+                content=f"User with name {user_name} not found",
+                status_code=status.HTTP_404_NOT_FOUND,
+                headers=None,
+                media_type=None,
+                background=None,
+            )
+        users[user_name] = user["id"]
+
+    accounts = {}
+    for account_name in {transaction.account_name for transaction in request_body}:
+        account = DB_CLIENT.get_account_by_name(account_name)
+        if account is None:
+            return Response(
+                content=f"Account with name {account_name} not found",
+                status_code=status.HTTP_404_NOT_FOUND,
+                headers=None,
+                media_type=None,
+                background=None,
+            )
+        accounts[account_name] = account["id"]
+
+    try:
+        transactions = DB_CLIENT.create_transactions([{
+            "amount": transaction.amount,
+            "date": transaction.date,
+            "user_id": users[transaction.user_name],
+            "account_id": accounts[transaction.account_name]
+        } for transaction in request_body]) if request_body else []
+    except DatabaseClientError as e:
+        return Response(
+            content=str(e),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers=None,
+            media_type=None,
+            background=None,
+        )
+
+    return Response(
+        content=serialization.dumps(transactions),
+        status_code=status.HTTP_201_CREATED,
+        headers=None,
+        media_type=serialization.media_type(),
+        background=None,
+    )
+
+
 @transaction_router.get('/transactions/{id}')
+@cached("transactions")
 def get_transaction_by_id(id: int) -> Response:
     transaction = DB_CLIENT.get_transaction_by_id(id)
     if transaction is None:
@@ -70,16 +188,21 @@ def get_transaction_by_id(id: int) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(transaction),
+        content=serialization.dumps(transaction),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @transaction_router.get('/transactions/user/{user_name}')
-def get_transaction_by_user(user_name: str) -> Response:
+@cached("users", "transactions")
+def get_transaction_by_user(user_name: str, start: Annotated[DateOrDatetime | None, Query(alias="from")] = None,
+                            end: Annotated[DateOrDatetime | None, Query(alias="to")] = None,
+                            min_amount: float | None = None, max_amount: float | None = None,
+                            sort: Annotated[str | None, Query(pattern=constants.TRANSACTION_SORT_PATTERN)] = None,
+                            if_none_match: Annotated[str | None, Header()] = None) -> Response:
     user = DB_CLIENT.get_user_by_name(user_name)
     if user is None:
         return Response(
@@ -90,7 +213,15 @@ def get_transaction_by_user(user_name: str) -> Response:
             background=None,
         )
 
-    transaction = DB_CLIENT.list_transactions_by_user(user["id"])
+    # Read before the list, so a write landing in between only makes the
+    # ETag older than the body, never newer
+    tag = conditional.etag(
+        DB_CLIENT.get_user_transactions_version(user["id"]))
+    if conditional.matches(if_none_match, tag):
+        return conditional.not_modified(tag)
+
+    transaction = DB_CLIENT.list_transactions_by_user(
+        user["id"], start, end, min_amount, max_amount, sort)
     if transaction is None:
         return Response(
             content=f"Transaction with user {user_name} not found",
@@ -100,16 +231,21 @@ def get_transaction_by_user(user_name: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(transaction),
+        content=serialization.dumps(transaction),
         status_code=status.HTTP_200_OK,
-        headers=None,
-        media_type=None,
+        headers={"ETag": tag},
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @transaction_router.get('/transactions/account/{account_name}')
-def get_transactions_by_account(account_name: str) -> Response:
+@cached("accounts", "transactions")
+def get_transactions_by_account(account_name: str, start: Annotated[DateOrDatetime | None, Query(alias="from")] = None,
+                                end: Annotated[DateOrDatetime | None, Query(alias="to")] = None,
+                                min_amount: float | None = None, max_amount: float | None = None,
+                                sort: Annotated[str | None, Query(pattern=constants.TRANSACTION_SORT_PATTERN)] = None,
+                                if_none_match: Annotated[str | None, Header()] = None) -> Response:
     account = DB_CLIENT.get_account_by_name(account_name)
     if account is None:
         return Response(
@@ -120,7 +256,13 @@ def get_transactions_by_account(account_name: str) -> Response:
             background=None,
         )
 
-    transaction = DB_CLIENT.list_transactions_by_account(account["id"])
+    tag = conditional.etag(
+        DB_CLIENT.get_account_transactions_version(account["id"]))
+    if conditional.matches(if_none_match, tag):
+        return conditional.not_modified(tag)
+
+    transaction = DB_CLIENT.list_transactions_by_account(
+        account["id"], start, end, min_amount, max_amount, sort)
     if transaction is None:
         return Response(
             content=f"Transaction with account {account_name} not found",
@@ -130,10 +272,10 @@ def get_transactions_by_account(account_name: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(transaction),
+        content=serialization.dumps(transaction),
         status_code=status.HTTP_200_OK,
-        headers=None,
-        media_type=None,
+        headers={"ETag": tag},
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -182,10 +324,10 @@ def update_transaction(id: int, request_body: TransactionUpdate) -> Response:
     transaction = DB_CLIENT.update_transaction(id, **transaction_data)
 
     return Response(
-        content=json.dumps(transaction),
+        content=serialization.dumps(transaction),
         status_code=status.HTTP_206_PARTIAL_CONTENT,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -1,9 +1,12 @@
-import json
+from typing import Annotated
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, Header, Response, status
 
 import homestake.constants as const
 import homestake.encryption as encryption
+import homestake.idempotency as idempotency
+import homestake.serialization as serialization
+from homestake.cache import cached
 from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
 from homestake.models import User, UserUpdate
 
@@ -14,7 +17,11 @@ user_router = APIRouter(
 
 
 @user_router.post('/users')
-def create_user(request_body: User) -> Response:
+def create_user(request_body: User, idempotency_key: Annotated[str | None, Header()] = None) -> Response:
+    return idempotency.handle(DB_CLIENT, idempotency_key, "POST /users", request_body, _create_user)
+
+
+def _create_user(request_body: User) -> Response:
     user_data = {
         "user_name": request_body.user_name,
         "email": request_body.email,
@@ -54,15 +61,16 @@ def create_user(request_body: User) -> Response:
         )
 
     return Response(
-        content=json.dumps(user),
+        content=serialization.dumps(user),
         status_code=status.HTTP_201_CREATED,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @user_router.get('/users/{id}')
+@cached("users")
 def get_user_by_id(id: int) -> Response:
     user = DB_CLIENT.get_user_by_id(id)
     if user is None:
@@ -74,15 +82,16 @@ def get_user_by_id(id: int) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(user),
+        content=serialization.dumps(user),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
 
 @user_router.get('/users/name/{user_name}')
+@cached("users")
 def get_user_by_name(user_name: str) -> Response:
     user = DB_CLIENT.get_user_by_name(user_name)
     if user is None:
@@ -94,10 +103,10 @@ def get_user_by_name(user_name: str) -> Response:
             background=None,
         )
     return Response(
-        content=json.dumps(user),
+        content=serialization.dumps(user),
         status_code=status.HTTP_200_OK,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
@@ -144,10 +153,10 @@ def update_user(id: int, request_body: UserUpdate) -> Response:
     user = DB_CLIENT.update_user(id, **user_data)
 
     return Response(
-        content=json.dumps(user),
+        content=serialization.dumps(user),
         status_code=status.HTTP_206_PARTIAL_CONTENT,
         headers=None,
-        media_type=None,
+        media_type=serialization.media_type(),
         background=None,
     )
 
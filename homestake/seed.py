@@ -0,0 +1,294 @@
+import argparse
+import csv
+import io
+import json
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Connection, Engine, func, insert, select, text
+
+from homestake.amortization import MONTHS_PER_YEAR, monthly_payment
+from homestake.database.client import DatabaseClient, create_schema
+from homestake.database.models import Base, Account, Mortgage, Property, PropertyValuation, Transaction, User
+from homestake.database.partitions import create_transaction_partitions
+from homestake.database.versions import account_transactions_scope, bump_versions, user_transactions_scope
+from homestake.encryption import encrypt_password
+from homestake.money import to_cents_array
+
+# Every seeded user can log in with this password
+SEED_PASSWORD = "homestake-seed"
+# Fixed so the same seed gives the same rows whenever it is run
+SEED_END_DATE = datetime(2025, 1, 1)
+MIN_OWNERS = 2
+MAX_OWNERS = 6
+# Ad-hoc transactions (repairs, extra principal, taxes) per property per year
+AD_HOC_PER_YEAR = 6
+INSERT_CHUNK_SIZE = 50000
+VERSION_CHUNK_SIZE = 10000
+
+FIRST_NAMES = ["alex", "blake", "casey", "dana", "eli", "frankie", "gray", "harper", "jordan", "kai",
+               "lee", "morgan", "noel", "parker", "quinn", "reese", "sam", "taylor", "val", "wren"]
+LAST_NAMES = ["adams", "brown", "chen", "diaz", "evans", "fischer", "garcia", "hughes", "ito", "jones",
+              "khan", "lopez", "miller", "nguyen", "okafor", "patel", "rossi", "smith", "tanaka", "weber"]
+STREETS = ["Oak", "Maple", "Cedar", "Pine", "Elm", "Birch", "Willow", "Lake", "Hill", "Park"]
+STREET_TYPES = ["Street", "Avenue", "Road", "Lane", "Drive", "Court"]
+LENDERS = ["First National", "Harbor Bank", "Summit Credit Union", "Keystone Mortgage", "Pioneer Savings",
+           "Liberty Home Loans"]
+
+
+@dataclass
+class SeedResult:
+    properties: int
+    mortgages: int
+    users: int
+    transactions: int
+    # Ids of the first seeded row per table, later rows follow consecutively
+    first_property_id: int
+    first_account_id: int
+    first_user_id: int
+    first_transaction_id: int
+    seconds: float = 0.0
+
+
+def properties_for(transactions: int, years: int) -> int:
+    """Properties needed for roughly `transactions` rows over `years` years."""
+    average_owners = (MIN_OWNERS + MAX_OWNERS) / 2
+    per_property = years * (MONTHS_PER_YEAR * average_owners + AD_HOC_PER_YEAR)
+    return max(round(transactions / per_property), 1)
+
+
+def seed(engine: Engine, properties: int, years: int = 10, seed: int = 0, end_date: datetime = SEED_END_DATE) -> SeedResult:
+    """Insert `properties` households with `years` of transaction history.
+
+    Each property gets a mortgage, 2-6 co-owners whose stakes add up to 100
+    and valuations at its purchase price and current value, as created
+    through the API. Owners pay their share of the mortgage payment every month, a few days
+    either side of the due date, alongside occasional ad-hoc payments. The rows
+    only depend on the arguments, and are appended after any existing rows.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    with engine.begin() as connection:
+        def next_id(table) -> int:
+            return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+        first_property_id = next_id(Property.__table__)
+        first_account_id = next_id(Account.__table__)
+        first_user_id = next_id(User.__table__)
+        first_transaction_id = next_id(Transaction.__table__)
+
+        history_months = years * MONTHS_PER_YEAR
+        end_month = np.datetime64(end_date, "M")
+        # Purchases are spread over the first year of history, on days 1-28 so
+        # every month has the due day
+        purchase_months = end_month - np.timedelta64(history_months, "M") + \
+            rng.integers(0, MONTHS_PER_YEAR, properties).astype("timedelta64[M]")
+        purchase_days = rng.integers(0, 28, properties).astype("timedelta64[D]")
+        purchase_dates = purchase_months.astype("datetime64[D]") + purchase_days
+        purchase_prices = np.round(rng.lognormal(12.7, 0.4, properties), -3)
+        growth = rng.normal(0.04, 0.02, properties)
+        current_values = np.round(
+            purchase_prices * (1 + growth) ** years, -3)
+        loan_amounts = np.round(
+            purchase_prices * rng.uniform(0.6, 0.9, properties), -2)
+        interest_rates = rng.integers(3, 8, properties)
+        terms = rng.choice([15, 20, 30], properties, p=[0.2, 0.1, 0.7])
+        owner_counts = rng.integers(MIN_OWNERS, MAX_OWNERS + 1, properties)
+
+        property_rows = []
+        valuation_rows = []
+        account_rows = []
+        mortgage_rows = []
+        user_rows = []
+        password = encrypt_password(SEED_PASSWORD)
+        user_id = first_user_id
+        transaction_columns = []
+
+        for index in range(properties):
+            property_id = first_property_id + index
+            account_id = first_account_id + index
+            purchase_date = purchase_dates[index].astype("datetime64[us]").astype(datetime)
+            street = f"{rng.integers(1, 9999)} {STREETS[rng.integers(len(STREETS))]} {STREET_TYPES[rng.integers(len(STREET_TYPES))]}"
+            property_rows.append({
+                'id': property_id,
+                'name': f"{street} #{property_id}",
+                'address': f"{street}, Unit {property_id}",
+                'purchase_price': float(purchase_prices[index]),
+                'purchase_date': purchase_date,
+                'current_value': float(current_values[index])
+            })
+            valuation_rows.append({'property_id': property_id, 'date': purchase_date,
+                                   'value': float(purchase_prices[index])})
+            valuation_rows.append({'property_id': property_id, 'date': end_date,
+                                   'value': float(current_values[index])})
+            account_rows.append({'id': account_id, 'name': f"Mortgage {account_id}", 'type': "mortgage"})
+            mortgage_rows.append({
+                'id': account_id,
+                'lender': LENDERS[rng.integers(len(LENDERS))],
+                'loan_amount': float(loan_amounts[index]),
+                'interest_rate': int(interest_rates[index]),
+                'term': int(terms[index]),
+                'start_date': purchase_date,
+                'property_id': property_id
+            })
+
+            owners = int(owner_counts[index])
+            # Every owner gets at least 1%, the rest is split at random
+            stakes = 1 + rng.multinomial(100 - owners,
+                                         rng.dirichlet(np.ones(owners)))
+            owner_ids = np.arange(user_id, user_id + owners)
+            for owner, stake in zip(owner_ids, stakes):
+                user_name = f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]}.{LAST_NAMES[rng.integers(len(LAST_NAMES))]}{owner}"
+                user_rows.append({
+                    'id': int(owner),
+                    'user_name': user_name,
+                    'email': f"{user_name}@example.com",
+                    'password': password,
+                    'stake': int(stake),
+                    'property_id': property_id,
+                    'mortgage_id': account_id
+                })
+            user_id += owners
+
+            # Monthly payments: one row per owner per due date from the month
+            # after purchase up to the end date
+            months = int((end_month - purchase_months[index]).astype(int)) - 1
+            payment = monthly_payment(float(loan_amounts[index]), float(
+                interest_rates[index]), int(terms[index]) * MONTHS_PER_YEAR)
+            due_dates = (purchase_months[index] + np.arange(1, months + 1).astype("timedelta64[M]")).astype(
+                "datetime64[D]") + purchase_days[index]
+            monthly_dates = np.repeat(due_dates, owners) + \
+                rng.integers(-3, 4, months * owners).astype("timedelta64[D]")
+            monthly_users = np.tile(owner_ids, months)
+            monthly_amounts = np.round(
+                np.tile(payment * stakes / 100, months), 2)
+
+            ad_hoc = rng.poisson(AD_HOC_PER_YEAR * months / MONTHS_PER_YEAR)
+            history_days = int(
+                (end_month.astype("datetime64[D]") - purchase_dates[index]).astype(int))
+            ad_hoc_dates = purchase_dates[index] + \
+                rng.integers(1, max(history_days, 2), ad_hoc).astype("timedelta64[D]")
+            ad_hoc_users = rng.choice(owner_ids, ad_hoc)
+            ad_hoc_amounts = np.round(rng.lognormal(6.5, 1.0, ad_hoc), 2)
+
+            dates = np.concatenate([monthly_dates, ad_hoc_dates])
+            order = np.argsort(dates, kind="stable")
+            transaction_columns.append((
+                np.concatenate([monthly_amounts, ad_hoc_amounts])[order],
+                dates[order],
+                np.concatenate([monthly_users, ad_hoc_users])[order],
+                np.full(len(dates), account_id)
+            ))
+
+        connection.execute(insert(Property.__table__), property_rows)
+        if valuation_rows:
+            connection.execute(insert(PropertyValuation.__table__), valuation_rows)
+        connection.execute(insert(Account.__table__), account_rows)
+        connection.execute(insert(Mortgage.__table__), mortgage_rows)
+        if user_rows:
+            connection.execute(insert(User.__table__), user_rows)
+
+        if transaction_columns:
+            amounts, dates, user_ids, account_ids = (
+                np.concatenate(column) for column in zip(*transaction_columns))
+            transactions = len(amounts)
+            # Postgres partitions for the whole history, so rows do not pile
+            # up in the default partition
+            create_transaction_partitions(connection, dates.min().astype("datetime64[us]").astype(datetime),
+                                          dates.max().astype("datetime64[us]").astype(datetime))
+            _insert_transactions(connection, np.arange(first_transaction_id, first_transaction_id + transactions),
+                                 amounts, dates, user_ids, account_ids)
+            # The inserts skip the ORM hooks that bump transaction list
+            # versions, and chunks keep under SQLite's limit on parameters
+            scopes = sorted([user_transactions_scope(user_id) for user_id in np.unique(user_ids).tolist()]
+                            + [account_transactions_scope(account_id) for account_id in np.unique(account_ids).tolist()])
+            for offset in range(0, len(scopes), VERSION_CHUNK_SIZE):
+                bump_versions(connection, set(scopes[offset:offset + VERSION_CHUNK_SIZE]))
+        else:
+            transactions = 0
+
+        # Rows were inserted with explicit ids, so serial sequences need to
+        # catch up before the app creates rows of its own
+        if engine.dialect.name == "postgresql":
+            for table in (Property.__table__, Account.__table__, User.__table__, Transaction.__table__):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), MAX(id)) FROM {table.name}"))
+
+    return SeedResult(
+        properties=properties,
+        mortgages=properties,
+        users=user_id - first_user_id,
+        transactions=transactions,
+        first_property_id=first_property_id,
+        first_account_id=first_account_id,
+        first_user_id=first_user_id,
+        first_transaction_id=first_transaction_id,
+        seconds=round(time.perf_counter() - started, 3)
+    )
+
+
+def _insert_transactions(connection: Connection, ids: np.ndarray, amounts: np.ndarray, dates: np.ndarray,
+                         user_ids: np.ndarray, account_ids: np.ndarray):
+    # Going through the ORM's parameter processing costs several times more
+    # than the insert itself, so rows are handed to the driver directly
+    table = Transaction.__table__
+    columns = ", ".join(column.name for column in table.columns)
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        # Same text format SQLAlchemy stores SQLite datetimes in
+        dates = np.char.replace(np.datetime_as_string(
+            dates.astype("datetime64[us]"), unit="us"), "T", " ")
+    else:
+        dates = np.datetime_as_string(dates.astype("datetime64[us]"), unit="us")
+    # Cents, as the Cents column type would have converted them
+    amounts = to_cents_array(amounts)
+
+    for offset in range(0, len(ids), INSERT_CHUNK_SIZE):
+        chunk = slice(offset, offset + INSERT_CHUNK_SIZE)
+        rows = zip(ids[chunk].tolist(), amounts[chunk].tolist(), dates[chunk].tolist(),
+                   user_ids[chunk].tolist(), account_ids[chunk].tolist())
+        if dialect == "sqlite":
+            connection.exec_driver_sql(
+                f"INSERT INTO {table.name} ({columns}) VALUES (?, ?, ?, ?, ?)", list(rows))
+        elif dialect == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            connection.connection.driver_connection.cursor().copy_expert(
+                f"COPY {table.name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            connection.execute(insert(table), [dict(zip((column.name for column in table.columns), row))
+                                               for row in rows])
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m homestake.seed",
+        description="Generate synthetic households in the database from DATABASE_URL (or the local SQLite database).")
+    scale = parser.add_mutually_exclusive_group()
+    scale.add_argument("--properties", type=int, default=100)
+    scale.add_argument("--transactions", type=int,
+                       help="approximate number of transactions, sets the number of properties")
+    parser.add_argument("--years", type=int, default=10,
+                        help="years of transaction history")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true",
+                        help="drop and recreate all tables first")
+    args = parser.parse_args(argv)
+
+    engine = DatabaseClient().engine
+    if args.reset:
+        Base.metadata.drop_all(engine)
+        create_schema(engine)
+
+    properties = properties_for(
+        args.transactions, args.years) if args.transactions else args.properties
+    result = seed(engine, properties, args.years, args.seed)
+    print(json.dumps(asdict(result), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+from contextvars import ContextVar
+from typing import Any
+
+import msgpack
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import homestake.constants as const
+
+# Media type the current request asked for, set by ContentNegotiationMiddleware
+RESPONSE_MEDIA_TYPE: ContextVar[str] = ContextVar(
+    "response_media_type", default=const.JSON_MEDIA_TYPE)
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    if not accept:
+        return False
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() in const.MSGPACK_MEDIA_TYPES:
+            return not any(param.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000") for param in params)
+    return False
+
+
+def dumps(data: Any) -> str | bytes:
+    """Encode a response body in the format the client asked for."""
+    if RESPONSE_MEDIA_TYPE.get() == const.MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(data)
+    return json.dumps(data)
+
+
+def media_type() -> str | None:
+    # JSON bodies have always been sent without a content type
+    if RESPONSE_MEDIA_TYPE.get() == const.MSGPACK_MEDIA_TYPE:
+        return const.MSGPACK_MEDIA_TYPE
+    return None
+
+
+def loads(body: bytes, content_type: str | None) -> Any:
+    """Decode a request body sent as JSON or MessagePack."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in const.MSGPACK_MEDIA_TYPES:
+        # Timestamps arrive as timezone aware datetimes
+        return msgpack.unpackb(body, timestamp=3)
+    return json.loads(body)
+
+
+def to_json(body: bytes, media_type: str | None) -> str:
+    """JSON text for a response body produced by dumps()."""
+    if media_type == const.MSGPACK_MEDIA_TYPE:
+        return json.dumps(msgpack.unpackb(body))
+    return body.decode("utf-8")
+
+
+def from_json(text: str) -> str | bytes:
+    """Encode JSON text from to_json() for the current request."""
+    if RESPONSE_MEDIA_TYPE.get() == const.MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(json.loads(text))
+    return text
+
+
+class ContentNegotiationMiddleware:
+    """Picks the response format from the Accept header.
+
+    Routes encode their bodies with dumps() and media_type(), which read the
+    choice from a context variable, so payloads are encoded once in the
+    requested format instead of being converted from JSON.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        negotiated = const.MSGPACK_MEDIA_TYPE if accepts_msgpack(
+            Headers(scope=scope).get("accept")) else const.JSON_MEDIA_TYPE
+        token = RESPONSE_MEDIA_TYPE.set(negotiated)
+
+        async def send_with_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).add_vary_header("Accept")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            RESPONSE_MEDIA_TYPE.reset(token)
@@ -0,0 +1,281 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+from sqlalchemy import Engine, Integer
+
+import homestake.constants as const
+from homestake.database.archive import MANIFEST as ARCHIVE_MANIFEST, TransactionArchive
+from homestake.database.client import DatabaseClient
+from homestake.database.models import Base
+
+
+class SnapshotError(Exception):
+    """Custom exception for snapshot errors."""
+    pass
+
+
+def dump_snapshot(engine: Engine, path: str, archive: TransactionArchive | None = None) -> dict:
+    """Write every table to a single gzip compressed tar file at `path`.
+
+    The archive starts with a manifest recording the format version, source
+    dialect and per-table row counts. SQLite databases are copied with the
+    online backup API, so the copy is consistent while the app keeps running.
+    Postgres tables are streamed out with COPY inside one repeatable read
+    transaction.
+
+    With `archive`, the transaction archive's manifest and files follow, read
+    after the database was copied. Rows archived in between are then in both,
+    which readers already allow for.
+    """
+    manifest = {
+        'version': const.SNAPSHOT_FORMAT_VERSION,
+        'dialect': engine.dialect.name,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'tables': []
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if engine.dialect.name == "sqlite":
+            members = _dump_sqlite(engine, workdir, manifest)
+        elif engine.dialect.name == "postgresql":
+            members = _dump_postgres(engine, workdir, manifest)
+        else:
+            raise SnapshotError(
+                const.SNAPSHOT_DIALECT_UNSUPPORTED_MSG.format(engine.dialect.name))
+
+        # The manifest goes first so restores can read it without scanning
+        # the whole archive, and the transaction archive before the database
+        # so restores have it unpacked before changing anything
+        with tarfile.open(path, "w:gz") as tar:
+            with archive.lock if archive is not None else contextlib.nullcontext():
+                archive_manifest = archive.manifest() if archive is not None else None
+                if archive_manifest is not None:
+                    manifest['archive'] = {
+                        'files': len(archive_manifest['files']),
+                        'rows': sum(entry['rows'] for entry in archive_manifest['files'])
+                    }
+                _add_bytes(tar, const.SNAPSHOT_MANIFEST,
+                           json.dumps(manifest, indent=2).encode())
+                if archive_manifest is not None:
+                    _add_bytes(tar, f"{const.SNAPSHOT_ARCHIVE_DIR}/{ARCHIVE_MANIFEST}",
+                               json.dumps(archive_manifest).encode())
+                    for entry in archive_manifest['files']:
+                        tar.add(os.path.join(archive.path, entry['path']),
+                                arcname=f"{const.SNAPSHOT_ARCHIVE_DIR}/{entry['path']}")
+            for member in members:
+                tar.add(os.path.join(workdir, member), arcname=member)
+
+    return manifest
+
+
+def restore_snapshot(engine: Engine, path: str, archive: TransactionArchive | None = None) -> dict:
+    """Replace the contents of the database with the snapshot at `path`.
+
+    With `archive`, the transaction archive is replaced too. The snapshot's
+    archive files are unpacked next to it before the database is touched,
+    and swapped in once the database is restored.
+    """
+    with tarfile.open(path, "r|gz") as tar:
+        member = tar.next()
+        if member is None or member.name != const.SNAPSHOT_MANIFEST:
+            raise SnapshotError(
+                const.SNAPSHOT_MANIFEST_MISSING_MSG.format(path))
+        manifest = json.load(tar.extractfile(member))
+
+        if manifest.get('version') not in const.SNAPSHOT_READABLE_VERSIONS:
+            raise SnapshotError(
+                const.SNAPSHOT_VERSION_UNSUPPORTED_MSG.format(manifest.get('version')))
+        if manifest.get('dialect') != engine.dialect.name:
+            raise SnapshotError(const.SNAPSHOT_DIALECT_MISMATCH_MSG.format(
+                manifest.get('dialect'), engine.dialect.name))
+        # Restoring only the database would orphan the archived transactions
+        if archive is not None and 'archive' not in manifest and archive.manifest()['files']:
+            raise SnapshotError(
+                const.SNAPSHOT_ARCHIVE_MISSING_MSG.format(archive.path))
+
+        # On the archive's file system, so it can be renamed into place
+        staging = None if archive is None else tempfile.mkdtemp(
+            prefix=".restore-", dir=os.path.dirname(os.path.abspath(archive.path)))
+        try:
+            members = _database_members(tar, staging)
+            if engine.dialect.name == "sqlite":
+                _restore_sqlite(engine, tar, members)
+            else:
+                _restore_postgres(engine, tar, members, manifest)
+            if archive is not None:
+                _replace_archive(archive, staging)
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    # Pooled connections may hold pages or sequences from before the restore
+    engine.dispose()
+    return manifest
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _database_members(tar: tarfile.TarFile, staging: str | None) -> Iterator[tarfile.TarInfo]:
+    """Members holding the database, unpacking the transaction archive's
+    into `staging` on the way, or skipping them without one."""
+    for member in tar:
+        if member.name.startswith(f"{const.SNAPSHOT_ARCHIVE_DIR}/"):
+            if staging is not None:
+                tar.extract(member, staging, filter="data")
+            continue
+        yield member
+
+
+def _replace_archive(archive: TransactionArchive, staging: str):
+    unpacked = os.path.join(staging, const.SNAPSHOT_ARCHIVE_DIR)
+    # Snapshots from before archives were included restore an empty one
+    os.makedirs(unpacked, exist_ok=True)
+    with archive.lock:
+        if os.path.exists(archive.path):
+            # Removed along with the staging directory
+            os.rename(archive.path, os.path.join(staging, "previous"))
+        os.rename(unpacked, archive.path)
+        archive.cached = None
+
+
+def _dump_sqlite(engine: Engine, workdir: str, manifest: dict) -> list[str]:
+    copy_path = os.path.join(workdir, const.SNAPSHOT_SQLITE_MEMBER)
+    target = sqlite3.connect(copy_path)
+    source = engine.raw_connection()
+    try:
+        source.driver_connection.backup(
+            target, pages=const.SNAPSHOT_SQLITE_BACKUP_PAGES)
+        for table in Base.metadata.sorted_tables:
+            rows = target.execute(
+                f'SELECT COUNT(*) FROM "{table.name}"').fetchone()[0]
+            manifest['tables'].append({
+                'name': table.name,
+                'columns': [column.name for column in table.columns],
+                'rows': rows
+            })
+    finally:
+        source.close()
+        target.close()
+
+    return [const.SNAPSHOT_SQLITE_MEMBER]
+
+
+def _restore_sqlite(engine: Engine, tar: tarfile.TarFile, members: Iterable[tarfile.TarInfo]):
+    with tempfile.TemporaryDirectory() as workdir:
+        copy_path = os.path.join(workdir, const.SNAPSHOT_SQLITE_MEMBER)
+        for member in members:
+            if member.name == const.SNAPSHOT_SQLITE_MEMBER:
+                with open(copy_path, "wb") as copy:
+                    shutil.copyfileobj(tar.extractfile(member), copy)
+        # Connecting would create an empty database and restore it over
+        # the live one
+        if not os.path.exists(copy_path):
+            raise SnapshotError(const.SNAPSHOT_MEMBER_MISSING_MSG.format(
+                const.SNAPSHOT_SQLITE_MEMBER))
+
+        source = sqlite3.connect(copy_path)
+        target = engine.raw_connection()
+        try:
+            source.backup(target.driver_connection,
+                          pages=const.SNAPSHOT_SQLITE_BACKUP_PAGES)
+        finally:
+            target.close()
+            source.close()
+
+
+def _dump_postgres(engine: Engine, workdir: str, manifest: dict) -> list[str]:
+    preparer = engine.dialect.identifier_preparer
+    os.makedirs(os.path.join(workdir, const.SNAPSHOT_TABLES_DIR))
+
+    members = []
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as connection:
+        with connection.begin():
+            cursor = connection.connection.driver_connection.cursor()
+            for table in Base.metadata.sorted_tables:
+                columns = [column.name for column in table.columns]
+                member = f"{const.SNAPSHOT_TABLES_DIR}/{table.name}.csv"
+                # Through a query, since COPY cannot read a partitioned table
+                # directly
+                with open(os.path.join(workdir, member), "wb") as copy:
+                    cursor.copy_expert(
+                        f"COPY (SELECT {', '.join(preparer.quote(column) for column in columns)} "
+                        f"FROM {preparer.quote(table.name)}) TO STDOUT WITH (FORMAT csv)", copy)
+                manifest['tables'].append({
+                    'name': table.name,
+                    'columns': columns,
+                    'rows': cursor.rowcount
+                })
+                members.append(member)
+
+    return members
+
+
+def _restore_postgres(engine: Engine, tar: tarfile.TarFile, members: Iterable[tarfile.TarInfo], manifest: dict):
+    preparer = engine.dialect.identifier_preparer
+    tables = {table.name: table for table in Base.metadata.sorted_tables}
+    snapshot_tables = {table['name']: table for table in manifest['tables']}
+    for name in snapshot_tables:
+        if name not in tables:
+            raise SnapshotError(const.SNAPSHOT_TABLE_UNKNOWN_MSG.format(name))
+
+    with engine.begin() as connection:
+        cursor = connection.connection.driver_connection.cursor()
+        cursor.execute(
+            f"TRUNCATE {', '.join(preparer.quote(name) for name in tables)} RESTART IDENTITY CASCADE")
+
+        # Tables were dumped parent first, so foreign keys hold while loading
+        for member in members:
+            name = os.path.splitext(os.path.basename(member.name))[0]
+            if not member.isfile() or name not in snapshot_tables:
+                continue
+            columns = snapshot_tables[name]['columns']
+            cursor.copy_expert(
+                f"COPY {preparer.quote(name)} ({', '.join(preparer.quote(column) for column in columns)}) "
+                "FROM STDIN WITH (FORMAT csv)", tar.extractfile(member))
+
+        # Move serial sequences past the restored ids
+        for table in tables.values():
+            primary_key = list(table.primary_key.columns)
+            if len(primary_key) != 1 or not isinstance(primary_key[0].type, Integer) \
+                    or primary_key[0].autoincrement is False:
+                continue
+            column = primary_key[0].name
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({preparer.quote(column)}), 1), "
+                f"MAX({preparer.quote(column)}) IS NOT NULL) FROM {preparer.quote(table.name)}",
+                (table.name, column))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m homestake.snapshot",
+        description="Dump or restore every HomeStake table using DATABASE_URL (or the local SQLite database).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("dump", help="write a snapshot").add_argument("path")
+    subparsers.add_parser("restore", help="replace the database with a snapshot").add_argument("path")
+    args = parser.parse_args(argv)
+
+    client = DatabaseClient()
+    if args.command == "dump":
+        manifest = dump_snapshot(client.engine, args.path, client.archive)
+    else:
+        manifest = restore_snapshot(client.engine, args.path, client.archive)
+
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from homestake.amortization import add_months, amortization_schedule, monthly_payment, scheduled_balance, simulate_scenarios
+
+
+def test_add_months_clamps_day():
+    assert add_months(datetime(2025, 1, 31), 1) == datetime(2025, 2, 28)
+    assert add_months(datetime(2025, 11, 15), 3) == datetime(2026, 2, 15)
+
+
+def test_monthly_payment():
+    assert round(monthly_payment(100000.0, 6, 360), 2) == 599.55
+    assert monthly_payment(120000.0, 0, 360) == 333.3333333333333
+    # No term, so all of it is due at once
+    assert monthly_payment(120000.0, 6, 0) == 120000.0
+    assert scheduled_balance(120000.0, 6, 0, 12) == 0.0
+    assert amortization_schedule(120000.0, 6, 0, datetime(2025, 1, 1)) == []
+
+
+def test_amortization_schedule_pays_off_loan():
+    schedule = amortization_schedule(100000.0, 6, 30, datetime(2025, 1, 1))
+    assert len(schedule) == 360
+    assert schedule[0]['interest'] == 500.0
+    assert schedule[-1]['balance'] == 0.0
+    assert schedule[-1]['date'] == '2055-01-01T00:00:00'
+
+
+def test_scheduled_balance_matches_schedule():
+    schedule = amortization_schedule(100000.0, 6, 30, datetime(2025, 1, 1))
+    assert round(scheduled_balance(100000.0, 6, 360, 120), 2) == schedule[119]['balance']
+    assert scheduled_balance(100000.0, 6, 360, 360) == 0.0
+
+
+def test_simulate_scenarios_baseline_matches_schedule():
+    schedule = amortization_schedule(100000.0, 6, 30, datetime(2025, 1, 1))
+    baseline, = simulate_scenarios(
+        100000.0, 6, 30, datetime(2025, 1, 1), [{}])
+    assert baseline['months'] == 360
+    assert baseline['payoff_date'] == schedule[-1]['date']
+    assert abs(baseline['total_interest'] -
+               sum(row['interest'] for row in schedule)) < 1
+
+
+def test_simulate_scenarios_prepayments_shorten_loan():
+    extra, lump_sum = simulate_scenarios(100000.0, 6, 30, datetime(2025, 1, 1), [
+        {'extra_monthly_principal': 200.0},
+        {'lump_sums': [{'month': 1, 'amount': 100000.0}]}
+    ])
+    assert extra['months'] < 360
+    assert lump_sum['months'] == 1
+    assert lump_sum['total_interest'] == 500.0
+
+
+def test_simulate_scenarios_rate_change_recasts_payment():
+    baseline, lower = simulate_scenarios(100000.0, 6, 30, datetime(2025, 1, 1), [
+        {},
+        {'rate_changes': [{'month': 1, 'interest_rate': 3}]}
+    ])
+    assert lower['months'] == 360
+    assert lower['total_interest'] < baseline['total_interest']
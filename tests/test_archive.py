@@ -0,0 +1,119 @@
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import delete
+
+from homestake.database.client import DatabaseClient, DatabaseClientError
+from homestake.database.models import MortgageBalance, MortgageProgress
+from homestake.seed import seed
+
+ARCHIVE_BEFORE = datetime(2019, 1, 1)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path / "archive"))
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+@pytest.fixture
+def seeded(client):
+    return seed(client.engine, properties=3, years=8, seed=2)
+
+
+def by_id(transactions):
+    return sorted(transactions, key=lambda transaction: transaction['id'])
+
+
+def test_archive_transactions(client, seeded):
+    user_id = seeded.first_user_id
+    account_id = seeded.first_account_id
+    by_user = client.list_transactions_by_user(user_id)
+    by_account = client.list_transactions_by_account(account_id)
+    progress = client.get_mortgage_progress(account_id)
+    exported = [row for batch in client.iter_transaction_batches(
+        property_id=seeded.first_property_id) for row in batch]
+    oldest = min(by_user, key=lambda transaction: transaction['date'])
+    # Spanning the archive horizon, with ties on amount
+    filters = {'start': datetime(2017, 6, 1), 'end': datetime(2019, 6, 1),
+               'min_amount': 20.0, 'max_amount': 3000.0, 'sort': "-amount"}
+    filtered = client.list_transactions_by_user(user_id, **filters)
+    assert len(filtered) > 2
+
+    result = client.archive_transactions(ARCHIVE_BEFORE)
+    assert 0 < result['transactions'] < seeded.transactions
+    # One file per property and year
+    assert result['files'] == len({(entry['property_id'], entry['year'])
+                                   for entry in client.archive.manifest()['files']})
+    assert all(entry['path'].endswith(".arrow")
+               for entry in client.archive.manifest()['files'])
+    assert len(client.list_transactions()) == seeded.transactions
+
+    # Reads merge archived and hot rows
+    assert by_id(client.list_transactions_by_user(user_id)) == by_id(by_user)
+    assert by_id(client.list_transactions_by_account(account_id)) == by_id(by_account)
+    assert client.get_transaction_by_id(oldest['id']) == oldest
+    assert client.list_transactions_by_user(user_id, **filters) == filtered
+    assert sorted(row for batch in client.iter_transaction_batches(
+        property_id=seeded.first_property_id) for row in batch) == sorted(exported)
+    # Progress replayed from scratch still counts archived payments
+    with client.engine.begin() as connection:
+        connection.execute(delete(MortgageBalance))
+        connection.execute(delete(MortgageProgress))
+    replayed = client.get_mortgage_progress(account_id)
+    assert {**replayed, 'as_of': None} == {**progress, 'as_of': None}
+
+    with pytest.raises(DatabaseClientError, match="archived"):
+        client.update_transaction(oldest['id'], amount=1.0)
+    with pytest.raises(DatabaseClientError, match="archived"):
+        client.delete_transaction(oldest['id'])
+
+    # Nothing left to move
+    assert client.archive_transactions(ARCHIVE_BEFORE)['transactions'] == 0
+
+
+def test_archive_merges_late_rows(client, seeded):
+    client.archive_transactions(ARCHIVE_BEFORE)
+    entry = client.archive.manifest()['files'][0]
+    user_id = entry['user_ids'][0]
+    late = client.create_transaction(
+        12.34, datetime(entry['year'], 6, 1), user_id, entry['account_ids'][0])
+
+    client.archive_transactions(ARCHIVE_BEFORE)
+    updated = next(file for file in client.archive.manifest()['files']
+                   if file['path'] == entry['path'])
+    assert updated['rows'] == entry['rows'] + 1
+    assert late in client.list_transactions_by_user(user_id)
+
+
+def test_archived_rows_on_end_date(client, seeded):
+    user_id = seeded.first_user_id
+    late = client.create_transaction(1.0, datetime(2018, 3, 1, 18), user_id, seeded.first_account_id)
+    client.archive_transactions(ARCHIVE_BEFORE)
+
+    # A date includes the whole day, a datetime stops at its time
+    assert late in client.list_transactions_by_user(user_id, end=date(2018, 3, 1))
+    assert late not in client.list_transactions_by_user(user_id, end=datetime(2018, 3, 1))
+    assert late in client.list_transactions_by_account(
+        seeded.first_account_id, start=date(2018, 3, 1), end=date(2018, 3, 1))
+
+
+def test_household_delete_removes_archived_rows(client, seeded):
+    client.archive_transactions(ARCHIVE_BEFORE)
+    archived = client.archive.read(
+        account_ids=[seeded.first_account_id]).num_rows
+
+    counts = client.delete_property_household(seeded.first_property_id)
+    assert counts['transactions'] > archived
+    assert not any(entry['property_id'] == seeded.first_property_id
+                   for entry in client.archive.manifest()['files'])
+    # Files left without rows are removed
+    assert all(os.path.exists(os.path.join(client.archive.path, entry['path']))
+               for entry in client.archive.manifest()['files'])
+    assert not os.listdir(os.path.join(
+        client.archive.path, f"property={seeded.first_property_id}"))
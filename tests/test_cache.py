@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+
+from homestake.cache import ResponseCache, cached
+from homestake.database.client import DatabaseClient, DatabaseDuplicationError
+from homestake.database.hooks import LISTENERS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def response(body: str) -> Response:
+    return Response(content=body, status_code=200, headers={"ETag": '"1-json"'})
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put((key,), response(key), ("users",), (0,))
+    assert cache.get(("a",)) is None
+    assert cache.get(("b",)).body == b"b"
+
+    # b was used last, so c goes first
+    cache.put(("d",), response("d"), ("users",), (0,))
+    assert cache.get(("c",)) is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_ttl():
+    clock = Clock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.put(("a",), response("a"), ("users",), (0,))
+    clock.now = 9.9
+    assert cache.get(("a",)) is not None
+    clock.now = 10
+    assert cache.get(("a",)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_by_table():
+    cache = ResponseCache()
+    cache.put(("user",), response("user"), ("users",), (0,))
+    cache.put(("list",), response("list"), ("users", "transactions"), (0, 0))
+    cache.put(("property",), response("property"), ("properties",), (0,))
+
+    cache.invalidate({"transactions"})
+    assert cache.get(("list",)) is None
+    assert cache.get(("user",)) is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_response_computed_during_write_not_stored():
+    cache = ResponseCache()
+    generation = cache.generation(("users",))
+    cache.invalidate({"users"})
+    cache.put(("user",), response("user"), ("users",), generation)
+    assert cache.get(("user",)) is None
+
+
+def test_cached_decorator():
+    cache = ResponseCache()
+    calls = []
+
+    @cached("users", cache=cache)
+    def handler(id: int, if_none_match: str | None = None) -> Response:
+        calls.append(id)
+        return response(str(id)) if id else Response(status_code=404)
+
+    assert handler(id=1).body == b"1"
+    assert handler(id=1).body == b"1"
+    assert handler(id=1, if_none_match='"1-json"').status_code == 304
+    assert calls == [1]
+    assert cache.stats()["hits"] == 2
+
+    handler(id=0)
+    handler(id=0)
+    assert calls == [1, 0, 0]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    client = DatabaseClient()
+    written = []
+    LISTENERS.append(written.append)
+    yield client, written
+    LISTENERS.remove(written.append)
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def test_write_hooks(client):
+    client, written = client
+    mortgage = client.create_mortgage(
+        "Hook Bank", 100000.0, 5, 30, datetime(2020, 1, 1))
+    assert {"accounts", "mortgages"} <= written[-1]
+
+    user = client.create_user("owner", "owner@example.com", "password", 50)
+    client.create_transactions([{'amount': 100.0, 'date': datetime(2024, 1, 1),
+                                 'user_id': user["id"], 'account_id': mortgage["id"]}])
+    assert "transactions" in written[-1]
+
+    count = len(written)
+    with pytest.raises(DatabaseDuplicationError):
+        client.create_user("owner", "owner@example.com", "password", 50)
+    client.get_user_by_id(user["id"])
+    assert len(written) == count
@@ -6,8 +6,8 @@ from typing import List
 
 
 import homestake.constants as const
-from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError
-from homestake.database.models import Account, Mortgage, Property, Transaction, User
+from homestake.database.client import DatabaseClient, DatabaseClientError, DatabaseDuplicationError, DatabaseInUseError
+from homestake.database.models import Account, IdempotencyKey, Job, Mortgage, MortgageBalance, MortgageProgress, Property, Transaction, User
 
 
 class TestMortgage(unittest.TestCase):
@@ -331,6 +331,22 @@ class TestMortgage(unittest.TestCase):
 
             mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
 
+    def test_delete_mortgage_integrity_error(self):
+        mortgage_id = 1
+        start_date = datetime.now(timezone.utc)
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = Mortgage(
+                start_date=start_date
+            )
+            mock_session.return_value.__enter__.return_value.commit.side_effect = IntegrityError(
+                "mock", "mock", "mock")
+            mock_session.return_value.__enter__.return_value.rollback = MagicMock()
+
+            with self.assertRaisesRegex(DatabaseInUseError, const.MORTGAGE_IN_USE_MSG):
+                self.db_client.delete_mortgage(mortgage_id)
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
     def test_delete_mortgage_not_found(self):
         mortgage_id = 1
         with patch("homestake.database.client.Session") as mock_session:
@@ -363,6 +379,50 @@ class TestMortgage(unittest.TestCase):
             mock_query.all.assert_called_once()
 
 
+class TestMortgageProgress(unittest.TestCase):
+    def setUp(self):
+        self.db_client = DatabaseClient()
+
+    def test_get_mortgage_progress_not_found(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = None
+
+            self.assertIsNone(self.db_client.get_mortgage_progress(1))
+
+            mock_session.return_value.__enter__.return_value.commit.assert_not_called()
+
+    def test_get_mortgage_progress_resumes_from_dirty_period(self):
+        mortgage_id = 1
+        start_date = datetime(2020, 1, 1)
+        with patch("homestake.database.client.Session") as mock_session:
+            session = mock_session.return_value.__enter__.return_value
+            session.query.return_value.filter_by.return_value.first.return_value = Mortgage(
+                id=mortgage_id, loan_amount=100000.0, interest_rate=6, term=30, start_date=start_date)
+            session.get.side_effect = [
+                MortgageProgress(mortgage_id=mortgage_id, period=24,
+                                 dirty_from=datetime(2021, 6, 15)),
+                MortgageBalance(mortgage_id=mortgage_id, period=17, balance=98000.0,
+                                principal_paid=2000.0, interest_paid=8000.0)
+            ]
+            session.execute.return_value.all.return_value = []
+
+            progress = self.db_client.get_mortgage_progress(mortgage_id)
+
+            # The snapshot before the period holding the dirty date is reused
+            session.get.assert_any_call(MortgageBalance, (mortgage_id, 17))
+            self.assertGreater(progress["remaining_balance"], 98000.0)
+            self.assertGreater(progress["interest_paid"], 8000.0)
+            self.assertLess(progress["months_ahead"], 0)
+            session.commit.assert_called_once()
+
+    def test_create_transaction_invalidates_mortgage_progress(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            self.db_client.create_transaction(
+                100.0, datetime(2021, 6, 15), 1, 2)
+
+            mock_session.return_value.__enter__.return_value.execute.assert_called_once()
+
+
 class TestProperty(unittest.TestCase):
     def setUp(self):
         self.db_client = DatabaseClient()
@@ -662,6 +722,66 @@ class TestProperty(unittest.TestCase):
             mock_session.return_value.__enter__.return_value.commit.assert_not_called()
             mock_session.return_value.__enter__.return_value.rollback.assert_not_called()
 
+    def test_delete_property_household_not_found(self):
+        property_id = 1
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.get.return_value = None
+
+            with self.assertRaisesRegex(DatabaseClientError, const.PROPERTY_ID_NOT_FOUND.format(property_id)):
+                self.db_client.delete_property_household(property_id)
+
+            mock_session.return_value.__enter__.return_value.execute.assert_not_called()
+
+    def test_delete_property_household_sqlalchemy_error(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.get.return_value = Property()
+            mock_session.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError(
+                "mock")
+
+            with self.assertRaisesRegex(DatabaseClientError, const.PROPERTY_DELETE_ERROR_MSG):
+                self.db_client.delete_property_household(1)
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_not_called()
+
+
+class TestPropertyValuation(unittest.TestCase):
+    def setUp(self):
+        self.db_client = DatabaseClient()
+
+    def test_create_property_records_valuation(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.add = MagicMock(
+                side_effect=lambda property: setattr(property, "id", 1))
+
+            self.db_client.create_property(
+                "primary residence", "123 Test St", 100000.00, datetime(2020, 1, 1), 110000.00)
+
+            mock_session.return_value.__enter__.return_value.execute.assert_called_once()
+            valuations = mock_session.return_value.__enter__.return_value.execute.call_args.args[1]
+            self.assertEqual(sorted(valuation["value"] for valuation in valuations), [
+                100000.00, 110000.00])
+
+    def test_create_property_valuation_not_found(self):
+        property_id = 1
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = None
+
+            with self.assertRaisesRegex(DatabaseClientError, const.PROPERTY_ID_NOT_FOUND.format(property_id)):
+                self.db_client.create_property_valuation(
+                    property_id, 120000.00, datetime(2021, 1, 1))
+
+            mock_session.return_value.__enter__.return_value.commit.assert_not_called()
+
+    def test_list_property_valuations_empty(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.return_value.one.return_value = (
+                None, None, 0)
+
+            self.assertEqual(self.db_client.list_property_valuations(1), [])
+
+            mock_session.return_value.__enter__.return_value.scalars.assert_not_called()
+
 
 class TestTransaction(unittest.TestCase):
     def setUp(self):
@@ -692,6 +812,41 @@ class TestTransaction(unittest.TestCase):
             mock_session.return_value.__enter__.return_value.add.assert_called_once()
             mock_session.return_value.__enter__.return_value.commit.assert_called_once()
 
+    def test_create_transactions(self):
+        transactions = [
+            Transaction(id=1, amount=100.0, date=datetime(
+                2021, 6, 15), user_id=1, account_id=2),
+            Transaction(id=2, amount=200.0, date=datetime(
+                2021, 5, 15), user_id=1, account_id=2)
+        ]
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.scalars.return_value.all.return_value = transactions
+
+            result = self.db_client.create_transactions([
+                {"amount": 100.0, "date": datetime(
+                    2021, 6, 15), "user_id": 1, "account_id": 2},
+                {"amount": 200.0, "date": datetime(
+                    2021, 5, 15), "user_id": 1, "account_id": 2}
+            ])
+
+            self.assertEqual([transaction["id"]
+                             for transaction in result], [1, 2])
+            mock_session.return_value.__enter__.return_value.scalars.assert_called_once()
+            # One progress invalidation per account, from its earliest date
+            mock_session.return_value.__enter__.return_value.execute.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_create_transactions_sqlalchemy_error(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.scalars.side_effect = SQLAlchemyError(
+                "mock")
+
+            with self.assertRaisesRegex(DatabaseClientError, const.TRANSACTION_CREATE_ERROR_MSG):
+                self.db_client.create_transactions(
+                    [{"amount": 100.0, "date": datetime(2021, 6, 15), "user_id": 1, "account_id": 2}])
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
     def test_create_transaction_integrity_error(self):
         amount = 9001.00
         user_id = 1
@@ -758,11 +913,15 @@ class TestTransaction(unittest.TestCase):
                 return_value=MagicMock(
                     filter_by=MagicMock(
                         return_value=MagicMock(
-                            all=MagicMock(return_value=[Transaction(
-                                id=transaction_id,
-                                date=datetime.now(timezone.utc),
-                                user_id=user_id
-                            )])
+                            order_by=MagicMock(
+                                return_value=MagicMock(
+                                    all=MagicMock(return_value=[Transaction(
+                                        id=transaction_id,
+                                        date=datetime.now(timezone.utc),
+                                        user_id=user_id
+                                    )])
+                                )
+                            )
                         )
                     )
                 )
@@ -785,15 +944,18 @@ class TestTransaction(unittest.TestCase):
                     filter_by=MagicMock(
                         return_value=MagicMock(
                             first=MagicMock(
-                                return_value=Account(
-                                    transactions=[
+                                return_value=Account(id=account_id)
+                            ),
+                            order_by=MagicMock(
+                                return_value=MagicMock(
+                                    all=MagicMock(return_value=[
                                         Transaction(
                                             id=transaction_id,
                                             date=datetime.now(timezone.utc),
                                             account_id=account_id,
                                             user_id=user_id
                                         )
-                                    ]
+                                    ])
                                 )
                             )
                         )
@@ -807,7 +969,8 @@ class TestTransaction(unittest.TestCase):
             self.assertTrue(all(
                 transaction["id"] == transaction_id and transaction["user_id"] for transaction in transactions))
 
-            mock_session.return_value.__enter__.return_value.query.assert_called_once()
+            self.assertEqual(
+                mock_session.return_value.__enter__.return_value.query.call_count, 2)
 
     def test_list_transactions_by_account_account_no_exist(self):
         account_id = 1
@@ -1209,3 +1372,196 @@ class TestUser(unittest.TestCase):
 
             mock_session.return_value.__enter__.return_value.query.assert_called_once()
             mock_query.all.assert_called_once()
+
+
+class TestIdempotencyKey(unittest.TestCase):
+    def setUp(self):
+        self.db_client = DatabaseClient()
+
+    def test_create_idempotency_key(self):
+        key = "testkey"
+        request_hash = "testhash"
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.add = MagicMock()
+            mock_session.return_value.__enter__.return_value.commit = MagicMock()
+
+            result = self.db_client.create_idempotency_key(key, request_hash)
+            self.assertEqual(result["key"], key)
+            self.assertEqual(result["request_hash"], request_hash)
+            self.assertIsNone(result["status_code"])
+            self.assertIsNone(result["response"])
+
+            mock_session.return_value.__enter__.return_value.add.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_create_idempotency_key_integrity_error_key_exists(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.add = MagicMock()
+            mock_session.return_value.__enter__.return_value.commit.side_effect = IntegrityError(
+                f"{const.DB_ENTRY_EXISTS_MSG}: idempotency_keys.key", "mock", "mock")
+            mock_session.return_value.__enter__.return_value.rollback = MagicMock()
+
+            with self.assertRaisesRegex(DatabaseDuplicationError, const.IDEMPOTENCY_KEY_EXISTS_MSG):
+                self.db_client.create_idempotency_key("testkey", "testhash")
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
+    def test_get_idempotency_key(self):
+        key = "testkey"
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = IdempotencyKey(
+                key=key, request_hash="testhash", status_code=201, response="{}", created_at=datetime.now(timezone.utc))
+
+            result = self.db_client.get_idempotency_key(key)
+            self.assertEqual(result["key"], key)
+            self.assertEqual(result["status_code"], 201)
+
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.assert_called_once_with(
+                key=key)
+
+    def test_update_idempotency_key(self):
+        key = "testkey"
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = IdempotencyKey(
+                key=key, request_hash="testhash", created_at=datetime.now(timezone.utc))
+
+            result = self.db_client.update_idempotency_key(key, 201, "{}")
+            self.assertEqual(result["status_code"], 201)
+            self.assertEqual(result["response"], "{}")
+
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_update_idempotency_key_not_found(self):
+        key = "testkey"
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = None
+
+            with self.assertRaisesRegex(DatabaseClientError, const.IDEMPOTENCY_KEY_NOT_FOUND.format(key)):
+                self.db_client.update_idempotency_key(key, 201, "{}")
+
+            mock_session.return_value.__enter__.return_value.commit.assert_not_called()
+
+    def test_delete_expired_idempotency_keys(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.return_value.rowcount = 2
+
+            deleted = self.db_client.delete_expired_idempotency_keys(
+                datetime.now(timezone.utc))
+            self.assertEqual(deleted, 2)
+
+            mock_session.return_value.__enter__.return_value.execute.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_delete_expired_idempotency_keys_sqlalchemy_error(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError(
+                "mock")
+
+            with self.assertRaisesRegex(DatabaseClientError, const.IDEMPOTENCY_KEY_DELETE_ERROR_MSG):
+                self.db_client.delete_expired_idempotency_keys(
+                    datetime.now(timezone.utc))
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
+
+class TestEvent(unittest.TestCase):
+    def setUp(self):
+        self.db_client = DatabaseClient()
+
+    def test_delete_expired_events(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.return_value.rowcount = 3
+
+            deleted = self.db_client.delete_expired_events(
+                datetime.now(timezone.utc))
+            self.assertEqual(deleted, 3)
+
+            mock_session.return_value.__enter__.return_value.execute.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_delete_expired_events_sqlalchemy_error(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError(
+                "mock")
+
+            with self.assertRaisesRegex(DatabaseClientError, const.EVENT_DELETE_ERROR_MSG):
+                self.db_client.delete_expired_events(
+                    datetime.now(timezone.utc))
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
+
+class TestJob(unittest.TestCase):
+    def setUp(self):
+        self.db_client = DatabaseClient()
+
+    def test_create_job(self):
+        job_id = 1
+        params = {"mortgage_id": 2}
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.add = MagicMock(
+                side_effect=lambda job: setattr(job, "id", job_id))
+            mock_session.return_value.__enter__.return_value.commit = MagicMock()
+
+            result = self.db_client.create_job("amortization", params)
+            self.assertEqual(result["id"], job_id)
+            self.assertEqual(result["type"], "amortization")
+            self.assertEqual(result["status"], const.JOB_STATUS_QUEUED)
+            self.assertEqual(result["params"], params)
+
+            mock_session.return_value.__enter__.return_value.add.assert_called_once()
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_create_job_sqlalchemy_error(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.commit.side_effect = SQLAlchemyError(
+                "mock")
+
+            with self.assertRaisesRegex(DatabaseClientError, const.JOB_CREATE_ERROR_MSG):
+                self.db_client.create_job("amortization", {})
+
+            mock_session.return_value.__enter__.return_value.rollback.assert_called_once()
+
+    def test_claim_job(self):
+        job_id = 1
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.return_value.rowcount = 1
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = Job(
+                id=job_id, type="amortization", status=const.JOB_STATUS_RUNNING, params="{}")
+
+            result = self.db_client.claim_job(job_id, "runner")
+            self.assertEqual(result["status"], const.JOB_STATUS_RUNNING)
+
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_claim_job_already_claimed(self):
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.execute.return_value.rowcount = 0
+
+            self.assertIsNone(self.db_client.claim_job(1, "runner"))
+
+            mock_session.return_value.__enter__.return_value.query.assert_not_called()
+
+    def test_update_job(self):
+        job_id = 1
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = Job(
+                id=job_id, type="amortization", status=const.JOB_STATUS_RUNNING, params="{}")
+
+            result = self.db_client.update_job(
+                job_id, status=const.JOB_STATUS_SUCCEEDED, result={"ok": True})
+            self.assertEqual(result["status"], const.JOB_STATUS_SUCCEEDED)
+            self.assertEqual(result["result"], {"ok": True})
+
+            mock_session.return_value.__enter__.return_value.commit.assert_called_once()
+
+    def test_update_job_not_found(self):
+        job_id = 1
+        with patch("homestake.database.client.Session") as mock_session:
+            mock_session.return_value.__enter__.return_value.query.return_value.filter_by.return_value.first.return_value = None
+
+            with self.assertRaisesRegex(DatabaseClientError, const.JOB_ID_NOT_FOUND.format(job_id)):
+                self.db_client.update_job(
+                    job_id, status=const.JOB_STATUS_SUCCEEDED)
+
+            mock_session.return_value.__enter__.return_value.commit.assert_not_called()
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+import homestake.routes.event as event_routes
+from homestake.database.client import DatabaseClient, DatabaseDuplicationError
+from homestake.database.events import NOTIFIER
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    client = DatabaseClient()
+    monkeypatch.setattr(event_routes, "DB_CLIENT", client)
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def household(client, name="Event Property"):
+    property = client.create_property(name, f"1 {name} Road", 250000.0,
+                                      datetime(2020, 1, 1), 300000.0)
+    mortgage = client.create_mortgage("Event Bank", 200000.0, 5, 30, datetime(2020, 1, 1),
+                                      name=f"{name} Mortgage", property_id=property["id"])
+    user = client.create_user(f"{name} Owner", f"{property['id']}@example.com", "password", 50,
+                              mortgage_id=mortgage["id"], property_id=property["id"])
+    return property, mortgage, user
+
+
+def test_write_paths_record_events(client):
+    property, mortgage, user = household(client)
+    transaction = client.create_transaction(
+        1000.0, datetime(2024, 1, 1), user["id"], mortgage["id"])
+    client.update_transaction(transaction["id"], amount=1200.0)
+    client.delete_transaction(transaction["id"])
+
+    events = client.list_events()
+    assert [(event["entity"], event["action"]) for event in events] == [
+        ("property", "create"),
+        ("mortgage", "create"),
+        ("user", "create"),
+        ("transaction", "create"),
+        ("transaction", "update"),
+        ("transaction", "delete")
+    ]
+    assert {event["property_id"] for event in events} == {property["id"]}
+    assert events[4]["data"]["amount"] == 1200.0
+    assert events[4]["entity_id"] == transaction["id"]
+
+
+def test_rolled_back_writes_record_nothing(client):
+    client.create_user("owner", "owner@example.com", "password", 50)
+    latest = client.get_latest_event_id()
+    with pytest.raises(DatabaseDuplicationError):
+        client.create_user("owner", "owner@example.com", "password", 50)
+    assert client.get_latest_event_id() == latest
+
+
+def test_list_events_filters(client):
+    first, _, _ = household(client, "First")
+    second, mortgage, user = household(client, "Second")
+    client.create_transactions([{'amount': 100.0, 'date': datetime(2024, month, 1),
+                                 'user_id': user["id"], 'account_id': mortgage["id"]} for month in (1, 2)])
+
+    events = client.list_events(property_id=second["id"])
+    assert [event["entity"] for event in events] == [
+        "property", "mortgage", "user", "transaction", "transaction"]
+    assert client.list_events(events[2]["id"], second["id"]) == events[3:]
+    assert client.list_events(property_id=second["id"], limit=2) == events[:2]
+    assert len(client.list_events(property_id=first["id"])) == 3
+
+
+def test_household_delete_records_one_event(client):
+    property, _, _ = household(client)
+    latest = client.get_latest_event_id()
+    client.delete_property_household(property["id"])
+
+    events = client.list_events(latest)
+    assert len(events) == 1
+    assert events[0]["action"] == "delete"
+    assert events[0]["data"]["household"]["users"] == 1
+
+
+class Request:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_event_stream(client):
+    property, mortgage, user = household(client)
+
+    async def read():
+        request = Request()
+        stream = event_routes.event_stream(request, property["id"], 0)
+        chunks = [await anext(stream) for _ in range(4)]
+
+        # Later commits wake the stream without waiting for the next poll
+        writer = threading.Thread(target=client.create_transaction, args=(
+            500.0, datetime(2024, 1, 1), user["id"], mortgage["id"]))
+        writer.start()
+        chunks.append(await asyncio.wait_for(anext(stream), 2))
+        writer.join()
+
+        request.disconnected = True
+        await stream.aclose()
+        return chunks
+
+    chunks = asyncio.run(read())
+    assert chunks[0] == "retry: 3000\n\n"
+    assert chunks[1].startswith("id: 1\nevent: property.create\ndata: {")
+    assert chunks[3].startswith("id: 3\nevent: user.create\n")
+    assert chunks[4].startswith("id: 4\nevent: transaction.create\n")
+    assert not NOTIFIER.subscriptions
+
+
+def test_event_stream_starts_at_latest(client):
+    household(client)
+
+    async def read():
+        stream = event_routes.event_stream(Request(), None, None)
+        await anext(stream)
+        client.create_user("late", "late@example.com", "password", 10)
+        chunk = await asyncio.wait_for(anext(stream), 2)
+        await stream.aclose()
+        return chunk
+
+    assert asyncio.run(read()).startswith("id: 4\nevent: user.create\n")
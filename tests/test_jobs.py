@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import homestake.constants as const
+from homestake.database.client import DatabaseClient
+from homestake.jobs import JOB_HANDLERS, JobRunner
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path / "archive"))
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+@pytest.fixture
+def blocking_job(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(params):
+        started.set()
+        release.wait(5)
+        return {}
+
+    monkeypatch.setitem(JOB_HANDLERS, "blocking", handler)
+    yield started, release
+    release.set()
+
+
+def test_stop_leaves_unclaimed_jobs_queued(client, blocking_job):
+    started, release = blocking_job
+    runner = JobRunner(client, workers=1)
+    running = runner.submit("blocking", {})
+    assert started.wait(5)
+    queued = [runner.submit("blocking", {}) for _ in range(3)]
+
+    stopper = threading.Thread(target=runner.stop)
+    stopper.start()
+    release.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+
+    assert client.get_job_by_id(running['id'])['status'] == const.JOB_STATUS_SUCCEEDED
+    assert [client.get_job_by_id(job['id'])['status'] for job in queued] == [const.JOB_STATUS_QUEUED] * 3
+    assert client.list_queued_job_ids() == [job['id'] for job in queued]
+
+
+def test_stop_timeout(client, blocking_job):
+    started, _ = blocking_job
+    runner = JobRunner(client, workers=1)
+    job = runner.submit("blocking", {})
+    assert started.wait(5)
+
+    # Gives up on the running job instead of waiting for it
+    runner.stop(timeout=0.1)
+    assert runner.threads == []
+    assert client.get_job_by_id(job['id'])['status'] == const.JOB_STATUS_RUNNING
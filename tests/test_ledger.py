@@ -0,0 +1,228 @@
+from datetime import date, datetime, time
+
+import numpy as np
+import pytest
+
+from homestake.database.client import DatabaseClient
+from homestake.database.hooks import APPEND_LISTENERS, COMMIT_FINISHED_LISTENERS, COMMIT_STARTED_LISTENERS
+from homestake.ledger import LedgerCache, PropertyLedger, epoch_day
+from homestake.seed import seed
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path / "archive"))
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+@pytest.fixture
+def seeded(client):
+    return seed(client.engine, properties=2, years=4, seed=3)
+
+
+@pytest.fixture
+def ledgers():
+    ledgers = LedgerCache(clock=Clock())
+    COMMIT_STARTED_LISTENERS.append(ledgers.commit_started)
+    APPEND_LISTENERS.append(ledgers.apply)
+    COMMIT_FINISHED_LISTENERS.append(ledgers.commit_finished)
+    yield ledgers
+    COMMIT_STARTED_LISTENERS.remove(ledgers.commit_started)
+    APPEND_LISTENERS.remove(ledgers.apply)
+    COMMIT_FINISHED_LISTENERS.remove(ledgers.commit_finished)
+
+
+def owner_totals(client, property_id, as_of):
+    end = datetime.combine(as_of, time.max)
+    owners = client.get_property_ledger(property_id)['owners']
+    return [round(sum(transaction['amount'] for transaction in client.list_transactions_by_user(
+        owner['id'], end=end)), 2) for owner in owners]
+
+
+def property_ledger(*transactions):
+    owners = [{'id': 1, 'user_name': "a", 'stake': 60},
+              {'id': 2, 'user_name': "b", 'stake': 40}]
+    user_ids, dates, amounts = zip(*transactions)
+    return PropertyLedger(owners, np.array(user_ids), np.array([7] * len(user_ids)),
+                          np.array(dates, dtype="datetime64[us]"), np.array(amounts))
+
+
+def test_equity():
+    ledger = property_ledger((2, "2024-03-01T12:00", 5000), (1, "2024-01-01T00:00", 10000),
+                             (1, "2024-02-01T00:00", 5000))
+
+    before = ledger.equity(date(2023, 12, 31))
+    assert before['total_contributions'] == 0
+    assert [owner['share'] for owner in before['owners']] == [0.0, 0.0]
+
+    # Transactions count from the start of their day
+    assert list(ledger.contributions(date(2024, 1, 1))) == [10000, 0]
+    assert list(ledger.contributions(date(2024, 2, 29))) == [15000, 0]
+    equity = ledger.equity(date(2024, 3, 1))
+    assert equity['total_contributions'] == 200.0
+    assert [(owner['contributions'], owner['share']) for owner in equity['owners']] == [
+        (150.0, 0.75), (50.0, 0.25)]
+
+
+def test_totals_and_rollup():
+    ledger = property_ledger((1, "2024-01-05T00:00", 1000), (2, "2024-01-20T00:00", 250),
+                             (1, "2024-03-01T00:00", 500), (2, "2025-02-01T00:00", 100))
+
+    assert [(user['total'], user['count']) for user in ledger.user_totals()] == [(15.0, 2), (3.5, 2)]
+    assert [(user['total'], user['count']) for user in ledger.user_totals(
+        date(2024, 1, 20), date(2024, 3, 1))] == [(5.0, 1), (2.5, 1)]
+    assert ledger.rollup() == [
+        {'period': "2024-01", 'total': 12.5, 'count': 2},
+        {'period': "2024-03", 'total': 5.0, 'count': 1},
+        {'period': "2025-02", 'total': 1.0, 'count': 1}]
+    assert ledger.rollup(period="year") == [
+        {'period': "2024", 'total': 17.5, 'count': 3},
+        {'period': "2025", 'total': 1.0, 'count': 1}]
+    assert ledger.rollup(date(2026, 1, 1)) == []
+
+
+def test_append():
+    ledger = property_ledger((1, "2024-01-01T00:00", 1000), (2, "2024-03-01T00:00", 500))
+    assert list(ledger.contributions(date(2024, 3, 1))) == [1000, 500]
+
+    # Past the initial capacity, and back-dated
+    for _ in range(100):
+        assert ledger.append(2, 7, epoch_day(date(2024, 2, 1)), 10)
+    assert ledger.size == 102
+    assert list(ledger.days[:ledger.size]) == sorted(ledger.days[:ledger.size])
+    assert list(ledger.contributions(date(2024, 2, 1))) == [1000, 1000]
+    assert list(ledger.contributions(date(2024, 3, 1))) == [1000, 1500]
+
+    assert not ledger.append(3, 7, epoch_day(date(2024, 2, 1)), 10)
+
+    # Running totals kept up to date match ones built from scratch
+    rebuilt = PropertyLedger(ledger.owners, ledger.user_ids[:ledger.size], ledger.account_ids[:ledger.size],
+                             ledger.days[:ledger.size].astype("datetime64[D]").astype("datetime64[us]"),
+                             ledger.amounts[:ledger.size])
+    assert (ledger.totals[:ledger.size] == rebuilt.totals[:rebuilt.size]).all()
+    assert ledger.nbytes == 128 * (8 + 8 + 4 + 8 + 2 * 8)
+
+
+def test_property_ledger_matches_transactions(client, seeded):
+    ledger = LedgerCache().get(seeded.first_property_id, client)
+    for as_of in (date(2024, 1, 1), date.today()):
+        contributions = [owner['contributions']
+                         for owner in ledger.equity(as_of)['owners']]
+        assert contributions == owner_totals(
+            client, seeded.first_property_id, as_of)
+        assert [user['total'] for user in ledger.user_totals(end=as_of)] == contributions
+    assert ledger.equity(date.today())['total_contributions'] > 0
+    assert round(sum(period['total'] for period in ledger.rollup()), 2) == \
+        ledger.equity(date.today())['total_contributions']
+
+    assert LedgerCache().get(999999, client) is None
+
+
+def test_property_ledger_after_archiving(client, seeded):
+    property_id = seeded.first_property_id
+    as_of = date.today()
+    equity = LedgerCache().get(property_id, client).equity(as_of)
+    assert client.archive_transactions(datetime(as_of.year - 2, 1, 1))['transactions'] > 0
+    assert LedgerCache().get(property_id, client).equity(as_of) == equity
+
+
+def test_create_transaction_appends(client, seeded, ledgers):
+    property_id = seeded.first_property_id
+    ledger = ledgers.get(property_id, client)
+    owner = ledger.owners[0]
+    account_id = client.list_transactions_by_user(owner['id'])[0]['account_id']
+
+    client.create_transaction(12.34, datetime(2021, 6, 1), owner['id'], account_id)
+    assert ledgers.get(property_id, client) is ledger
+    assert ledgers.nbytes == ledger.nbytes
+    as_of = date.today()
+    assert [owner['contributions'] for owner in ledger.equity(as_of)['owners']] == \
+        owner_totals(client, property_id, as_of)
+
+    # Any other write to a ledger table starts over
+    transaction = client.list_transactions_by_user(owner['id'])[0]
+    client.update_transaction(transaction['id'], amount=1.0)
+    assert ledgers.get(property_id, client) is not ledger
+
+
+def test_load_racing_append_not_kept(client, seeded, ledgers):
+    property_id = seeded.first_property_id
+    owner = ledgers.get(property_id, client).owners[0]
+    account_id = client.list_transactions_by_user(owner['id'])[0]['account_id']
+    ledgers.entries.clear()
+    ledgers.nbytes = 0
+
+    # Loaded after the commit, which it sees, but before the append
+    loaded = []
+    racing = lambda replaced, appended: loaded.append(ledgers.get(property_id, client))
+    APPEND_LISTENERS.insert(APPEND_LISTENERS.index(ledgers.apply), racing)
+    try:
+        client.create_transaction(12.34, datetime(2021, 6, 1), owner['id'], account_id)
+    finally:
+        APPEND_LISTENERS.remove(racing)
+
+    assert property_id not in ledgers.entries
+    assert ledgers.committing == 0
+    as_of = date.today()
+    for ledger in (loaded[0], ledgers.get(property_id, client)):
+        assert [owner['contributions'] for owner in ledger.equity(as_of)['owners']] == \
+            owner_totals(client, property_id, as_of)
+    assert property_id in ledgers.entries
+
+
+def test_ledger_cache_invalidate(client, seeded):
+    clock = Clock()
+    ledgers = LedgerCache(ttl=10, clock=clock)
+    property_id = seeded.first_property_id
+    ledger = ledgers.get(property_id, client)
+    assert ledgers.get(property_id, client) is ledger
+
+    ledgers.apply({"mortgage_progress"}, {})
+    assert ledgers.get(property_id, client) is ledger
+    ledgers.apply({"users"}, {})
+    assert ledgers.get(property_id, client) is not ledger
+
+    ledger = ledgers.get(property_id, client)
+    clock.now = 10
+    assert ledgers.get(property_id, client) is not ledger
+
+
+def test_ledger_cache_lru():
+    class Client:
+        def get_property_ledger(self, property_id):
+            return {'owners': [{'id': 1, 'user_name': "a", 'stake': 100}],
+                    'user_ids': np.ones(property_id, dtype=np.int64),
+                    'account_ids': np.ones(property_id, dtype=np.int64),
+                    'dates': np.full(property_id, "2024-01-01", dtype="datetime64[us]"),
+                    'amounts': np.ones(property_id, dtype=np.int64)}
+
+    # Each ledger holds the minimum capacity of 64 rows
+    size = PropertyLedger(owners=[{'id': 1}], user_ids=np.ones(1, dtype=np.int64),
+                          account_ids=np.ones(1, dtype=np.int64), dates=np.zeros(1, dtype="datetime64[us]"),
+                          amounts=np.ones(1, dtype=np.int64)).nbytes
+    ledgers = LedgerCache(max_bytes=3 * size)
+    first = ledgers.get(1, Client())
+    ledgers.get(2, Client())
+    ledgers.get(3, Client())
+    assert ledgers.get(1, Client()) is first
+    assert list(ledgers.entries) == [2, 3, 1]
+
+    # 1 was used last, so 2 makes room for 4
+    ledgers.get(4, Client())
+    assert list(ledgers.entries) == [3, 1, 4]
+    assert ledgers.nbytes == 3 * size
+    # Ledgers larger than the bound are not kept
+    ledgers.get(200, Client())
+    assert list(ledgers.entries) == [3, 1, 4]
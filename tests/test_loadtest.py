@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.loadtest import parse_mix, summarize
+
+
+def test_parse_mix():
+    assert parse_mix("create=1,lookup=4,list") == {
+        'create': 1.0, 'lookup': 4.0, 'list': 1.0}
+
+
+def test_parse_mix_unknown_operation():
+    with pytest.raises(ValueError):
+        parse_mix("create=1,drop=2")
+
+
+def test_summarize_percentiles():
+    samples = {
+        "GET /users/{id}": [(index / 1000, 200) for index in range(1, 101)],
+        "POST /users": [(0.002, 201), (0.004, 409)]
+    }
+    routes = summarize(samples, duration=2.0)
+
+    assert routes["GET /users/{id}"]['requests'] == 100
+    assert routes["GET /users/{id}"]['throughput'] == 50.0
+    assert routes["GET /users/{id}"]['p50_ms'] == pytest.approx(50.5)
+    assert routes["GET /users/{id}"]['p99_ms'] == pytest.approx(99.01)
+    assert routes["POST /users"]['errors'] == 1
+    assert routes["POST /users"]['status'] == {'201': 1, '409': 1}
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from homestake.middleware import RateLimitMiddleware, TokenBucket
+
+
+def make_client(**kwargs) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, **kwargs)
+
+    @app.get("/items/{id}")
+    def get_item(id: int):
+        return {"id": id}
+
+    @app.get("/health")
+    def health():
+        return "OK"
+
+    return TestClient(app)
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+    assert bucket.consume(0.0) == 0.0
+    assert bucket.consume(0.0) == 0.0
+    assert bucket.consume(0.0) == 1.0
+    assert bucket.consume(1.0) == 0.0
+
+
+def test_rate_limit_client_429():
+    client = make_client(client_rate=0.001, client_burst=2)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+
+    response = client.get("/items/3")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_rate_limit_per_api_key():
+    client = make_client(client_rate=0.001, client_burst=1)
+    assert client.get(
+        "/items/1", headers={"X-API-Key": "a"}).status_code == 200
+    assert client.get(
+        "/items/1", headers={"X-API-Key": "a"}).status_code == 429
+    assert client.get(
+        "/items/1", headers={"X-API-Key": "b"}).status_code == 200
+
+
+def test_rate_limit_route_override():
+    client = make_client(route_limits={"GET /items/{id}": (0.001, 1)})
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 429
+
+
+def test_rate_limit_exempt_path():
+    client = make_client(client_rate=0.001, client_burst=1)
+    assert client.get("/health").status_code == 200
+    assert client.get("/health").status_code == 200
+
+
+def test_load_shed_pool_saturated_503():
+    client = make_client()
+    with patch("homestake.middleware.pool_status", return_value=[{"saturation": 1.0}]):
+        response = client.get("/items/1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_load_shed_threadpool_waiting_503():
+    client = make_client(threadpool_waiting=0)
+    assert client.get("/items/1").status_code == 503
+
+
+def test_load_shed_ignores_sqlite_writer_pool():
+    client = make_client()
+    with patch("homestake.middleware.pool_status", return_value=[{"role": "writer", "saturation": 1.0}]):
+        assert client.get("/items/1").status_code == 200
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Float, MetaData, create_engine, func, select
+
+from homestake.database.client import DatabaseClient
+from homestake.database.migrations import MONEY_COLUMNS
+from homestake.database.models import Base, SchemaMigration, Transaction
+from homestake.money import from_cents, from_cents_array, to_cents, to_cents_array
+
+
+def test_to_cents():
+    assert to_cents(1.005) == 101
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(-2.675) == -268
+    assert to_cents(12) == 1200
+    assert to_cents(None) is None
+
+
+def test_from_cents():
+    assert from_cents(101) == 1.01
+    assert from_cents(None) is None
+
+
+def test_cents_arrays():
+    cents = to_cents_array([0.1, 0.2, 1234.56])
+    assert cents.dtype == np.int64
+    assert cents.tolist() == [10, 20, 123456]
+    assert from_cents_array(cents).tolist() == [0.1, 0.2, 1234.56]
+
+
+def test_money_to_cents_migration(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'homestake.db'}"
+    # The schema as it was, with money in floating point units
+    legacy = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(legacy)
+    for table, column in MONEY_COLUMNS:
+        legacy.tables[table].c[column].type = Float()
+    engine = create_engine(database_url)
+    legacy.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO properties (id, name, address, purchase_price, purchase_date, current_value) "
+            "VALUES (1, 'Legacy', '1 Legacy Lane', 250000.5, '2020-01-01 00:00:00.000000', 300000.0)")
+        connection.exec_driver_sql(
+            "INSERT INTO accounts (id, name, type) VALUES (1, 'Legacy Mortgage', 'mortgage')")
+        connection.exec_driver_sql(
+            "INSERT INTO mortgages (id, lender, loan_amount, interest_rate, term, start_date, property_id) "
+            "VALUES (1, 'Legacy Bank', 200000.0, 5, 30, '2020-01-01 00:00:00.000000', 1)")
+        connection.exec_driver_sql(
+            "INSERT INTO users (id, user_name, email, password, stake, property_id, mortgage_id) "
+            "VALUES (1, 'legacy', 'legacy@example.com', 'password', 50, 1, 1)")
+        for transaction_id in range(1, 11):
+            connection.exec_driver_sql(
+                "INSERT INTO transactions (id, amount, date, user_id, account_id) "
+                "VALUES (?, 0.1, '2024-01-01 00:00:00.000000', 1, 1)", (transaction_id,))
+    engine.dispose()
+
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    client = DatabaseClient()
+    try:
+        assert client.get_property_by_id(1)["purchase_price"] == 250000.5
+        assert client.get_mortgage_by_id(1)["loan_amount"] == 200000.0
+        assert client.get_transaction_by_id(1)["amount"] == 0.1
+        with client.engine.connect() as connection:
+            assert connection.exec_driver_sql(
+                "SELECT DISTINCT typeof(amount), amount FROM transactions").all() == [("integer", 10)]
+            assert connection.scalar(select(func.sum(Transaction.amount))) == 1.0
+            assert connection.scalars(
+                select(SchemaMigration.version)).all() == [1, 2, 3]
+
+        # Already migrated, so starting again changes nothing
+        DatabaseClient()
+        assert client.get_transaction_by_id(1)["amount"] == 0.1
+        client.create_transaction(0.2, datetime(2024, 2, 1), 1, 1)
+        with client.engine.connect() as connection:
+            assert connection.scalar(select(func.sum(Transaction.amount))) == 1.2
+    finally:
+        client.engine.dispose()
+        client.read_engine.dispose()
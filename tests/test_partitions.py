@@ -0,0 +1,58 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from homestake.database.client import DatabaseClient, DatabaseClientError, create_schema
+from homestake.database.partitions import MONTH, YEAR, partition_ranges, partitioned_table, partitions_ahead_end
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def test_partition_ranges():
+    assert partition_ranges(datetime(2023, 6, 1), datetime(2024, 1, 1), YEAR) == [
+        ("transactions_y2023", datetime(2023, 1, 1), datetime(2024, 1, 1)),
+        ("transactions_y2024", datetime(2024, 1, 1), datetime(2025, 1, 1)),
+    ]
+    assert [name for name, _, _ in partition_ranges(datetime(2023, 11, 15), datetime(2024, 1, 31), MONTH)] == [
+        "transactions_m2023_11", "transactions_m2023_12", "transactions_m2024_01"]
+
+
+def test_partitions_ahead_end():
+    # The current partition and the two after it
+    assert partitions_ahead_end(datetime(2024, 6, 1), YEAR) < datetime(2027, 1, 1)
+    assert partitions_ahead_end(datetime(2024, 6, 1), YEAR) > datetime(2026, 12, 31)
+    assert partitions_ahead_end(datetime(2024, 12, 1), MONTH) > datetime(2025, 2, 28)
+
+
+def test_partitioned_table_ddl():
+    ddl = str(CreateTable(partitioned_table()).compile(
+        dialect=postgresql.dialect()))
+    assert "PRIMARY KEY (id, date)" in ddl
+    assert "PARTITION BY RANGE (date)" in ddl
+    assert "id SERIAL" in ddl
+
+
+def test_partitions_unsupported_on_sqlite(client):
+    assert client.create_transaction_partitions(
+        datetime(2020, 1, 1), datetime(2024, 1, 1)) == []
+    assert client.list_transaction_partitions() == []
+    with pytest.raises(DatabaseClientError):
+        client.detach_transaction_partition("transactions_y2020")
+
+
+def test_create_schema_keeps_partitions_ahead(client):
+    # On every start, not only the one that created the table
+    with patch("homestake.database.client.create_transaction_partitions") as create_partitions:
+        create_schema(client.engine)
+    (_, first, last), _ = create_partitions.call_args
+    assert last == partitions_ahead_end(first)
@@ -1,13 +1,34 @@
-from datetime import datetime
+import io
+import time
+from datetime import datetime, timedelta, timezone
 
+import msgpack
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import homestake.constants as const
 from fastapi.testclient import TestClient
+from homestake.amortization import add_months, monthly_payment
+from homestake.database.client import DatabaseClientError
 from homestake.main import app
+from homestake.routes import mortgage as mortgage_routes
+from homestake.routes import property as property_routes
 
 client = TestClient(app)
 
 TEST_DATE = '2025-01-01T00:00:00'
 
 
+@pytest.fixture(autouse=True)
+def rate_limit_key(request):
+    # The rate limiter buckets by API key, so each test gets its own budget
+    # instead of the whole module sharing one
+    client.headers[const.API_KEY_HEADER] = request.node.name
+    yield
+    client.headers.pop(const.API_KEY_HEADER)
+
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -146,6 +167,53 @@ def test_get_mortgage_by_property_404():
     assert response.status_code == 404
 
 
+def test_simulate_mortgage_scenarios_200():
+    response = client.post("/api/v1/mortgages/1/scenarios", json={
+        'scenarios': [
+            {'name': 'extra', 'extra_monthly_principal': 200.0},
+            {'name': 'lump sum', 'lump_sums': [{'month': 12, 'amount': 20000.0}]},
+            {'name': 'refinance', 'rate_changes': [
+                {'month': 61, 'interest_rate': 2.0}]},
+            {'name': 'shorter term', 'term': 15}
+        ]
+    })
+    assert response.status_code == 200
+
+    response_json = response.json()
+    assert response_json['baseline']['months'] == 360
+    assert [scenario['name'] for scenario in response_json['scenarios']] == [
+        'extra', 'lump sum', 'refinance', 'shorter term']
+    assert all(scenario['interest_saved'] >
+               0 for scenario in response_json['scenarios'])
+    assert response_json['scenarios'][3]['months'] == 180
+
+
+def test_simulate_mortgage_scenarios_404():
+    response = client.post("/api/v1/mortgages/2/scenarios",
+                           json={'scenarios': [{}]})
+    assert response.status_code == 404
+
+
+def test_simulate_mortgage_scenarios_422_empty():
+    response = client.post(
+        "/api/v1/mortgages/1/scenarios", json={'scenarios': []})
+    assert response.status_code == 422
+
+
+def test_simulate_mortgage_scenarios_422_term():
+    response = client.post("/api/v1/mortgages/1/scenarios",
+                           json={'scenarios': [{'term': 51}]})
+    assert response.status_code == 422
+
+
+def test_simulate_mortgage_scenarios_422_too_large():
+    response = client.post("/api/v1/mortgages/1/scenarios",
+                           json={'scenarios': [{'term': 50}] * 400})
+    assert response.status_code == 422
+    assert response.text == const.SCENARIO_TOO_LARGE_MSG.format(
+        const.SCENARIO_MAX_MONTHS)
+
+
 def test_get_property_by_address_200():
     response = client.get("/api/v1/properties/address/123 Test St.")
     assert response.status_code == 200
@@ -455,6 +523,25 @@ def test_delete_transaction_404():
     assert response.status_code == 404
 
 
+def test_delete_mortgage_409_referenced():
+    # User 1 still refers to the mortgage
+    assert client.get("/api/v1/users/1").json()['mortgage_id'] == 1
+    response = client.delete("/api/v1/mortgages/1")
+    assert response.status_code == 409
+    assert response.text == const.MORTGAGE_IN_USE_MSG
+    assert client.get("/api/v1/mortgages/1").status_code == 200
+
+
+def test_delete_mortgage_500(monkeypatch):
+    def fail(id):
+        raise DatabaseClientError(const.MORTGAGE_DELETE_ERROR_MSG)
+
+    monkeypatch.setattr(mortgage_routes.DB_CLIENT, "delete_mortgage", fail)
+    response = client.delete("/api/v1/mortgages/1")
+    assert response.status_code == 500
+    assert response.text == const.MORTGAGE_DELETE_ERROR_MSG
+
+
 def test_delete_user_204():
     response = client.delete("/api/v1/users/1")
     assert response.status_code == 204
@@ -483,3 +570,635 @@ def test_delete_propery_204():
 def test_delete_propery_404():
     response = client.delete("/api/v1/properties/1")
     assert response.status_code == 404
+
+
+def test_create_property_idempotency_key_replay():
+    request_json = {
+        'name': 'Idempotent Property',
+        'address': '1 Retry Rd.',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    }
+    headers = {'Idempotency-Key': 'test-property-key'}
+
+    response = client.post("/api/v1/properties",
+                           json=request_json, headers=headers)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+
+    replayed = client.post("/api/v1/properties",
+                           json=request_json, headers=headers)
+    assert replayed.status_code == 201
+    assert replayed.headers['Idempotent-Replayed'] == 'true'
+    assert replayed.json() == response.json()
+
+
+def test_create_property_idempotency_key_mismatch_422():
+    response = client.post("/api/v1/properties", json={
+        'name': 'Other Property',
+        'address': '2 Retry Rd.',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    }, headers={'Idempotency-Key': 'test-property-key'})
+    assert response.status_code == 422
+    assert client.get(
+        "/api/v1/properties/name/Other Property").status_code == 404
+
+
+def test_create_property_idempotency_key_too_long_400():
+    response = client.post("/api/v1/properties", json={
+        'name': 'Long Key Property',
+        'address': '3 Retry Rd.',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    }, headers={'Idempotency-Key': 'k' * (const.IDEMPOTENCY_KEY_LENGTH + 1)})
+    assert response.status_code == 400
+    assert client.get(
+        "/api/v1/properties/name/Long Key Property").status_code == 404
+
+
+def test_create_property_idempotency_key_database_error_500(monkeypatch):
+    def fail(key, digest):
+        raise DatabaseClientError(const.IDEMPOTENCY_KEY_CREATE_ERROR_MSG)
+
+    monkeypatch.setattr(property_routes.DB_CLIENT, "create_idempotency_key", fail)
+    response = client.post("/api/v1/properties", json={
+        'name': 'Failed Key Property',
+        'address': '4 Retry Rd.',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    }, headers={'Idempotency-Key': 'test-property-failed-key'})
+    assert response.status_code == 500
+    assert response.text == const.IDEMPOTENCY_KEY_CREATE_ERROR_MSG
+
+
+def test_create_property_idempotency_key_replays_conflict():
+    request_json = {
+        'name': 'Idempotent Property',
+        'address': '1 Retry Rd.',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    }
+    headers = {'Idempotency-Key': 'test-property-conflict-key'}
+
+    response = client.post("/api/v1/properties",
+                           json=request_json, headers=headers)
+    assert response.status_code == 409
+
+    replayed = client.post("/api/v1/properties",
+                           json=request_json, headers=headers)
+    assert replayed.status_code == 409
+    assert replayed.headers['Idempotent-Replayed'] == 'true'
+
+
+def wait_for_job(job_id):
+    for _ in range(100):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        time.sleep(0.05)
+    return job
+
+
+def test_create_job_202():
+    response = client.post("/api/v1/jobs", json={
+        'type': 'amortization',
+        'params': {}
+    })
+    assert response.status_code == 202
+    job = response.json()
+    assert job['status'] == 'queued'
+
+    job = wait_for_job(job['id'])
+    assert job['status'] == 'succeeded'
+    assert isinstance(job['result']['mortgages'], list)
+
+
+def test_create_job_400_unknown_type():
+    response = client.post("/api/v1/jobs", json={'type': 'unknown'})
+    assert response.status_code == 400
+
+
+def test_get_job_by_id_404():
+    response = client.get("/api/v1/jobs/999999")
+    assert response.status_code == 404
+
+
+def test_get_mortgage_progress():
+    start_date = add_months(datetime.now().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0), -24)
+    response = client.post("/api/v1/mortgages", json={
+        'lender': 'ProgressLender',
+        'loan_amount': 120000.0,
+        'interest_rate': 6,
+        'term': 30,
+        'start_date': start_date.isoformat()
+    })
+    assert response.status_code == 201
+    mortgage_id = response.json()['id']
+
+    response = client.get(f"/api/v1/mortgages/{mortgage_id}/progress")
+    assert response.status_code == 200
+    progress = response.json()
+    assert progress['periods_elapsed'] == 24
+    assert progress['months_ahead'] < 0
+    assert progress['remaining_balance'] > 120000.0
+
+    response = client.post("/api/v1/users", json={
+        'user_name': 'Progress User',
+        'email': 'progress@email.com',
+        'password': 'testpassword',
+        'stake': 50
+    })
+    assert response.status_code == 201
+
+    payment = round(monthly_payment(120000.0, 6, 360), 2)
+    for period in range(1, 25):
+        response = client.post("/api/v1/transactions", json={
+            'amount': payment,
+            'date': add_months(start_date, period).isoformat(),
+            'user_name': 'Progress User',
+            'account_name': 'Mortgage'
+        })
+        assert response.status_code == 201
+
+    progress = client.get(f"/api/v1/mortgages/{mortgage_id}/progress").json()
+    assert progress['months_ahead'] == 0
+    assert abs(progress['remaining_balance'] -
+               progress['scheduled_balance']) < 1
+    assert progress['projected_payoff_date'] == progress['scheduled_payoff_date']
+
+    response = client.post("/api/v1/transactions", json={
+        'amount': 20000.0,
+        'date': add_months(start_date, 1).isoformat(),
+        'user_name': 'Progress User',
+        'account_name': 'Mortgage'
+    })
+    assert response.status_code == 201
+    lump_sum_id = response.json()['id']
+
+    progress = client.get(f"/api/v1/mortgages/{mortgage_id}/progress").json()
+    assert progress['months_ahead'] > 0
+    assert progress['projected_payoff_date'] < progress['scheduled_payoff_date']
+
+    assert client.delete(
+        f"/api/v1/transactions/{lump_sum_id}").status_code == 204
+    progress = client.get(f"/api/v1/mortgages/{mortgage_id}/progress").json()
+    assert progress['months_ahead'] == 0
+
+
+def test_get_mortgage_progress_no_term():
+    mortgage = client.get("/api/v1/mortgages/lender/ProgressLender").json()
+    response = client.patch(f"/api/v1/mortgages/{mortgage['id']}", json={'term': 0})
+    assert response.status_code == 206
+
+    # Nothing is left to schedule, so the whole balance is due
+    response = client.get(f"/api/v1/mortgages/{mortgage['id']}/progress")
+    assert response.status_code == 200
+    progress = response.json()
+    assert progress['scheduled_balance'] == 0.0
+    assert progress['remaining_balance'] > 0
+    assert progress['months_ahead'] < 0
+    assert progress['scheduled_payoff_date'] == mortgage['start_date']
+
+    response = client.patch(f"/api/v1/mortgages/{mortgage['id']}", json={'term': mortgage['term']})
+    assert response.status_code == 206
+
+
+def test_get_mortgage_progress_404():
+    response = client.get("/api/v1/mortgages/999999/progress")
+    assert response.status_code == 404
+
+
+def test_property_valuations():
+    response = client.post("/api/v1/properties", json={
+        'name': 'Valued Property',
+        'address': '3 History Ln.',
+        'purchase_price': 100000.0,
+        'purchase_date': '2020-01-01T00:00:00',
+        'current_value': 150000.0
+    })
+    assert response.status_code == 201
+    property_id = response.json()['id']
+
+    valuations = client.get(
+        f"/api/v1/properties/{property_id}/valuations").json()
+    assert [valuation['value'] for valuation in valuations] == [
+        100000.0, 150000.0]
+
+    for week in range(30):
+        response = client.post(f"/api/v1/properties/{property_id}/valuations", json={
+            'value': 100000.0 + week,
+            'date': (datetime(2021, 1, 1) + timedelta(weeks=week)).isoformat()
+        })
+        assert response.status_code == 201
+
+    response = client.get(f"/api/v1/properties/{property_id}/valuations", params={
+        'start': '2021-01-01T00:00:00',
+        'end': '2021-12-31T00:00:00',
+        'max_points': 6
+    })
+    assert response.status_code == 200
+    valuations = response.json()
+    assert 1 < len(valuations) <= 6
+    assert valuations[-1] == {'date': '2021-07-23T00:00:00', 'value': 100029.0}
+    assert [valuation['date'] for valuation in valuations] == sorted(
+        valuation['date'] for valuation in valuations)
+
+    # Backfilled valuations do not replace the current value
+    response = client.get(f"/api/v1/properties/{property_id}")
+    assert response.json()['current_value'] == 150000.0
+
+    response = client.patch(f"/api/v1/properties/{property_id}", json={
+        'current_value': 175000.0
+    })
+    assert response.status_code == 206
+    valuations = client.get(
+        f"/api/v1/properties/{property_id}/valuations").json()
+    assert valuations[-1]['value'] == 175000.0
+
+
+def test_property_valuations_404():
+    response = client.get("/api/v1/properties/999999/valuations")
+    assert response.status_code == 404
+
+
+def test_export_transactions_parquet():
+    response = client.get("/api/v1/export/transactions.parquet")
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == [
+        'id', 'amount', 'date', 'user_id', 'account_id']
+    assert table.num_rows > 0
+
+
+def test_export_transactions_arrow_filtered():
+    user = client.get("/api/v1/users/name/Progress User").json()
+    response = client.get("/api/v1/export/transactions.arrow", params={
+        'user_id': user['id'],
+        'start': '2000-01-01T00:00:00'
+    })
+    assert response.status_code == 200
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 24
+    assert set(table.column('user_id').to_pylist()) == {user['id']}
+
+
+def test_export_transactions_parquet_empty():
+    response = client.get(
+        "/api/v1/export/transactions.parquet", params={'user_id': 999999})
+    assert response.status_code == 200
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 0
+
+
+def test_get_user_msgpack():
+    response = client.get("/api/v1/users/name/Progress User",
+                          headers={'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/msgpack'
+    assert 'Accept' in response.headers['vary']
+    assert msgpack.unpackb(response.content) == client.get(
+        "/api/v1/users/name/Progress User").json()
+
+
+def test_create_transactions_bulk_msgpack():
+    body = msgpack.packb([{
+        'amount': 100.0 + index,
+        'date': datetime(2030, 1, index + 1, tzinfo=timezone.utc),
+        'user_name': 'Progress User',
+        'account_name': 'Mortgage'
+    } for index in range(5)], datetime=True)
+    response = client.post("/api/v1/transactions/bulk", content=body, headers={
+        'Content-Type': 'application/msgpack',
+        'Accept': 'application/msgpack'
+    })
+    assert response.status_code == 201
+
+    transactions = msgpack.unpackb(response.content)
+    assert [transaction['amount'] for transaction in transactions] == [
+        100.0, 101.0, 102.0, 103.0, 104.0]
+    assert transactions[0]['date'] == '2030-01-01T00:00:00'
+    assert client.get(
+        f"/api/v1/transactions/{transactions[-1]['id']}").json()['amount'] == 104.0
+
+
+def test_create_transactions_bulk_json_404_bad_user():
+    response = client.post("/api/v1/transactions/bulk", json=[{
+        'amount': 100.0,
+        'date': '2030-01-01T00:00:00',
+        'user_name': 'Nobody',
+        'account_name': 'Mortgage'
+    }])
+    assert response.status_code == 404
+
+
+def test_create_transactions_bulk_422():
+    response = client.post("/api/v1/transactions/bulk",
+                           json=[{'amount': 'lots'}])
+    assert response.status_code == 422
+
+
+def test_create_transactions_bulk_413():
+    # Too many rows are rejected before any row is validated
+    response = client.post("/api/v1/transactions/bulk",
+                           json=[{}] * (const.TRANSACTION_BULK_MAX_SIZE + 1))
+    assert response.status_code == 413
+    assert response.text == const.TRANSACTION_BULK_SIZE_MSG.format(
+        const.TRANSACTION_BULK_MAX_SIZE)
+
+    body = b"[" + b" " * const.TRANSACTION_BULK_MAX_BYTES + b"]"
+    response = client.post("/api/v1/transactions/bulk", content=body,
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 413
+    assert response.text == const.TRANSACTION_BULK_BYTES_MSG.format(
+        const.TRANSACTION_BULK_MAX_BYTES)
+
+    # Sent in chunks without a Content-Length
+    response = client.post("/api/v1/transactions/bulk", content=iter([body[:1024], body[1024:]]),
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 413
+
+
+def test_search():
+    response = client.get("/api/v1/search", params={'q': "progress us"})
+    assert response.status_code == 200
+    assert response.json()[0] == {
+        'type': "user", 'id': response.json()[0]["id"], 'user_name': "Progress User",
+        'email': response.json()[0]["email"]}
+
+
+def test_search_422():
+    assert client.get("/api/v1/search").status_code == 422
+    assert client.get("/api/v1/search",
+                      params={'q': "progress", 'limit': 0}).status_code == 422
+
+
+def test_delete_property_household():
+    response = client.post("/api/v1/properties", json={
+        'name': 'Teardown Property',
+        'address': '1 Teardown Row',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    })
+    property_id = response.json()["id"]
+    response = client.post("/api/v1/users", json={
+        'user_name': 'Teardown User',
+        'email': 'teardown@email.com',
+        'password': 'testpassword',
+        'stake': 50,
+        'property_name': 'Teardown Property'
+    })
+    assert response.status_code == 201
+    response = client.post("/api/v1/transactions", json={
+        'amount': 500.0,
+        'date': TEST_DATE,
+        'user_name': 'Teardown User',
+        'account_name': 'Mortgage'
+    })
+    assert response.status_code == 201
+
+    response = client.delete(f"/api/v1/properties/{property_id}/household")
+    assert response.status_code == 200
+    assert response.json() == {
+        'transactions': 1,
+        'users': 1,
+        'mortgages': 0,
+        'property_valuations': 2,
+        'properties': 1
+    }
+    assert client.get(
+        "/api/v1/users/name/Teardown User").status_code == 404
+    assert client.delete(
+        f"/api/v1/properties/{property_id}/household").status_code == 404
+
+
+def test_events_422():
+    response = client.get("/api/v1/events",
+                          headers={'Last-Event-ID': 'not-an-id'})
+    assert response.status_code == 422
+
+
+def test_list_transactions_by_user_etag():
+    response = client.get("/api/v1/transactions/user/Progress User")
+    assert response.status_code == 200
+    tag = response.headers["ETag"]
+
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          headers={'If-None-Match': tag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == tag
+
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          headers={'If-None-Match': tag, 'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+
+    client.post("/api/v1/transactions", json={
+        'amount': 100.0,
+        'date': TEST_DATE,
+        'user_name': 'Progress User',
+        'account_name': 'Mortgage'
+    })
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          headers={'If-None-Match': tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+
+
+def test_list_transactions_by_account_etag():
+    response = client.get("/api/v1/transactions/account/Mortgage")
+    assert response.status_code == 200
+    response = client.get("/api/v1/transactions/account/Mortgage",
+                          headers={'If-None-Match': response.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_response_cache():
+    response = client.post("/api/v1/properties", json={
+        'name': 'Cached Property',
+        'address': '1 Cache Lane',
+        'purchase_price': 100000.0,
+        'purchase_date': TEST_DATE,
+        'current_value': 200000.0
+    })
+    property_id = response.json()["id"]
+
+    hits = client.get("/metrics").json()["response_cache"]["hits"]
+    client.get(f"/api/v1/properties/{property_id}")
+    response = client.get(f"/api/v1/properties/{property_id}")
+    assert response.json()["current_value"] == 200000.0
+    assert client.get("/metrics").json()["response_cache"]["hits"] == hits + 1
+
+    client.patch(f"/api/v1/properties/{property_id}",
+                 json={'current_value': 250000.0})
+    response = client.get(f"/api/v1/properties/{property_id}")
+    assert response.json()["current_value"] == 250000.0
+
+
+def test_list_transactions_filtered():
+    for amount, date in ((25.0, '2023-03-01T00:00:00'), (75.0, '2023-06-01T00:00:00')):
+        client.post("/api/v1/transactions", json={
+            'amount': amount,
+            'date': date,
+            'user_name': 'Progress User',
+            'account_name': 'Mortgage'
+        })
+
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          params={'from': '2023-01-01T00:00:00', 'to': '2023-12-31T00:00:00', 'sort': '-amount'})
+    assert response.status_code == 200
+    assert [transaction['amount'] for transaction in response.json()] == [75.0, 25.0]
+
+    response = client.get("/api/v1/transactions/account/Mortgage",
+                          params={'from': '2023-01-01T00:00:00', 'to': '2023-12-31T00:00:00',
+                                  'min_amount': 50.0, 'max_amount': 100.0})
+    assert response.status_code == 200
+    assert [transaction['amount'] for transaction in response.json()] == [75.0]
+
+    # A date as `to` includes the whole day
+    client.post("/api/v1/transactions", json={
+        'amount': 40.0,
+        'date': '2023-12-31T18:30:00',
+        'user_name': 'Progress User',
+        'account_name': 'Mortgage'
+    })
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          params={'from': '2023-01-01', 'to': '2023-12-31', 'sort': 'date'})
+    assert [transaction['amount'] for transaction in response.json()] == [25.0, 75.0, 40.0]
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          params={'from': '2023-01-01T00:00:00', 'to': '2023-12-31T00:00:00', 'sort': 'date'})
+    assert [transaction['amount'] for transaction in response.json()] == [25.0, 75.0]
+
+    response = client.get("/api/v1/transactions/user/Progress User",
+                          params={'sort': 'user_id'})
+    assert response.status_code == 422
+
+
+def test_property_equity():
+    response = client.get("/api/v1/properties/999999/equity")
+    assert response.status_code == 404
+
+    response = client.post("/api/v1/properties", json={
+        'name': 'Equity Property',
+        'address': '1 Equity Way',
+        'purchase_price': 300000.0,
+        'purchase_date': '2020-01-01T00:00:00',
+        'current_value': 350000.0
+    })
+    assert response.status_code == 201
+    property_id = response.json()["id"]
+    for user_name in ('Equity Owner A', 'Equity Owner B'):
+        response = client.post("/api/v1/users", json={
+            'user_name': user_name,
+            'email': f"{user_name.replace(' ', '').lower()}@email.com",
+            'password': 'testpassword',
+            'stake': 50,
+            'property_name': 'Equity Property'
+        })
+        assert response.status_code == 201
+    for user_name, amount, date in (('Equity Owner A', 300.0, '2021-01-01T00:00:00'),
+                                    ('Equity Owner B', 100.0, '2021-06-01T00:00:00'),
+                                    ('Equity Owner B', 200.0, '2022-01-01T00:00:00')):
+        response = client.post("/api/v1/transactions", json={
+            'amount': amount,
+            'date': date,
+            'user_name': user_name,
+            'account_name': 'Mortgage'
+        })
+        assert response.status_code == 201
+
+    response = client.get(f"/api/v1/properties/{property_id}/equity",
+                          params={'as_of': '2021-06-01'})
+    assert response.status_code == 200
+    equity = response.json()
+    assert equity['as_of'] == '2021-06-01'
+    assert equity['total_contributions'] == 400.0
+    assert [(owner['user_name'], owner['contributions'], owner['share']) for owner in equity['owners']] == [
+        ('Equity Owner A', 300.0, 0.75), ('Equity Owner B', 100.0, 0.25)]
+
+    response = client.get(f"/api/v1/properties/{property_id}/equity")
+    assert [owner['share'] for owner in response.json()['owners']] == [0.5, 0.5]
+
+    response = client.get(f"/api/v1/properties/{property_id}/equity",
+                          params={'as_of': 'not-a-date'})
+    assert response.status_code == 422
+
+
+def test_create_job_equity():
+    property_id = client.get("/api/v1/properties/name/Equity Property").json()["id"]
+    response = client.post("/api/v1/jobs", json={
+        'type': 'equity',
+        'params': {'property_id': property_id, 'as_of': '2021-06-01'}
+    })
+    assert response.status_code == 202
+    job = wait_for_job(response.json()['id'])
+    assert job['status'] == 'succeeded'
+    assert job['result']['property_id'] == property_id
+    assert job['result']['total_contributions'] == 400.0
+
+    response = client.post("/api/v1/jobs", json={
+        'type': 'equity',
+        'params': {'property_id': 999999}
+    })
+    job = wait_for_job(response.json()['id'])
+    assert job['status'] == 'failed'
+    assert job['error'] == const.PROPERTY_ID_NOT_FOUND.format(999999)
+
+
+def test_create_job_export_transactions(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXPORT_PATH", str(tmp_path))
+    user = client.get("/api/v1/users/name/Equity Owner B").json()
+    response = client.post("/api/v1/jobs", json={
+        'type': 'export_transactions',
+        'params': {'user_id': user['id'], 'end': '2021-12-31T00:00:00'}
+    })
+    assert response.status_code == 202
+    job = wait_for_job(response.json()['id'])
+    assert job['status'] == 'succeeded'
+    assert job['result']['transactions'] == 1
+
+    table = pq.read_table(job['result']['path'])
+    assert table.column('amount').to_pylist() == [100.0]
+    # Nothing is left under the temporary name
+    assert [str(path) for path in tmp_path.iterdir()] == [job['result']['path']]
+
+
+def test_property_contributions():
+    property_id = client.get("/api/v1/properties/name/Equity Property").json()["id"]
+    response = client.get(f"/api/v1/properties/{property_id}/contributions",
+                          params={'from': '2021-01-01', 'to': '2021-12-31'})
+    assert response.status_code == 200
+    contributions = response.json()
+    assert [(user['user_name'], user['total'], user['count']) for user in contributions['users']] == [
+        ('Equity Owner A', 300.0, 1), ('Equity Owner B', 100.0, 1)]
+    assert contributions['periods'] == [{'period': '2021-01', 'total': 300.0, 'count': 1},
+                                        {'period': '2021-06', 'total': 100.0, 'count': 1}]
+
+    # Appended to the loaded ledger
+    response = client.post("/api/v1/transactions", json={
+        'amount': 50.0,
+        'date': '2022-03-01T00:00:00',
+        'user_name': 'Equity Owner A',
+        'account_name': 'Mortgage'
+    })
+    assert response.status_code == 201
+    response = client.get(f"/api/v1/properties/{property_id}/contributions",
+                          params={'period': 'year'})
+    assert response.json()['periods'] == [{'period': '2021', 'total': 400.0, 'count': 2},
+                                          {'period': '2022', 'total': 250.0, 'count': 2}]
+
+    response = client.get(f"/api/v1/properties/{property_id}/contributions",
+                          params={'period': 'week'})
+    assert response.status_code == 422
+    response = client.get("/api/v1/properties/999999/contributions")
+    assert response.status_code == 404
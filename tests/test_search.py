@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+
+from homestake.database.client import DatabaseClient, create_schema
+from homestake.database.models import Base
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    client = DatabaseClient()
+    client.create_property("Quillfeather Cottage", "42 Harbour Road", 250000.0,
+                           datetime(2020, 1, 1), 300000.0)
+    client.create_property("Harbour View", "7 Quill Street", 400000.0,
+                           datetime(2020, 1, 1), 450000.0)
+    client.create_user("jane.harbour", "jane@example.com", "password", 50)
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def names(results):
+    return [result.get("name") or result.get("user_name") for result in results]
+
+
+def test_search_prefix_before_substring(client):
+    results = client.search("harbour")
+    assert names(results)[0] == "Harbour View"
+    assert sorted(names(results)[1:]) == [
+        "Quillfeather Cottage", "jane.harbour"]
+    assert results[0] == {'type': "property", 'id': 2,
+                          'name': "Harbour View", 'address': "7 Quill Street"}
+    user = next(result for result in results if result["type"] == "user")
+    assert user["user_name"] == "jane.harbour"
+    assert user["email"] == "jane@example.com"
+
+
+def test_search_fuzzy(client):
+    # Misspelled, but shares most of its trigrams with the cottage
+    assert names(client.search("quilfeather"))[0] == "Quillfeather Cottage"
+    assert client.search("zzzzzz") == []
+
+
+def test_search_short_query(client):
+    assert names(client.search("Ha")) == ["Harbour View"]
+    assert names(client.search("ja")) == ["jane.harbour"]
+
+
+def test_search_paginated(client):
+    everything = client.search("harbour")
+    assert client.search("harbour", limit=1) == everything[:1]
+    assert client.search("harbour", limit=2, offset=1) == everything[1:]
+
+
+def test_search_index_follows_writes(client):
+    user = client.get_user_by_name("jane.harbour")
+    client.update_user(user["id"], user_name="jane.doe")
+    assert "jane.harbour" not in names(client.search("harbour"))
+    assert names(client.search("jane.doe")) == ["jane.doe"]
+
+    client.delete_user(user["id"])
+    assert client.search("jane") == []
+
+
+def test_search_index_backfilled(client):
+    # Databases created before the index existed get it filled on startup
+    with client.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE search_index")
+    other = DatabaseClient()
+    assert names(other.search("quill")) == [
+        "Quillfeather Cottage", "Harbour View"]
+
+
+def test_search_index_dropped_with_schema(client):
+    Base.metadata.drop_all(client.engine)
+    create_schema(client.engine)
+    client.create_property("Harbour View", "1 Quay Lane", 100000.0, datetime(2020, 1, 1), 120000.0)
+    assert names(client.search("harbour")) == ["Harbour View"]
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from homestake.database.client import DatabaseClient
+from homestake.database.models import Mortgage, Property, PropertyValuation, Transaction, User
+from homestake.seed import MAX_OWNERS, MIN_OWNERS, seed
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'seed.db'}")
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+
+
+def query_plans(client: DatabaseClient, call) -> list[str]:
+    """EXPLAIN QUERY PLAN details for every statement `call` sends."""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(client.read_engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(client.read_engine, "before_cursor_execute", record)
+
+    with client.engine.connect() as connection:
+        return [row[-1] for statement, parameters in statements
+                for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def test_seed_households(client):
+    result = seed(client.engine, properties=5, years=2, seed=1)
+    assert result.properties == 5
+    assert result.transactions > 0
+
+    with client.engine.connect() as connection:
+        owners = connection.execute(select(User.property_id, func.count(), func.sum(
+            User.stake)).group_by(User.property_id)).all()
+        assert len(owners) == 5
+        for _, count, stakes in owners:
+            assert MIN_OWNERS <= count <= MAX_OWNERS
+            assert stakes == 100
+        assert connection.execute(select(func.count()).select_from(
+            Transaction)).scalar() == result.transactions
+
+    assert client.get_user_transactions_version(result.first_user_id) == 1
+    property = client.get_property_by_id(result.first_property_id)
+    assert [valuation['value'] for valuation in client.list_property_valuations(property['id'])] == [
+        property['purchase_price'], property['current_value']]
+
+
+def test_seed_reproducible(client, tmp_path, monkeypatch):
+    seed(client.engine, properties=3, years=1, seed=7)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'other.db'}")
+    other = DatabaseClient()
+    seed(other.engine, properties=3, years=1, seed=7)
+
+    assert client.list_transactions() == other.list_transactions()
+    assert client.list_users() == other.list_users()
+    other.engine.dispose()
+
+
+def test_seed_appends(client):
+    first = seed(client.engine, properties=2, years=1)
+    second = seed(client.engine, properties=2, years=1)
+    assert second.first_property_id == first.first_property_id + 2
+    assert second.first_transaction_id == first.first_transaction_id + first.transactions
+
+
+@pytest.mark.parametrize("method", ["get_user_by_name", "get_property_by_name", "get_transaction_by_id"])
+def test_lookup_query_plans_use_indexes(client, method):
+    result = seed(client.engine, properties=20, years=1)
+    user = client.get_user_by_id(result.first_user_id)
+    assert client.get_user_transactions_version(result.first_user_id) == 1
+    property = client.get_property_by_id(result.first_property_id)
+    args = {
+        "get_user_by_name": user["user_name"],
+        "get_property_by_name": property["name"],
+        "get_transaction_by_id": result.first_transaction_id
+    }
+
+    plans = query_plans(client, lambda: getattr(client, method)(args[method]))
+    assert plans
+    assert not [plan for plan in plans if plan.startswith("SCAN")]
+
+
+@pytest.mark.parametrize("method", ["list_transactions_by_user", "list_transactions_by_account"])
+def test_filtered_transaction_list_plans_use_date_indexes(client, method):
+    result = seed(client.engine, properties=20, years=2)
+    owner = result.first_user_id if method == "list_transactions_by_user" else result.first_account_id
+    start, end = datetime(2024, 1, 1), datetime(2024, 12, 31)
+
+    plans = query_plans(client, lambda: getattr(client, method)(
+        owner, start, end, min_amount=10.0, sort="-date"))
+    index = "ix_transactions_user_id_date" if method == "list_transactions_by_user" \
+        else "ix_transactions_account_id_date"
+    assert any(index in plan and "date>? AND date<?" in plan for plan in plans)
+    assert not [plan for plan in plans if plan.startswith("SCAN")]
+
+    transactions = getattr(client, method)(owner, start, end, min_amount=10.0, sort="-date")
+    assert transactions
+    assert all(start.isoformat() <= transaction['date'] <= end.isoformat() and transaction['amount'] >= 10.0
+               for transaction in transactions)
+    dates = [transaction['date'] for transaction in transactions]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_delete_property_household(client):
+    result = seed(client.engine, properties=3, years=2)
+    property_id = result.first_property_id
+    client.create_property_valuation(property_id, 500000.0, datetime(2024, 6, 1))
+
+    def counts():
+        with client.engine.connect() as connection:
+            return {model.__tablename__: connection.execute(select(func.count()).select_from(model)).scalar()
+                    for model in (Transaction, User, Mortgage, PropertyValuation, Property)}
+
+    before = counts()
+    with client.engine.connect() as connection:
+        owners = connection.execute(select(func.count()).where(
+            User.property_id == property_id)).scalar()
+        payments = connection.execute(select(func.count()).where(
+            Transaction.account_id == result.first_account_id)).scalar()
+
+    deleted = client.delete_property_household(property_id)
+    assert deleted == {
+        'transactions': payments,
+        'users': owners,
+        'mortgages': 1,
+        'property_valuations': 3,
+        'properties': 1
+    }
+    after = counts()
+    assert after == {table: count - deleted[table] for table, count in before.items()}
+    assert client.get_property_by_id(property_id) is None
+    assert client.get_mortgage_by_id(result.first_account_id) is None
+    assert client.get_property_by_id(property_id + 1) is not None
@@ -0,0 +1,32 @@
+import msgpack
+
+import homestake.constants as const
+from homestake.serialization import RESPONSE_MEDIA_TYPE, accepts_msgpack, dumps, from_json, loads, media_type, to_json
+
+
+def test_accepts_msgpack():
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert not accepts_msgpack("application/msgpack;q=0")
+    assert not accepts_msgpack("application/json")
+    assert not accepts_msgpack(None)
+
+
+def test_dumps_negotiated():
+    data = {'id': 1, 'amount': 1.5}
+    assert dumps(data) == '{"id": 1, "amount": 1.5}'
+    assert media_type() is None
+
+    token = RESPONSE_MEDIA_TYPE.set(const.MSGPACK_MEDIA_TYPE)
+    try:
+        assert msgpack.unpackb(dumps(data)) == data
+        assert media_type() == const.MSGPACK_MEDIA_TYPE
+        assert from_json(to_json(dumps(data), media_type())) == dumps(data)
+    finally:
+        RESPONSE_MEDIA_TYPE.reset(token)
+
+
+def test_loads():
+    assert loads(b'[1, 2]', "application/json") == [1, 2]
+    assert loads(msgpack.packb([1, 2]),
+                 "application/msgpack; charset=binary") == [1, 2]
@@ -0,0 +1,136 @@
+import io
+import json
+import tarfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import homestake.constants as const
+from homestake.database.client import DatabaseClient
+from homestake.database.models import Base, Account, User
+from homestake.seed import seed
+from homestake.snapshot import SnapshotError, dump_snapshot, restore_snapshot
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'homestake.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Account(name="Checking"), User(
+            user_name="Snapshot User", email="snapshot@example.com", password="password")])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'archived.db'}")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path / "archive"))
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def test_dump_and_restore_sqlite(engine, tmp_path):
+    path = tmp_path / "snapshot.tar.gz"
+    manifest = dump_snapshot(engine, str(path))
+
+    assert manifest['version'] == const.SNAPSHOT_FORMAT_VERSION
+    assert manifest['dialect'] == "sqlite"
+    rows = {table['name']: table['rows'] for table in manifest['tables']}
+    assert rows['accounts'] == 1
+    assert rows['users'] == 1
+
+    with Session(engine) as session:
+        session.query(User).delete()
+        session.add(Account(name="Savings"))
+        session.commit()
+
+    restore_snapshot(engine, str(path))
+
+    with Session(engine) as session:
+        assert [user.user_name for user in session.query(User).all()] == [
+            "Snapshot User"]
+        assert [account.name for account in session.query(Account).all()] == [
+            "Checking"]
+
+
+def test_restore_unsupported_version(engine, tmp_path):
+    path = tmp_path / "snapshot.tar.gz"
+    data = json.dumps({'version': 999, 'dialect': "sqlite"}).encode()
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo(const.SNAPSHOT_MANIFEST)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    with pytest.raises(SnapshotError):
+        restore_snapshot(engine, str(path))
+
+
+def test_restore_dialect_mismatch(engine, tmp_path):
+    path = tmp_path / "snapshot.tar.gz"
+    data = json.dumps({'version': const.SNAPSHOT_FORMAT_VERSION,
+                      'dialect': "postgresql"}).encode()
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo(const.SNAPSHOT_MANIFEST)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    with pytest.raises(SnapshotError):
+        restore_snapshot(engine, str(path))
+
+
+def test_restore_sqlite_member_missing(engine, tmp_path):
+    path = tmp_path / "snapshot.tar.gz"
+    data = json.dumps({'version': const.SNAPSHOT_FORMAT_VERSION,
+                      'dialect': "sqlite"}).encode()
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo(const.SNAPSHOT_MANIFEST)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    with pytest.raises(SnapshotError):
+        restore_snapshot(engine, str(path))
+
+    # The live database is left as it was
+    with Session(engine) as session:
+        assert [user.user_name for user in session.query(User).all()] == [
+            "Snapshot User"]
+
+
+def test_dump_and_restore_archive(client, tmp_path):
+    seeded = seed(client.engine, properties=2, years=8, seed=2)
+    archived = client.archive_transactions(datetime(2019, 1, 1))['transactions']
+    assert archived > 0
+    user_id = seeded.first_user_id
+    transactions = client.list_transactions_by_user(user_id)
+
+    path = tmp_path / "snapshot.tar.gz"
+    manifest = dump_snapshot(client.engine, str(path), client.archive)
+    assert manifest['archive']['rows'] == archived
+
+    # Removes the household's archived rows along with the rest
+    client.delete_property_household(seeded.first_property_id)
+    assert client.list_transactions_by_user(user_id) == []
+
+    restore_snapshot(client.engine, str(path), client.archive)
+    assert client.list_transactions_by_user(user_id) == transactions
+    assert sum(entry['rows'] for entry in client.archive.manifest()['files']) == archived
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(".restore-")]
+
+
+def test_restore_without_archive_refused(client, tmp_path):
+    seed(client.engine, properties=1, years=8, seed=2)
+    path = tmp_path / "snapshot.tar.gz"
+    dump_snapshot(client.engine, str(path))
+    assert client.archive_transactions(datetime(2019, 1, 1))['transactions'] > 0
+    transactions = client.list_transactions()
+
+    with pytest.raises(SnapshotError):
+        restore_snapshot(client.engine, str(path), client.archive)
+    assert client.list_transactions() == transactions
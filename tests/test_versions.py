@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+from homestake.conditional import matches
+from homestake.database.client import DatabaseClient
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'homestake.db'}")
+    client = DatabaseClient()
+    yield client
+    client.engine.dispose()
+    client.read_engine.dispose()
+
+
+def versions(client, user_ids, account_ids):
+    return ([client.get_user_transactions_version(user_id) for user_id in user_ids],
+            [client.get_account_transactions_version(account_id) for account_id in account_ids])
+
+
+def test_transaction_writes_bump_versions(client):
+    first = client.create_mortgage(
+        "First Bank", 100000.0, 5, 30, datetime(2020, 1, 1), name="First")
+    second = client.create_mortgage(
+        "Second Bank", 100000.0, 5, 30, datetime(2020, 1, 1), name="Second")
+    user = client.create_user("owner", "owner@example.com", "password", 50)
+    other = client.create_user("other", "other@example.com", "password", 50)
+    users, accounts = [user["id"], other["id"]], [first["id"], second["id"]]
+    assert versions(client, users, accounts) == ([0, 0], [0, 0])
+
+    transaction = client.create_transaction(
+        100.0, datetime(2024, 1, 1), user["id"], first["id"])
+    assert versions(client, users, accounts) == ([1, 0], [1, 0])
+
+    client.update_transaction(transaction["id"], amount=200.0)
+    assert versions(client, users, accounts) == ([2, 0], [2, 0])
+
+    # Moving a transaction changes the lists it left as well as the new ones
+    client.update_transaction(
+        transaction["id"], user_id=other["id"], account_id=second["id"])
+    assert versions(client, users, accounts) == ([3, 1], [3, 1])
+
+    client.delete_transaction(transaction["id"])
+    assert versions(client, users, accounts) == ([3, 2], [3, 2])
+
+    client.create_transactions([{'amount': 100.0, 'date': datetime(2024, month, 1),
+                                 'user_id': user["id"], 'account_id': first["id"]} for month in (1, 2, 3)])
+    assert versions(client, users, accounts) == ([4, 2], [4, 2])
+
+
+def test_household_delete_bumps_versions(client):
+    property = client.create_property("Versioned", "1 Version Road", 250000.0,
+                                      datetime(2020, 1, 1), 300000.0)
+    mortgage = client.create_mortgage("Version Bank", 100000.0, 5, 30, datetime(2020, 1, 1),
+                                      name="Versioned", property_id=property["id"])
+    owner = client.create_user("owner", "owner@example.com", "password", 50,
+                               mortgage_id=mortgage["id"], property_id=property["id"])
+    # Pays into the mortgage without being one of the property's owners
+    guest = client.create_user("guest", "guest@example.com", "password", 50)
+    client.create_transaction(
+        100.0, datetime(2024, 1, 1), guest["id"], mortgage["id"])
+    client.create_transaction(
+        100.0, datetime(2024, 1, 1), owner["id"], mortgage["id"])
+
+    client.delete_property_household(property["id"])
+    assert client.get_user_transactions_version(guest["id"]) == 2
+    assert client.get_account_transactions_version(mortgage["id"]) == 3
+
+
+def test_matches():
+    assert matches('"3-json"', '"3-json"')
+    assert matches('"2-json", W/"3-json"', '"3-json"')
+    assert matches('*', '"3-json"')
+    assert not matches('"3-msgpack"', '"3-json"')
+    assert not matches(None, '"3-json"')